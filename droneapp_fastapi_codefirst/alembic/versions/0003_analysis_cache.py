@@ -0,0 +1,36 @@
+"""add analysis result cache
+
+Revision ID: 0003_analysis_cache
+Revises: 0002_add_user_phone_report
+Create Date: 2026-10-17 00:00:00.000000
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '0003_analysis_cache'
+down_revision = '0002_add_user_phone_report'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'analysis_cache',
+        sa.Column('cache_key', sa.String(length=100), primary_key=True),
+        sa.Column('user_id', sa.BigInteger(), nullable=False),
+        sa.Column('metrics', sa.Text(), nullable=False),
+        sa.Column('assets', sa.Text(), nullable=False),
+        sa.Column('report_path', sa.Text(), nullable=False),
+        sa.Column('size_bytes', sa.BigInteger(), nullable=False, server_default=sa.text('0')),
+        sa.Column('hits', sa.Integer(), nullable=False, server_default=sa.text('0')),
+        sa.Column('created_at', sa.DateTime(), nullable=False, server_default=sa.text("(datetime('now'))")),
+        sa.Column('last_used_at', sa.DateTime(), nullable=False, server_default=sa.text("(datetime('now'))")),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], name='analysis_cache_user_id_fkey')
+    )
+    op.create_index('ix_analysis_cache_last_used_at', 'analysis_cache', ['last_used_at'])
+
+
+def downgrade():
+    op.drop_index('ix_analysis_cache_last_used_at', table_name='analysis_cache')
+    op.drop_table('analysis_cache')
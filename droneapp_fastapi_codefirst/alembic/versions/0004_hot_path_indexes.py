@@ -0,0 +1,39 @@
+"""add indexes for hot query paths
+
+Revision ID: 0004_hot_path_indexes
+Revises: 0003_analysis_cache
+Create Date: 2026-10-17 00:10:00.000000
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '0004_hot_path_indexes'
+down_revision = '0003_analysis_cache'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # runs of a user / by status, newest first (keyset pagination on id, job queue)
+    op.create_index('ix_processing_runs_user_id_id', 'processing_runs', ['user_id', 'id'])
+    op.create_index('ix_processing_runs_status_id', 'processing_runs', ['status', 'id'])
+    op.create_index('ix_processing_runs_created_at', 'processing_runs', ['created_at'])
+    # latest image of a user (RunsAPIAccessor.create_run)
+    op.create_index('ix_input_images_user_id_id', 'input_images', ['user_id', 'id'])
+    # report artifact of a run
+    op.create_index('ix_output_artifacts_run_id_type', 'output_artifacts', ['processing_run_id', 'artifact_type'])
+    # users on a plan (PlansService.delete_plan_hard)
+    op.create_index('ix_users_plan_id', 'users', ['plan_id'])
+    # case-insensitive email lookup (UsersAccessor.get_user_by_email)
+    op.create_index('ix_users_email_lower', 'users', [sa.text('lower(email)')])
+
+
+def downgrade():
+    op.drop_index('ix_users_email_lower', table_name='users')
+    op.drop_index('ix_users_plan_id', table_name='users')
+    op.drop_index('ix_output_artifacts_run_id_type', table_name='output_artifacts')
+    op.drop_index('ix_input_images_user_id_id', table_name='input_images')
+    op.drop_index('ix_processing_runs_created_at', table_name='processing_runs')
+    op.drop_index('ix_processing_runs_status_id', table_name='processing_runs')
+    op.drop_index('ix_processing_runs_user_id_id', table_name='processing_runs')
@@ -0,0 +1,59 @@
+"""store report metadata in reports
+
+Revision ID: 0005_report_metadata
+Revises: 0004_hot_path_indexes
+Create Date: 2026-10-17 00:20:00.000000
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '0005_report_metadata'
+down_revision = '0004_hot_path_indexes'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # the table from 0002 was never written to: recreate it with the metadata columns
+    op.drop_table('reports')
+    op.create_table(
+        'reports',
+        sa.Column('id', sa.BigInteger(), primary_key=True),
+        sa.Column('report_id', sa.String(length=32), nullable=False),
+        sa.Column('run_id', sa.BigInteger(), nullable=True),
+        sa.Column('user_id', sa.BigInteger(), nullable=False),
+        sa.Column('pdf_path', sa.Text(), nullable=False),
+        sa.Column('original_filename', sa.String(length=255), nullable=True),
+        sa.Column('plot_name', sa.String(length=255), nullable=True),
+        sa.Column('sha256', sa.String(length=64), nullable=True),
+        sa.Column('metrics', sa.JSON(), nullable=True),
+        sa.Column('frames', sa.JSON(), nullable=True),
+        sa.Column('assets', sa.JSON(), nullable=True),
+        sa.Column('image_path', sa.Text(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=False, server_default=sa.text("(datetime('now'))")),
+        sa.ForeignKeyConstraint(['run_id'], ['processing_runs.id'], name='reports_run_id_fkey'),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], name='reports_user_id_fkey'),
+        sa.UniqueConstraint('report_id', name='reports_report_id_key'),
+    )
+    # reports of a user, newest first (/app/reports)
+    op.create_index('ix_reports_user_id_created_at', 'reports', ['user_id', 'created_at'])
+    # all reports, newest first (admins)
+    op.create_index('ix_reports_created_at', 'reports', ['created_at'])
+    # report of an async job
+    op.create_index('ix_reports_run_id', 'reports', ['run_id'])
+
+
+def downgrade():
+    op.drop_index('ix_reports_run_id', table_name='reports')
+    op.drop_index('ix_reports_created_at', table_name='reports')
+    op.drop_index('ix_reports_user_id_created_at', table_name='reports')
+    op.drop_table('reports')
+    op.create_table(
+        'reports',
+        sa.Column('id', sa.BigInteger(), primary_key=True),
+        sa.Column('run_id', sa.BigInteger(), nullable=False),
+        sa.Column('pdf_path', sa.Text(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=False, server_default=sa.text("(datetime('now'))")),
+        sa.ForeignKeyConstraint(['run_id'], ['processing_runs.id'], name='reports_run_id_fkey')
+    )
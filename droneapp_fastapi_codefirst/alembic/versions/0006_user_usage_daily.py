@@ -0,0 +1,46 @@
+"""add per-user daily usage rollup
+
+Revision ID: 0006_user_usage_daily
+Revises: 0005_report_metadata
+Create Date: 2026-10-17 00:30:00.000000
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '0006_user_usage_daily'
+down_revision = '0005_report_metadata'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'user_usage_daily',
+        sa.Column('user_id', sa.BigInteger(), nullable=False),
+        sa.Column('day', sa.Date(), nullable=False),
+        sa.Column('runs', sa.Integer(), nullable=False, server_default=sa.text('0')),
+        sa.Column('successes', sa.Integer(), nullable=False, server_default=sa.text('0')),
+        sa.Column('failures', sa.Integer(), nullable=False, server_default=sa.text('0')),
+        sa.Column('bytes_uploaded', sa.BigInteger(), nullable=False, server_default=sa.text('0')),
+        sa.Column('analysis_ms', sa.BigInteger(), nullable=False, server_default=sa.text('0')),
+        sa.PrimaryKeyConstraint('user_id', 'day', name='user_usage_daily_pkey'),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], name='user_usage_daily_user_id_fkey'),
+    )
+    # usage of all users for a period (admin / billing)
+    op.create_index('ix_user_usage_daily_day', 'user_usage_daily', ['day'])
+
+    # backfill run counts from history; bytes and analysis time were not recorded
+    op.execute(
+        "INSERT INTO user_usage_daily (user_id, day, runs, successes, failures, bytes_uploaded, analysis_ms) "
+        "SELECT user_id, date(created_at), count(*), "
+        "sum(CASE WHEN status = 'SUCCESS' THEN 1 ELSE 0 END), "
+        "sum(CASE WHEN status = 'FAILED' THEN 1 ELSE 0 END), 0, 0 "
+        "FROM processing_runs WHERE status IN ('SUCCESS', 'FAILED') "
+        "GROUP BY user_id, date(created_at)"
+    )
+
+
+def downgrade():
+    op.drop_index('ix_user_usage_daily_day', table_name='user_usage_daily')
+    op.drop_table('user_usage_daily')
@@ -0,0 +1,32 @@
+"""add API token revocations
+
+Revision ID: 0007_api_token_revocations
+Revises: 0006_user_usage_daily
+Create Date: 2026-10-17 00:40:00.000000
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '0007_api_token_revocations'
+down_revision = '0006_user_usage_daily'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'api_token_revocations',
+        sa.Column('jti', sa.String(length=32), primary_key=True),
+        sa.Column('user_id', sa.BigInteger(), nullable=False),
+        sa.Column('expires_at', sa.DateTime(), nullable=False),
+        sa.Column('revoked_at', sa.DateTime(), nullable=False, server_default=sa.text("(datetime('now'))")),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], name='api_token_revocations_user_id_fkey')
+    )
+    # denylist sync reads only revocations of unexpired tokens
+    op.create_index('ix_api_token_revocations_expires_at', 'api_token_revocations', ['expires_at'])
+
+
+def downgrade():
+    op.drop_index('ix_api_token_revocations_expires_at', table_name='api_token_revocations')
+    op.drop_table('api_token_revocations')
@@ -0,0 +1,22 @@
+"""index reports by image sha256
+
+Revision ID: 0008_reports_sha256_index
+Revises: 0007_api_token_revocations
+Create Date: 2026-10-17 01:00:00.000000
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '0008_reports_sha256_index'
+down_revision = '0007_api_token_revocations'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # result cache eviction keeps assets that reports of the same image render from
+    op.create_index('ix_reports_sha256', 'reports', ['sha256'])
+
+
+def downgrade():
+    op.drop_index('ix_reports_sha256', table_name='reports')
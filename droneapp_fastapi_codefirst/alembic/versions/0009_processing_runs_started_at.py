@@ -0,0 +1,22 @@
+"""add processing_runs.started_at for reclaiming abandoned jobs
+
+Revision ID: 0009_processing_runs_started_at
+Revises: 0008_reports_sha256_index
+Create Date: 2026-10-17 01:10:00.000000
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '0009_processing_runs_started_at'
+down_revision = '0008_reports_sha256_index'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('processing_runs', sa.Column('started_at', sa.DateTime(), nullable=True))
+
+
+def downgrade():
+    op.drop_column('processing_runs', 'started_at')
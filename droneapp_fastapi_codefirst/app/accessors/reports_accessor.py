@@ -0,0 +1,72 @@
+from datetime import datetime
+from sqlalchemy import and_, func, or_, select
+from sqlalchemy.engine import Row
+from sqlalchemy.orm import Session
+from typing import Any, Dict, List, Optional, Tuple
+from app.models.models import Report
+
+
+def report_meta(report: Report) -> Dict[str, Any]:
+    """Report as the meta dict the PDF builder and templates use."""
+    return {
+        'report_id': report.report_id,
+        'original_filename': report.original_filename,
+        'plot_name': report.plot_name,
+        'metrics': report.metrics or {},
+        'frames': report.frames,
+        'user_id': report.user_id,
+        'sha256': report.sha256,
+        'assets': report.assets or {},
+        'image_path': report.image_path,
+    }
+
+
+class ReportsAccessor:
+    def __init__(self, db: Session):
+        self.db = db
+
+    def get_report(self, report_id: str) -> Optional[Report]:
+        return self.db.query(Report).filter(Report.report_id == report_id).first()
+
+    def get_run_report(self, run_id: int) -> Optional[Report]:
+        return self.db.query(Report).filter(Report.run_id == run_id).first()
+
+    def list_reports_page(
+        self,
+        limit: int,
+        user_id: Optional[int] = None,
+        before: Optional[Tuple[datetime, int]] = None,
+    ) -> List[Row]:
+        """One page of finished reports, newest first, as plain rows.
+
+        Keyset pagination on (created_at, id), served by ix_reports_user_id_created_at
+        (or ix_reports_created_at without a user filter).
+        """
+        query = (
+            select(
+                Report.id,
+                Report.report_id,
+                Report.original_filename,
+                Report.plot_name,
+                Report.metrics,
+                Report.created_at,
+            )
+            .where(Report.metrics.isnot(None))
+            .order_by(Report.created_at.desc(), Report.id.desc())
+            .limit(limit)
+        )
+        if user_id is not None:
+            query = query.where(Report.user_id == user_id)
+        if before is not None:
+            created_at, report_pk = before
+            query = query.where(or_(
+                Report.created_at < created_at,
+                and_(Report.created_at == created_at, Report.id < report_pk),
+            ))
+        return self.db.execute(query).all()
+
+    def count_reports(self, user_id: Optional[int] = None) -> int:
+        query = select(func.count(Report.id)).where(Report.metrics.isnot(None))
+        if user_id is not None:
+            query = query.where(Report.user_id == user_id)
+        return self.db.execute(query).scalar_one()
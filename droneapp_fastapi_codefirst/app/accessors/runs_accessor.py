@@ -1,9 +1,11 @@
 from sqlalchemy.orm import Session, joinedload
 from sqlalchemy.exc import IntegrityError, SQLAlchemyError
 from typing import List
-import traceback
+import logging
 from app.models.models import ProcessingRun, User, InputImage
 
+logger = logging.getLogger(__name__)
+
 
 class RunsAccessor:
     def __init__(self, db: Session):
@@ -47,17 +49,15 @@ class RunsAccessor:
             self.db.add(run)
             self.db.commit()
             self.db.refresh(run)
-            print(f"INFO: Successfully created run ID={run.id} for user_id={user.id}")
+            logger.info(f"created run ID={run.id} for user_id={user.id}")
             return run
         except IntegrityError as e:
             self.db.rollback()
-            print(f"ERROR: IntegrityError when creating run: {e}")
-            traceback.print_exc()
+            logger.exception("IntegrityError when creating run")
             raise ValueError(f"Ошибка сохранения: {str(e)}")
         except SQLAlchemyError as e:
             self.db.rollback()
-            print(f"ERROR: SQLAlchemyError when creating run: {e}")
-            traceback.print_exc()
+            logger.exception("SQLAlchemyError when creating run")
             raise ValueError(f"Ошибка базы данных: {str(e)}")
 
     def list_users(self) -> List[User]:
@@ -1,3 +1,4 @@
+from sqlalchemy import func
 from sqlalchemy.orm import Session, selectinload, joinedload
 from sqlalchemy.exc import IntegrityError
 from typing import List, Optional, Dict, Any
@@ -86,11 +87,11 @@ class UsersAccessor:
         )
         if user:
             return user
-        # Fallback: case-insensitive search (for existing data)
+        # Fallback: case-insensitive search (for existing data), served by ix_users_email_lower
         return (
             self.db.query(User)
             .options(joinedload(User.plan))
-            .filter(User.email.ilike(email_normalized))
+            .filter(func.lower(User.email) == email_normalized)
             .first()
         )
 
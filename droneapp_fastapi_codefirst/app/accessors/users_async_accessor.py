@@ -0,0 +1,28 @@
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload
+from typing import List, Optional
+from app.models.models import User
+
+
+class AsyncUsersAccessor:
+    """Чтение пользователей через AsyncSession (для JSON API).
+
+    Запись остается в UsersAccessor: ее используют синхронные UI-контроллеры.
+    """
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def list_users(self, active_only: bool = True) -> List[User]:
+        query = select(User).options(joinedload(User.plan))
+        if active_only:
+            query = query.where(User.is_active == True)
+        return list((await self.db.scalars(query.order_by(User.id))).all())
+
+    async def get_user(self, user_id: int) -> Optional[User]:
+        return await self.db.scalar(
+            select(User)
+            .options(joinedload(User.plan))
+            .where(User.id == user_id)
+        )
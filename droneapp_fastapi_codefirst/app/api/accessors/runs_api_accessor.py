@@ -1,3 +1,6 @@
+from datetime import datetime
+from sqlalchemy import Select, select
+from sqlalchemy.engine import Row
 from sqlalchemy.orm import Session, joinedload
 from typing import List, Optional
 from app.models.models import ProcessingRun, User, InputImage
@@ -8,6 +11,48 @@ class NotFoundError(Exception):
     pass
 
 
+def runs_page_query(
+    limit: int,
+    before_id: Optional[int] = None,
+    user_id: Optional[int] = None,
+    status: Optional[str] = None,
+    index_type: Optional[str] = None,
+    created_from: Optional[datetime] = None,
+    created_to: Optional[datetime] = None,
+) -> Select:
+    """SELECT for one page of runs (shared by the sync and async accessors).
+
+    Keyset pagination on id: the next page starts below the last id seen,
+    so the cost does not grow with the page number.
+    """
+    query = (
+        select(
+            ProcessingRun.id,
+            ProcessingRun.user_id,
+            User.email.label('user_email'),
+            ProcessingRun.index_type,
+            ProcessingRun.status,
+            ProcessingRun.created_at,
+        )
+        .outerjoin(User, User.id == ProcessingRun.user_id)
+        .order_by(ProcessingRun.id.desc())
+        .limit(limit)
+    )
+    if before_id is not None:
+        query = query.where(ProcessingRun.id < before_id)
+    if user_id is not None:
+        query = query.where(ProcessingRun.user_id == user_id)
+    if status is not None:
+        query = query.where(ProcessingRun.status == status)
+    if index_type is not None:
+        query = query.where(ProcessingRun.index_type == index_type)
+    if created_from is not None:
+        query = query.where(ProcessingRun.created_at >= created_from)
+    if created_to is not None:
+        query = query.where(ProcessingRun.created_at < created_to)
+    return query
+
+
 class RunsAPIAccessor:
     def __init__(self, db: Session):
         self.db = db
@@ -20,6 +65,21 @@ class RunsAPIAccessor:
             .all()
         )
 
+    def list_runs_page(
+        self,
+        limit: int,
+        before_id: Optional[int] = None,
+        user_id: Optional[int] = None,
+        status: Optional[str] = None,
+        index_type: Optional[str] = None,
+        created_from: Optional[datetime] = None,
+        created_to: Optional[datetime] = None,
+    ) -> List[Row]:
+        """One page of runs, newest first, as plain rows (no ORM hydration)."""
+        return self.db.execute(runs_page_query(
+            limit, before_id, user_id, status, index_type, created_from, created_to,
+        )).all()
+
     def get_run(self, run_id: int) -> Optional[ProcessingRun]:
         return (
             self.db.query(ProcessingRun)
@@ -0,0 +1,83 @@
+from datetime import datetime
+from sqlalchemy import select
+from sqlalchemy.engine import Row
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload
+from typing import List, Optional
+from app.models.models import ProcessingRun, User, InputImage
+from app.api.accessors.runs_api_accessor import NotFoundError, runs_page_query
+from app.api.schemas.runs_dto import RunCreateDTO, RunUpdateDTO
+
+
+class AsyncRunsAPIAccessor:
+    """Async counterpart of RunsAPIAccessor for the JSON API (AsyncSession).
+
+    Relationships are never lazy-loaded (that needs I/O outside an await):
+    everything the mappers read is loaded eagerly.
+    """
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def list_runs_page(
+        self,
+        limit: int,
+        before_id: Optional[int] = None,
+        user_id: Optional[int] = None,
+        status: Optional[str] = None,
+        index_type: Optional[str] = None,
+        created_from: Optional[datetime] = None,
+        created_to: Optional[datetime] = None,
+    ) -> List[Row]:
+        """One page of runs, newest first (keyset on id), as plain rows."""
+        return (await self.db.execute(runs_page_query(
+            limit, before_id, user_id, status, index_type, created_from, created_to,
+        ))).all()
+
+    async def get_run(self, run_id: int) -> Optional[ProcessingRun]:
+        return await self.db.scalar(
+            select(ProcessingRun)
+            .options(joinedload(ProcessingRun.user))
+            .where(ProcessingRun.id == run_id)
+        )
+
+    async def create_run(self, dto: RunCreateDTO) -> ProcessingRun:
+        # Validate user exists
+        user = await self.db.get(User, dto.user_id)
+        if not user:
+            raise ValueError("Пользователь не найден")
+
+        # Choose an input_image for the run: try to find any image for the user (newest first)
+        input_image_id = await self.db.scalar(
+            select(InputImage.id)
+            .where(InputImage.user_id == user.id)
+            .order_by(InputImage.id.desc())
+            .limit(1)
+        )
+        if not input_image_id:
+            raise ValueError("У пользователя нет загруженных изображений")
+
+        run = ProcessingRun(
+            user_id=user.id,
+            input_image_id=input_image_id,
+            index_type=dto.index_type.value if hasattr(dto.index_type, 'value') else dto.index_type,
+            status=dto.status.value if hasattr(dto.status, 'value') else dto.status,
+        )
+        self.db.add(run)
+        await self.db.commit()
+        # server defaults (created_at) + user for the mapper
+        await self.db.refresh(run, ['created_at', 'user'])
+        return run
+
+    async def update_run(self, run_id: int, dto: RunUpdateDTO) -> ProcessingRun:
+        run = await self.get_run(run_id)
+        if not run:
+            raise NotFoundError("Run not found")
+
+        if dto.index_type is not None:
+            run.index_type = dto.index_type.value if hasattr(dto.index_type, 'value') else dto.index_type
+        if dto.status is not None:
+            run.status = dto.status.value if hasattr(dto.status, 'value') else dto.status
+
+        await self.db.commit()
+        return run
@@ -0,0 +1,54 @@
+from datetime import date
+from sqlalchemy import func, select
+from sqlalchemy.engine import Row
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List
+from app.models.models import User, UserUsageDaily
+
+
+class AsyncUsageAPIAccessor:
+    """Reads of the user_usage_daily rollup; never touches processing_runs."""
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def list_daily(self, user_id: int, date_from: date, date_to: date) -> List[Row]:
+        """Rollup rows of one user for [date_from, date_to], oldest first (primary key range scan)."""
+        query = (
+            select(
+                UserUsageDaily.day,
+                UserUsageDaily.runs,
+                UserUsageDaily.successes,
+                UserUsageDaily.failures,
+                UserUsageDaily.bytes_uploaded,
+                UserUsageDaily.analysis_ms,
+            )
+            .where(
+                UserUsageDaily.user_id == user_id,
+                UserUsageDaily.day >= date_from,
+                UserUsageDaily.day <= date_to,
+            )
+            .order_by(UserUsageDaily.day)
+        )
+        return (await self.db.execute(query)).all()
+
+    async def list_user_totals(self, date_from: date, date_to: date, limit: int) -> List[Row]:
+        """Per-user totals for [date_from, date_to], heaviest users first (ix_user_usage_daily_day)."""
+        runs = func.sum(UserUsageDaily.runs)
+        query = (
+            select(
+                UserUsageDaily.user_id,
+                User.email.label('user_email'),
+                runs.label('runs'),
+                func.sum(UserUsageDaily.successes).label('successes'),
+                func.sum(UserUsageDaily.failures).label('failures'),
+                func.sum(UserUsageDaily.bytes_uploaded).label('bytes_uploaded'),
+                func.sum(UserUsageDaily.analysis_ms).label('analysis_ms'),
+            )
+            .join(User, User.id == UserUsageDaily.user_id)
+            .where(UserUsageDaily.day >= date_from, UserUsageDaily.day <= date_to)
+            .group_by(UserUsageDaily.user_id, User.email)
+            .order_by(runs.desc(), UserUsageDaily.user_id)
+            .limit(limit)
+        )
+        return (await self.db.execute(query)).all()
@@ -1,11 +1,17 @@
-from fastapi import APIRouter, UploadFile, File, Form, HTTPException, Depends
+from fastapi import APIRouter, UploadFile, File, Form, HTTPException, Depends, Query
 from fastapi.responses import JSONResponse
+from fastapi.concurrency import run_in_threadpool
+import anyio
+import asyncio
 import os
+import shutil
+import time
 import uuid
+import zipfile
 import logging
-from typing import Dict
-from app.services.rgb_analyzer import analyze_image
-from app.services.pdf_report import generate_pdf
+from typing import Any, Dict, List, Optional, Tuple
+from sqlalchemy import insert
+from app.services.rgb_analyzer import ImageTooLarge, analyze_image, aggregate_metrics
 
 logger = logging.getLogger(__name__)
 
@@ -19,15 +25,63 @@ os.makedirs(REPORTS_DIR, exist_ok=True)
 os.makedirs(UPLOADS_DIR, exist_ok=True)
 os.makedirs(TEMP_DIR, exist_ok=True)
 
-# Simple in-memory mapping of report_id -> meta
-REPORTS_META: Dict[str, Dict] = {}
-
 
 from fastapi import Depends
-from app.deps.auth import get_current_user_api
-from app.db import get_db
+from app.deps.auth import get_admin_user_api, get_current_user_api, invalidate_session_user
+from app.db import SessionLocal, get_db
 from sqlalchemy.orm import Session
-from app.models.models import InputImage, ProcessingRun
+from app.models.models import InputImage, ProcessingRun, OutputArtifact, Report
+from app.accessors.reports_accessor import ReportsAccessor, report_meta
+from app.deps.services import get_analysis_pool, get_app_settings, get_cache_service, get_report_renderer, get_result_cache
+from app.services.analysis_pool import AnalysisPool
+from app.services import analysis_jobs
+from app.services.result_cache import AnalysisResultCache, CachedResult
+from app.services.report_renderer import RenderRejected, ReportRenderer
+from app.services.upload_storage import StoredUpload, UploadTooLarge, stream_upload_to_disk
+from app.services.usage_rollup import record_usage
+from app.services.quota_service import QuotaExceeded, QuotaService
+from app.services.metrics import ANALYSIS_POOL_REJECTIONS, ANALYSIS_QUOTA_REJECTIONS, ANALYSIS_SCANS, stage
+
+# Long-poll granularity for GET /api/analyze/jobs/{run_id}?wait=...
+JOB_POLL_INTERVAL = 0.5
+JOB_MAX_WAIT = 60.0
+
+# Upper bound on frames in one POST /api/analyze/batch (files + zip members)
+BATCH_MAX_FRAMES = 500
+ZIP_CONTENT_TYPES = ('application/zip', 'application/x-zip-compressed')
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.tif', '.tiff', '.bmp', '.webp')
+
+
+def _refund_attempts(db: Session, user_id: int, attempts: int = 1) -> None:
+    # the analysis did not produce a report: give the reserved attempts back
+    try:
+        db.rollback()
+        QuotaService(db).refund(user_id, attempts)
+    except Exception:
+        logger.exception(f"quota refund failed user_id={user_id} attempts={attempts}")
+    invalidate_session_user(user_id)
+
+
+async def _refund_attempts_async(db: Session, user_id: int, attempts: int = 1) -> None:
+    # shielded: the refund must also run when the request is being cancelled
+    with anyio.CancelScope(shield=True):
+        await run_in_threadpool(_refund_attempts, db, user_id, attempts)
+
+
+def _quota_exceeded_response(message: str = 'Лимит попыток исчерпан. Перейдите на PRO.') -> JSONResponse:
+    # Offer upgrade to PRO — client/UI will show purchase prompt and redirect to /app/upgrade
+    ANALYSIS_QUOTA_REJECTIONS.inc()
+    return JSONResponse({'offer_upgrade': True, 'upgrade_url': '/app/upgrade', 'message': message}, status_code=402)
+
+
+def _pool_busy_response(pool: AnalysisPool) -> JSONResponse:
+    ANALYSIS_POOL_REJECTIONS.inc()
+    retry_after = pool.retry_after()
+    return JSONResponse(
+        {'detail': 'Analysis workers are busy, retry later', 'retry_after': retry_after},
+        status_code=429,
+        headers={'Retry-After': str(retry_after)},
+    )
 
 
 @router.post('/api/analyze')
@@ -36,100 +90,558 @@ async def analyze(
     plot_name: str = Form(None),
     current_user = Depends(get_current_user_api),
     db: Session = Depends(get_db),
+    pool: AnalysisPool = Depends(get_analysis_pool),
+    result_cache: AnalysisResultCache = Depends(get_result_cache),
+    async_mode: bool = Query(False, alias='async'),
 ):
-    logger.info(f"scan started user_id={current_user.id}")
-    
     # Basic validation
     if file.content_type.split('/')[0] != 'image':
         raise HTTPException(status_code=400, detail='Uploaded file is not an image')
 
-    # Quota check
-    plan_limit = getattr(current_user.plan, 'free_attempts_limit', None)
-    if plan_limit is None:
-        # fallback by name
-        if getattr(current_user.plan, 'name', '').lower() == 'free':
-            plan_limit = 2
-        else:
-            plan_limit = 999
+    # Reserve the attempt up front (one conditional UPDATE, committed at once)
+    try:
+        remaining = await run_in_threadpool(QuotaService(db, get_cache_service()).reserve, current_user.id)
+    except QuotaExceeded:
+        return _quota_exceeded_response()
+    invalidate_session_user(current_user.id)
+
+    try:
+        if async_mode:
+            return await _enqueue_analysis(file, plot_name, current_user, db, remaining)
+
+        if not pool.try_acquire():
+            logger.warning(f"scan rejected, pool saturated user_id={current_user.id}")
+            await _refund_attempts_async(db, current_user.id)
+            return _pool_busy_response(pool)
+        try:
+            return await _run_analysis(file, plot_name, current_user, db, pool, result_cache, remaining)
+        finally:
+            pool.release()
+    except BaseException:
+        await _refund_attempts_async(db, current_user.id)
+        raise
+
+
+@router.post('/api/analyze/batch')
+async def analyze_batch(
+    files: List[UploadFile] = File(...),
+    plot_name: str = Form(None),
+    current_user = Depends(get_current_user_api),
+    db: Session = Depends(get_db),
+    pool: AnalysisPool = Depends(get_analysis_pool),
+):
+    """Analyze a whole flight: many images and/or zip archives of images.
+
+    Attempts for all frames are reserved at once, frames are analyzed in
+    parallel in the analysis pool, rows are bulk-inserted in one transaction
+    (which refunds the failed frames) and a single aggregated flight report
+    is produced.
+    """
+    for file in files:
+        if not _is_zip(file) and file.content_type.split('/')[0] != 'image':
+            raise HTTPException(status_code=400, detail=f'Uploaded file is not an image or zip: {file.filename}')
 
-    remaining = plan_limit - (current_user.free_attempts_used or 0)
+    # cheap pre-check before storing the upload; reserve() below is authoritative
+    quota = QuotaService(db, get_cache_service())
+    remaining = await run_in_threadpool(quota.remaining, current_user.id)
     if remaining <= 0:
-        # Offer upgrade to PRO — client/UI will show purchase prompt and redirect to /app/upgrade
-        return JSONResponse({'offer_upgrade': True, 'upgrade_url': '/app/upgrade', 'message': 'Лимит попыток исчерпан. Перейдите на PRO.'}, status_code=402)
+        return _quota_exceeded_response()
+
+    if not pool.try_acquire():
+        logger.warning(f"batch rejected, pool saturated user_id={current_user.id}")
+        return _pool_busy_response(pool)
+    frames: List[Tuple[str, str]] = []
+    try:
+        try:
+            frames = await _save_batch_frames(files)
+        except UploadTooLarge:
+            max_total_size = get_app_settings()['batch_max_upload_size']
+            raise HTTPException(status_code=413, detail=f'Batch is too large, maximum is {max_total_size // (1024 * 1024)} MB')
+        except (zipfile.BadZipFile, ValueError) as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        if not frames:
+            raise HTTPException(status_code=400, detail='No images found in upload')
+        try:
+            remaining = await run_in_threadpool(quota.reserve, current_user.id, len(frames))
+        except QuotaExceeded:
+            return _quota_exceeded_response(
+                f'Недостаточно попыток: кадров {len(frames)}, осталось {remaining}. Перейдите на PRO.'
+            )
+        invalidate_session_user(current_user.id)
+        try:
+            response = await _run_batch_analysis(frames, plot_name, current_user, db, pool, remaining)
+        except BaseException:
+            await _refund_attempts_async(db, current_user.id, len(frames))
+            raise
+        frames = []  # kept: referenced by InputImage rows
+        return response
+    finally:
+        pool.release()
+        for _, path in frames:
+            _remove_quietly(path)
+
+
+@router.get('/api/analyze/pool', dependencies=[Depends(get_admin_user_api)])
+def analysis_pool_stats(pool: AnalysisPool = Depends(get_analysis_pool)):
+    return pool.stats()
 
-    uid = uuid.uuid4().hex
-    filename = f'{uid}_{file.filename}'
-    upload_path = os.path.join(UPLOADS_DIR, filename)
-    with open(upload_path, 'wb') as fh:
-        fh.write(await file.read())
 
-    # Create InputImage record
+@router.get('/api/analyze/cache', dependencies=[Depends(get_admin_user_api)])
+def analysis_cache_stats(
+    result_cache: AnalysisResultCache = Depends(get_result_cache),
+    db: Session = Depends(get_db),
+):
+    return result_cache.stats(db)
+
+
+@router.get('/api/analyze/jobs/{run_id}')
+async def analysis_job_status(
+    run_id: int,
+    wait: float = Query(0.0, ge=0.0, le=JOB_MAX_WAIT),
+    current_user = Depends(get_current_user_api),
+):
+    """Status of an async analysis; with ?wait=N long-polls up to N seconds for completion."""
+    deadline = time.monotonic() + wait
+    while True:
+        job = await run_in_threadpool(analysis_jobs.get_job_status, run_id)
+        if job is None or (job['user_id'] != current_user.id and current_user.role != 'ADMIN'):
+            raise HTTPException(status_code=404, detail='Job not found')
+        if job['status'] in analysis_jobs.FINAL_STATUSES or time.monotonic() >= deadline:
+            break
+        await asyncio.sleep(JOB_POLL_INTERVAL)
+
+    report_path = job['report_path']
+    report_filename = os.path.basename(report_path) if report_path else None
+    body = {
+        'run_id': job['run_id'],
+        'status': job['status'],
+        'report_id': os.path.splitext(report_filename)[0][len('report_'):] if report_filename else None,
+        'pdf_url': f'/reports/{report_filename}' if report_filename and job['status'] == analysis_jobs.STATUS_SUCCESS else None,
+        'metrics': job['metrics'],
+    }
+    return JSONResponse(body)
+
+
+def _upload_too_large(max_size: int) -> HTTPException:
+    return HTTPException(status_code=413, detail=f'File is too large, maximum is {max_size // (1024 * 1024)} MB')
+
+
+async def _save_upload(file: UploadFile) -> StoredUpload:
+    """Stream the upload to UPLOADS_DIR (constant memory, SHA-256 on the fly)."""
+    max_size = get_app_settings()['max_upload_size']
+    # size is known once the multipart body is parsed: reject before copying anything
+    if file.size is not None and file.size > max_size:
+        raise _upload_too_large(max_size)
+    try:
+        with stage('upload'):
+            return await stream_upload_to_disk(file, UPLOADS_DIR, max_size)
+    except UploadTooLarge:
+        raise _upload_too_large(max_size)
+
+
+async def _enqueue_analysis(file: UploadFile, plot_name, current_user, db: Session, remaining: int):
+    upload = await _save_upload(file)
+    run_id, report_id = await run_in_threadpool(_insert_queued_job, db, current_user.id, upload, plot_name)
+    invalidate_session_user(current_user.id)
+    ANALYSIS_SCANS.inc(mode='async', status='queued')
+
+    logger.info(f"scan queued run_id={run_id} report={report_id} user_id={current_user.id}")
+    return JSONResponse(
+        {
+            'run_id': run_id,
+            'status': analysis_jobs.STATUS_QUEUED,
+            'report_id': report_id,
+            'status_url': f'/api/analyze/jobs/{run_id}',
+            'remaining': remaining,
+        },
+        status_code=202,
+    )
+
+
+def _insert_queued_job(db: Session, user_id: int, upload: StoredUpload, plot_name) -> Tuple[int, str]:
+    """Insert the rows of a queued job in one transaction; (run_id, report_id)."""
+    filename, upload_path = upload.filename, upload.path
+
     input_image = InputImage(
-        user_id=current_user.id,
+        user_id=user_id,
         filename=filename,
         storage_path=upload_path,
     )
     db.add(input_image)
-    db.flush()  # Get the ID without committing
+    db.flush()
 
-    try:
-        metrics, assets = analyze_image(upload_path, TEMP_DIR)
-    except Exception as e:
-        db.rollback()
-        logger.exception(f"scan failed user_id={current_user.id}")
-        raise HTTPException(status_code=500, detail=f'Error analysing image: {e}')
+    processing_run = ProcessingRun(
+        user_id=user_id,
+        input_image_id=input_image.id,
+        index_type='NDVI',  # Default index type for analyze API
+        status=analysis_jobs.STATUS_QUEUED,
+    )
+    db.add(processing_run)
+    db.flush()
 
     report_id = uuid.uuid4().hex
-    report_filename = f'report_{report_id}.pdf'
-    report_path = os.path.join(REPORTS_DIR, report_filename)
-
-    meta = {
-        'report_id': report_id,
-        'original_filename': filename,
-        'plot_name': plot_name,
-        'metrics': metrics,
-        'user_id': current_user.id,
-    }
+    report_path = os.path.join(REPORTS_DIR, f'report_{report_id}.pdf')
+    db.add(OutputArtifact(
+        processing_run_id=processing_run.id,
+        artifact_type=analysis_jobs.REPORT_ARTIFACT,
+        storage_path=report_path,
+    ))
+    # Job parameters travel in the report row; the worker fills in metrics and assets
+    db.add(Report(
+        report_id=report_id,
+        run_id=processing_run.id,
+        user_id=user_id,
+        pdf_path=report_path,
+        original_filename=filename,
+        plot_name=plot_name,
+        sha256=upload.sha256,
+    ))
 
+    # the attempt was reserved on submission; the worker refunds it if the job fails
     try:
-        generate_pdf(report_path, meta, assets, upload_path)
+        with stage('db_commit'):
+            db.commit()
     except Exception as e:
         db.rollback()
-        logger.exception(f"scan failed user_id={current_user.id}")
-        raise HTTPException(status_code=500, detail=f'Error generating PDF: {e}')
+        logger.exception(f"scan enqueue failed user_id={user_id}")
+        raise HTTPException(status_code=500, detail=f'Error queuing analysis: {e}')
+    return processing_run.id, report_id
+
+
+async def _run_analysis(file: UploadFile, plot_name, current_user, db: Session, pool: AnalysisPool, result_cache: AnalysisResultCache, remaining: int):
+    logger.info(f"scan started user_id={current_user.id}")
+
+    upload = await _save_upload(file)
+    input_image_id, cached = await run_in_threadpool(_start_scan, db, result_cache, current_user.id, upload)
+    analysis_started = time.perf_counter()
+    if cached is not None:
+        metrics, assets = cached.metrics, cached.assets
+    else:
+        try:
+            metrics, assets = await pool.run(analyze_image, upload.path, TEMP_DIR)
+        except ImageTooLarge as e:
+            await run_in_threadpool(db.rollback)
+            ANALYSIS_SCANS.inc(mode='single', status='failed')
+            raise HTTPException(status_code=413, detail=str(e))
+        except Exception as e:
+            await run_in_threadpool(db.rollback)
+            ANALYSIS_SCANS.inc(mode='single', status='failed')
+            logger.exception(f"scan failed user_id={current_user.id}")
+            raise HTTPException(status_code=500, detail=f'Error analysing image: {e}')
+    analysis_ms = (time.perf_counter() - analysis_started) * 1000
+
+    report_id, report_path = await run_in_threadpool(
+        _save_scan, db, current_user.id, input_image_id, upload, plot_name, metrics, assets, cached, analysis_ms,
+    )
+    invalidate_session_user(current_user.id)
+    ANALYSIS_SCANS.inc(mode='single', status='success' if cached is None else 'cached')
+
+    if cached is None:
+        await run_in_threadpool(result_cache.store, db, upload.sha256, current_user.id, metrics, assets, report_path)
+
+    pdf_url = f'/reports/{os.path.basename(report_path)}'
+
+    return JSONResponse({'report_id': report_id, 'pdf_url': pdf_url, 'metrics': metrics, 'cached': cached is not None, 'remaining': remaining})
+
+
+def _start_scan(db: Session, result_cache: AnalysisResultCache, user_id: int, upload: StoredUpload) -> Tuple[int, Optional[CachedResult]]:
+    """Insert the InputImage (flushed, not committed) and look the upload up in the result cache."""
+    input_image = InputImage(
+        user_id=user_id,
+        filename=upload.filename,
+        storage_path=upload.path,
+    )
+    db.add(input_image)
+    db.flush()  # Get the ID without committing
+    return input_image.id, result_cache.lookup(db, upload.sha256)
 
-    # Create ProcessingRun record
+
+def _save_scan(
+    db: Session,
+    user_id: int,
+    input_image_id: int,
+    upload: StoredUpload,
+    plot_name,
+    metrics: Dict[str, Any],
+    assets: Dict[str, str],
+    cached: Optional[CachedResult],
+    analysis_ms: float,
+) -> Tuple[str, str]:
+    """Record the run, its report and the usage in one transaction; (report_id, report_path)."""
+    # Create ProcessingRun record (cache hits are recorded as runs too)
     processing_run = ProcessingRun(
-        user_id=current_user.id,
-        input_image_id=input_image.id,
+        user_id=user_id,
+        input_image_id=input_image_id,
         index_type='NDVI',  # Default index type for analyze API
         status='SUCCESS',
     )
     db.add(processing_run)
+    db.flush()
+
+    reused = None
+    if cached is not None and cached.user_id == user_id:
+        # same image from the same user: hand back the report built the first time
+        cached_filename = os.path.basename(cached.report_path)
+        reused = ReportsAccessor(db).get_report(os.path.splitext(cached_filename)[0][len('report_'):])
+    if reused is not None:
+        report_id = reused.report_id
+        report_path = reused.pdf_path
+    else:
+        report_id = uuid.uuid4().hex
+        report_path = os.path.join(REPORTS_DIR, f'report_{report_id}.pdf')
+        # the PDF itself is rendered on the first GET /reports/{filename}
+        db.add(Report(
+            report_id=report_id,
+            run_id=processing_run.id,
+            user_id=user_id,
+            pdf_path=report_path,
+            original_filename=upload.filename,
+            plot_name=plot_name,
+            sha256=upload.sha256,
+            metrics=metrics,
+            assets=assets,
+            image_path=upload.path,
+        ))
+
+    record_usage(db, user_id, successes=1, bytes_uploaded=upload.size, analysis_ms=analysis_ms)
 
-    # increment user's used attempts
-    db.add(current_user)
-    current_user.free_attempts_used = (current_user.free_attempts_used or 0) + 1
-    
     try:
-        db.commit()
-        logger.info(f"scan finished status=SUCCESS report={report_id} user_id={current_user.id}")
+        with stage('db_commit'):
+            db.commit()
+        logger.info(f"scan finished status=SUCCESS cached={cached is not None} report={report_id} user_id={user_id}")
     except Exception as e:
         db.rollback()
-        logger.exception(f"scan failed user_id={current_user.id}")
-        print(f"ERROR: Failed to save ProcessingRun and InputImage: {e}")
-        # Continue anyway - the report was generated
+        ANALYSIS_SCANS.inc(mode='single', status='failed')
+        logger.exception(f"scan failed: could not save report user_id={user_id}")
+        raise HTTPException(status_code=500, detail=f'Error saving report: {e}')
+    return report_id, report_path
+
+
+def _is_zip(file: UploadFile) -> bool:
+    return file.content_type in ZIP_CONTENT_TYPES or (file.filename or '').lower().endswith('.zip')
+
+
+def _file_size(path: str) -> int:
+    try:
+        return os.path.getsize(path)
+    except OSError:
+        return 0
+
+
+def _remove_quietly(path: str) -> None:
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+def _store_frame(src, name: str) -> Tuple[str, str]:
+    filename = f'{uuid.uuid4().hex}_{os.path.basename(name)}'
+    upload_path = os.path.join(UPLOADS_DIR, filename)
+    with open(upload_path, 'wb') as fh:
+        shutil.copyfileobj(src, fh, 1024 * 1024)
+    return filename, upload_path
+
+
+def _extract_zip_frames(src, max_frames: int, max_member_size: int, max_total_size: int) -> List[Tuple[str, str]]:
+    frames: List[Tuple[str, str]] = []
+    try:
+        with zipfile.ZipFile(src) as zf:
+            members = [
+                info for info in zf.infolist()
+                if not info.is_dir() and info.filename.lower().endswith(IMAGE_EXTENSIONS)
+            ]
+            if len(members) > max_frames:
+                raise ValueError(f'Too many frames, at most {BATCH_MAX_FRAMES} per batch')
+            # declared sizes bound what is written: ZipExtFile never reads past file_size
+            if sum(info.file_size for info in members) > max_total_size:
+                raise UploadTooLarge(max_total_size)
+            for info in members:
+                if info.file_size > max_member_size:
+                    raise ValueError(f'Archive member too large: {info.filename}')
+                with zf.open(info) as member:
+                    frames.append(_store_frame(member, info.filename))
+    except Exception:
+        for _, path in frames:
+            _remove_quietly(path)
+        raise
+    return frames
+
+
+async def _save_batch_frames(files: List[UploadFile]) -> List[Tuple[str, str]]:
+    """Write uploaded images and zip members to UPLOADS_DIR as (filename, path).
+
+    UploadTooLarge when the frames add up to more than batch_max_upload_size.
+    """
+    settings = get_app_settings()
+    max_member_size, max_total_size = settings['max_upload_size'], settings['batch_max_upload_size']
+    frames: List[Tuple[str, str]] = []
+    total_size = 0
+    try:
+        for file in files:
+            if _is_zip(file):
+                extracted = await run_in_threadpool(
+                    _extract_zip_frames, file.file, BATCH_MAX_FRAMES - len(frames), max_member_size, max_total_size - total_size
+                )
+                frames.extend(extracted)
+                total_size += sum(_file_size(path) for _, path in extracted)
+            else:
+                if len(frames) >= BATCH_MAX_FRAMES:
+                    raise ValueError(f'Too many frames, at most {BATCH_MAX_FRAMES} per batch')
+                upload = await _save_upload(file)
+                frames.append((upload.filename, upload.path))
+                total_size += upload.size
+                if total_size > max_total_size:
+                    raise UploadTooLarge(max_total_size)
+    except Exception:
+        for _, path in frames:
+            _remove_quietly(path)
+        raise
+    return frames
+
+
+async def _run_batch_analysis(frames: List[Tuple[str, str]], plot_name, current_user, db: Session, pool: AnalysisPool, remaining: int):
+    logger.info(f"batch started frames={len(frames)} user_id={current_user.id}")
+    started = time.perf_counter()
+
+    # the caller holds one pool slot; every extra frame in flight needs a slot of its own,
+    # so the batch only fans out as far as the pool has room for right now
+    extra = pool.acquire_up_to(min(pool.workers, len(frames)) - 1)
+    slots = asyncio.Semaphore(1 + extra)
+
+    async def analyze_frame(upload_path: str):
+        async with slots:
+            try:
+                return await pool.run(analyze_image, upload_path, TEMP_DIR)
+            except Exception as e:
+                logger.warning(f"batch frame failed path={upload_path} user_id={current_user.id}: {e}")
+                return e
+
+    try:
+        results = await asyncio.gather(*(analyze_frame(path) for _, path in frames))
+    finally:
+        pool.release(extra)
+    analysis_seconds = time.perf_counter() - started
+
+    succeeded = [(frame, result) for frame, result in zip(frames, results) if not isinstance(result, Exception)]
+    if not succeeded:
+        raise HTTPException(status_code=500, detail='Error analysing images: no frame could be analysed')
 
-    pdf_url = f'/reports/{report_filename}'
-    REPORTS_META[report_id] = meta
+    flight_metrics = aggregate_metrics([metrics for _, (metrics, _) in succeeded])
+    # the weakest frame illustrates the flight report
+    (worst_filename, worst_path), (_, worst_assets) = min(succeeded, key=lambda item: item[1][0]['health_score'])
+
+    report_id = uuid.uuid4().hex
+    report_filename = f'report_{report_id}.pdf'
+    report_path = os.path.join(REPORTS_DIR, report_filename)
+    frame_rows = [
+        {'filename': filename, 'metrics': result[0]} if not isinstance(result, Exception)
+        else {'filename': filename, 'error': str(result)}
+        for (filename, _), result in zip(frames, results)
+    ]
+
+    failed = len(frames) - len(succeeded)
+
+    def save() -> None:
+        # one transaction: bulk INSERT ... RETURNING for images, then runs, then the flight report
+        try:
+            image_ids = db.scalars(
+                insert(InputImage).returning(InputImage.id, sort_by_parameter_order=True),
+                [{'user_id': current_user.id, 'filename': filename, 'storage_path': path} for filename, path in frames],
+            ).all()
+            run_ids = db.scalars(
+                insert(ProcessingRun).returning(ProcessingRun.id, sort_by_parameter_order=True),
+                [
+                    {
+                        'user_id': current_user.id,
+                        'input_image_id': image_id,
+                        'index_type': 'NDVI',  # Default index type for analyze API
+                        'status': 'FAILED' if isinstance(result, Exception) else 'SUCCESS',
+                    }
+                    for image_id, result in zip(image_ids, results)
+                ],
+            ).all()
+            for row, run_id in zip(frame_rows, run_ids):
+                row['run_id'] = run_id
+                row['status'] = 'FAILED' if 'error' in row else 'SUCCESS'
+            # the PDF itself is rendered on the first GET /reports/{filename}
+            db.add(Report(
+                report_id=report_id,
+                user_id=current_user.id,
+                pdf_path=report_path,
+                original_filename=worst_filename,
+                plot_name=plot_name,
+                metrics=flight_metrics,
+                frames=frame_rows,
+                assets=worst_assets,
+                image_path=worst_path,
+            ))
+            # only analysed frames are charged: refund the failed ones in the same transaction
+            QuotaService(db).refund(current_user.id, failed, commit=False)
+            record_usage(
+                db, current_user.id, successes=len(succeeded), failures=len(frames) - len(succeeded),
+                bytes_uploaded=sum(_file_size(path) for _, path in frames), analysis_ms=analysis_seconds * 1000,
+            )
+            with stage('db_commit'):
+                db.commit()
+        except Exception as e:
+            db.rollback()
+            logger.exception(f"batch failed user_id={current_user.id}")
+            raise HTTPException(status_code=500, detail=f'Error saving batch: {e}')
+
+    await run_in_threadpool(save)
+    invalidate_session_user(current_user.id)
+    ANALYSIS_SCANS.inc(len(succeeded), mode='batch', status='success')
+    if len(frames) > len(succeeded):
+        ANALYSIS_SCANS.inc(len(frames) - len(succeeded), mode='batch', status='failed')
+
+    elapsed = time.perf_counter() - started
+    logger.info(
+        f"batch finished frames={len(frames)} failed={len(frames) - len(succeeded)} "
+        f"fps={len(frames) / analysis_seconds:.2f} report={report_id} user_id={current_user.id}"
+    )
+    return JSONResponse({
+        'report_id': report_id,
+        'pdf_url': f'/reports/{report_filename}',
+        'frames': frame_rows,
+        'metrics': flight_metrics,
+        'frames_total': len(frames),
+        'frames_failed': len(frames) - len(succeeded),
+        'elapsed_seconds': elapsed,
+        'frames_per_second': len(frames) / analysis_seconds if analysis_seconds > 0 else None,
+        'remaining': remaining + failed,
+    })
 
-    return JSONResponse({'report_id': report_id, 'pdf_url': pdf_url, 'metrics': metrics, 'remaining': plan_limit - current_user.free_attempts_used})
+
+def _load_report_meta(report_id: str) -> Optional[Dict[str, Any]]:
+    with SessionLocal() as db:
+        report = ReportsAccessor(db).get_report(report_id)
+        # metrics stay NULL until an async job has finished
+        if report is None or report.metrics is None:
+            return None
+        return report_meta(report)
 
 
 @router.get('/reports/{filename}')
-def get_report(filename: str):
+async def get_report(
+    filename: str,
+    pool: AnalysisPool = Depends(get_analysis_pool),
+    renderer: ReportRenderer = Depends(get_report_renderer),
+):
+    """Download a report PDF, rendering it on the first request."""
     from fastapi.responses import FileResponse
-    report_path = os.path.join(REPORTS_DIR, filename)
-    if not os.path.exists(report_path):
+    if not (filename.startswith('report_') and filename.endswith('.pdf')) or os.path.basename(filename) != filename:
         raise HTTPException(status_code=404, detail='Report not found')
+    try:
+        report_id = filename[len('report_'):-len('.pdf')]
+        report_path = await renderer.get(
+            os.path.join(REPORTS_DIR, filename), pool, lambda: run_in_threadpool(_load_report_meta, report_id),
+        )
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail='Report not found')
+    except RenderRejected:
+        return _pool_busy_response(pool)
+    except Exception as e:
+        logger.exception(f"report render failed report={filename}")
+        raise HTTPException(status_code=500, detail=f'Error generating PDF: {e}')
     return FileResponse(report_path, media_type='application/pdf', filename=filename)
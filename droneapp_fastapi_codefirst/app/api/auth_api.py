@@ -0,0 +1,87 @@
+"""
+API tokens for programmatic clients (e.g. the ground-station uploader).
+
+POST /api/auth/token exchanges email/password for a signed bearer token;
+requests carrying `Authorization: Bearer <token>` are then authenticated by
+get_current_user_api without touching the database. POST
+/api/auth/token/revoke revokes the presented token.
+"""
+from datetime import datetime
+
+from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+
+from app.db import get_db
+from app.deps.auth import get_current_user_api
+from app.deps.services import get_api_token_service, get_password_hasher
+from app.models.models import User
+from app.services.api_tokens import ApiPrincipal, ApiTokenService
+from app.services.password_hasher import LoginThrottled, PasswordHasher
+
+router = APIRouter(prefix='/api/auth', tags=['auth'])
+
+
+class TokenRequest(BaseModel):
+    email: str
+    password: str
+
+
+def _invalid_credentials() -> HTTPException:
+    return HTTPException(status_code=401, detail='Invalid email or password')
+
+
+@router.post('/token')
+async def issue_token(
+    body: TokenRequest,
+    request: Request,
+    db: Session = Depends(get_db),
+    hasher: PasswordHasher = Depends(get_password_hasher),
+    tokens: ApiTokenService = Depends(get_api_token_service),
+):
+    """Issue a bearer token; accounts without a stored password hash must log in via the UI first."""
+    client_ip = request.client.host if request.client else 'unknown'
+    try:
+        with hasher.admit(body.email, client_ip):
+            def load_user():
+                row = db.execute(
+                    select(User.id, User.role, User.plan_id, User.is_active, User.password_hash)
+                    .where(User.email == body.email)
+                ).first()
+                # release the connection while hashing
+                db.rollback()
+                return row
+
+            row = await run_in_threadpool(load_user)
+            if row is None or not row.is_active or row.password_hash in (None, '', 'fakehash'):
+                raise _invalid_credentials()
+            if not await hasher.verify(body.password, row.password_hash):
+                raise _invalid_credentials()
+    except LoginThrottled as e:
+        return JSONResponse(
+            {'detail': 'Too many login attempts, retry later', 'retry_after': e.retry_after},
+            status_code=429,
+            headers={'Retry-After': str(e.retry_after)},
+        )
+
+    token, principal = tokens.issue(row.id, row.role, row.plan_id)
+    return {
+        'access_token': token,
+        'token_type': 'bearer',
+        'expires_in': tokens.ttl_seconds,
+        'expires_at': datetime.utcfromtimestamp(principal.expires_at).isoformat() + 'Z',
+    }
+
+
+@router.post('/token/revoke', status_code=204)
+def revoke_token(
+    current_user: ApiPrincipal = Depends(get_current_user_api),
+    db: Session = Depends(get_db),
+    tokens: ApiTokenService = Depends(get_api_token_service),
+):
+    if current_user.jti is None:
+        raise HTTPException(status_code=400, detail='Not authenticated with a bearer token')
+    tokens.revoke(db, current_user)
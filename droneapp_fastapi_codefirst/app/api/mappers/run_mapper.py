@@ -9,3 +9,8 @@ def map_run_to_dto(run) -> RunReadDTO:
     # Add user_email from related user (joinedload expected)
     data["user_email"] = run.user.email if getattr(run, "user", None) else None
     return RunReadDTO(**data)
+
+
+def map_run_row_to_dto(row) -> RunReadDTO:
+    """Map a projected row (id, user_id, user_email, index_type, status, created_at) -> RunReadDTO."""
+    return RunReadDTO(**row._mapping)
@@ -0,0 +1,48 @@
+"""
+GET /metrics: process metrics in the Prometheus text exposition format.
+
+Not behind the UI login (see UI_PUBLIC_PREFIXES in app.main). A scrape is
+allowed from METRICS_ALLOWED_NETWORKS (loopback by default) or with
+`Authorization: Bearer <METRICS_TOKEN>` when a token is configured. Behind
+a reverse proxy the client address is the proxy's, so use the token there.
+"""
+import hmac
+import ipaddress
+
+from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.responses import PlainTextResponse
+
+from app.db import async_pool_metrics, pool_metrics
+from app.deps.auth import get_admin_user_api, get_bearer_token
+from app.deps.services import get_app_settings
+from app.services.metrics import REGISTRY
+
+router = APIRouter(tags=["metrics"])
+
+# PlainTextResponse appends '; charset=utf-8'
+PROMETHEUS_CONTENT_TYPE = 'text/plain; version=0.0.4'
+
+
+def require_metrics_access(request: Request) -> None:
+    settings = get_app_settings()
+    token = settings['metrics_token']
+    presented = get_bearer_token(request)
+    if token and presented is not None and hmac.compare_digest(presented.encode('utf-8'), token.encode('utf-8')):
+        return
+    try:
+        client = ipaddress.ip_address(request.client.host) if request.client else None
+    except ValueError:
+        client = None
+    if client is not None and any(client in network for network in settings['metrics_allowed_networks']):
+        return
+    raise HTTPException(status_code=403, detail='Metrics are not available from this address')
+
+
+@router.get('/metrics', include_in_schema=False, dependencies=[Depends(require_metrics_access)])
+def metrics():
+    return PlainTextResponse(REGISTRY.render(), media_type=PROMETHEUS_CONTENT_TYPE)
+
+
+@router.get('/api/db/pool', dependencies=[Depends(get_admin_user_api)])
+def db_pool_stats():
+    return {'default': pool_metrics.stats(), 'async': async_pool_metrics.stats()}
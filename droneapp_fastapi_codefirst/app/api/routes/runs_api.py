@@ -1,45 +1,87 @@
-from typing import List
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from app.db import get_db
-from app.api.accessors.runs_api_accessor import RunsAPIAccessor, NotFoundError
-from app.api.mappers.run_mapper import map_run_to_dto
-from app.api.schemas.runs_dto import RunReadDTO, RunCreateDTO, RunUpdateDTO
+import base64
+from datetime import datetime
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.db import get_async_db
+from app.api.accessors.runs_api_accessor import NotFoundError
+from app.api.accessors.runs_api_async_accessor import AsyncRunsAPIAccessor
+from app.api.mappers.run_mapper import map_run_to_dto, map_run_row_to_dto
+from app.api.schemas.runs_dto import RunReadDTO, RunCreateDTO, RunUpdateDTO, RunsPageDTO, RunStatus, IndexType
 
 router = APIRouter(prefix="/api/runs", tags=["runs"])
 
 
-@router.get("/", response_model=List[RunReadDTO])
-def list_runs(db: Session = Depends(get_db)):
-    accessor = RunsAPIAccessor(db)
-    runs = accessor.list_runs()
-    return [map_run_to_dto(r) for r in runs]
+RUNS_PAGE_DEFAULT = 50
+RUNS_PAGE_MAX = 500
+
+
+def _encode_cursor(last_id: int) -> str:
+    return base64.urlsafe_b64encode(f"id:{last_id}".encode()).decode().rstrip("=")
+
+
+def _decode_cursor(cursor: str) -> int:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        prefix, _, value = raw.partition(":")
+        if prefix != "id":
+            raise ValueError(cursor)
+        return int(value)
+    except (ValueError, UnicodeDecodeError):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+
+
+@router.get("/", response_model=RunsPageDTO)
+async def list_runs(
+    db: AsyncSession = Depends(get_async_db),
+    limit: int = Query(RUNS_PAGE_DEFAULT, ge=1, le=RUNS_PAGE_MAX),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    user_id: Optional[int] = None,
+    run_status: Optional[RunStatus] = Query(None, alias="status"),
+    index_type: Optional[IndexType] = None,
+    created_from: Optional[datetime] = None,
+    created_to: Optional[datetime] = None,
+):
+    accessor = AsyncRunsAPIAccessor(db)
+    # one extra row tells whether there is a next page
+    rows = await accessor.list_runs_page(
+        limit + 1,
+        before_id=_decode_cursor(cursor) if cursor else None,
+        user_id=user_id,
+        status=run_status.value if run_status else None,
+        index_type=index_type.value if index_type else None,
+        created_from=created_from,
+        created_to=created_to,
+    )
+    items = [map_run_row_to_dto(r) for r in rows[:limit]]
+    next_cursor = _encode_cursor(items[-1].id) if len(rows) > limit else None
+    return RunsPageDTO(items=items, next_cursor=next_cursor)
 
 
 @router.get("/{run_id}", response_model=RunReadDTO)
-def get_run(run_id: int, db: Session = Depends(get_db)):
-    accessor = RunsAPIAccessor(db)
-    run = accessor.get_run(run_id)
+async def get_run(run_id: int, db: AsyncSession = Depends(get_async_db)):
+    accessor = AsyncRunsAPIAccessor(db)
+    run = await accessor.get_run(run_id)
     if not run:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Run not found")
     return map_run_to_dto(run)
 
 
 @router.post("/", response_model=RunReadDTO, status_code=status.HTTP_201_CREATED)
-def create_run(dto: RunCreateDTO, db: Session = Depends(get_db)):
-    accessor = RunsAPIAccessor(db)
+async def create_run(dto: RunCreateDTO, db: AsyncSession = Depends(get_async_db)):
+    accessor = AsyncRunsAPIAccessor(db)
     try:
-        run = accessor.create_run(dto)
+        run = await accessor.create_run(dto)
     except ValueError as e:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
     return map_run_to_dto(run)
 
 
 @router.put("/{run_id}", response_model=RunReadDTO)
-def update_run(run_id: int, dto: RunUpdateDTO, db: Session = Depends(get_db)):
-    accessor = RunsAPIAccessor(db)
+async def update_run(run_id: int, dto: RunUpdateDTO, db: AsyncSession = Depends(get_async_db)):
+    accessor = AsyncRunsAPIAccessor(db)
     try:
-        run = accessor.update_run(run_id, dto)
+        run = await accessor.update_run(run_id, dto)
     except NotFoundError:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Run not found")
     return map_run_to_dto(run)
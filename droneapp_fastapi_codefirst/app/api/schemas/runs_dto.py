@@ -1,6 +1,6 @@
 from __future__ import annotations
 from datetime import datetime
-from typing import Optional
+from typing import List, Optional
 from enum import Enum
 from pydantic import BaseModel
 
@@ -12,6 +12,7 @@ class IndexType(str, Enum):
 
 class RunStatus(str, Enum):
     QUEUED = "QUEUED"
+    RUNNING = "RUNNING"
     SUCCESS = "SUCCESS"
     FAILED = "FAILED"
 
@@ -28,6 +29,12 @@ class RunReadDTO(BaseModel):
         orm_mode = True
 
 
+class RunsPageDTO(BaseModel):
+    items: List[RunReadDTO]
+    # opaque token for the next page (None on the last page)
+    next_cursor: Optional[str]
+
+
 class RunCreateDTO(BaseModel):
     user_id: int
     index_type: IndexType
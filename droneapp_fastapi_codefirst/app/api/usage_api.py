@@ -0,0 +1,86 @@
+"""
+GET /api/usage: per-user daily usage from the user_usage_daily rollup.
+
+Users see their own usage; admins may pass user_id, and /api/usage/users
+lists per-user totals for billing and the admin dashboard.
+"""
+from datetime import date, datetime, timedelta
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.api.accessors.usage_api_async_accessor import AsyncUsageAPIAccessor
+from app.db import get_async_db
+from app.deps.auth import get_current_user_api
+
+router = APIRouter(prefix='/api/usage', tags=['usage'])
+
+USAGE_DEFAULT_DAYS = 30
+USAGE_MAX_DAYS = 366
+USAGE_USERS_DEFAULT = 50
+USAGE_USERS_MAX = 500
+
+COUNTERS = ('runs', 'successes', 'failures', 'bytes_uploaded', 'analysis_ms')
+
+
+def _period(date_from: Optional[date], date_to: Optional[date]):
+    date_to = date_to or datetime.utcnow().date()
+    date_from = date_from or date_to - timedelta(days=USAGE_DEFAULT_DAYS - 1)
+    if date_from > date_to:
+        raise HTTPException(status_code=400, detail='date_from is after date_to')
+    if (date_to - date_from).days >= USAGE_MAX_DAYS:
+        raise HTTPException(status_code=400, detail=f'Period is longer than {USAGE_MAX_DAYS} days')
+    return date_from, date_to
+
+
+def _require_admin(current_user) -> None:
+    if current_user.role != 'ADMIN':
+        raise HTTPException(status_code=403, detail='Admin only')
+
+
+@router.get('')
+async def get_usage(
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    user_id: Optional[int] = None,
+    current_user = Depends(get_current_user_api),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """Daily usage of the current user (or of user_id, for admins) plus period totals."""
+    if user_id is not None and user_id != current_user.id:
+        _require_admin(current_user)
+    user_id = user_id if user_id is not None else current_user.id
+    date_from, date_to = _period(date_from, date_to)
+
+    rows = await AsyncUsageAPIAccessor(db).list_daily(user_id, date_from, date_to)
+    days = [{'day': r.day.isoformat(), **{name: getattr(r, name) for name in COUNTERS}} for r in rows]
+    return {
+        'user_id': user_id,
+        'date_from': date_from.isoformat(),
+        'date_to': date_to.isoformat(),
+        'days': days,
+        'totals': {name: sum(d[name] for d in days) for name in COUNTERS},
+    }
+
+
+@router.get('/users')
+async def get_usage_by_user(
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    limit: int = Query(USAGE_USERS_DEFAULT, ge=1, le=USAGE_USERS_MAX),
+    current_user = Depends(get_current_user_api),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """Per-user totals for the period, heaviest users first (admins only)."""
+    _require_admin(current_user)
+    date_from, date_to = _period(date_from, date_to)
+    rows = await AsyncUsageAPIAccessor(db).list_user_totals(date_from, date_to, limit)
+    return {
+        'date_from': date_from.isoformat(),
+        'date_to': date_to.isoformat(),
+        'users': [
+            {'user_id': r.user_id, 'user_email': r.user_email, **{name: int(getattr(r, name) or 0) for name in COUNTERS}}
+            for r in rows
+        ],
+    }
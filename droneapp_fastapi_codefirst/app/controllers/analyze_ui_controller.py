@@ -1,11 +1,32 @@
-from fastapi import APIRouter, Request
+from fastapi import APIRouter, Depends, HTTPException, Request
 from fastapi.templating import Jinja2Templates
 from fastapi.responses import HTMLResponse
+from datetime import datetime
+from typing import Optional, Tuple
+import base64
 import os
+from app.accessors.reports_accessor import ReportsAccessor, report_meta
+from app.deps.services import get_stats_service
+from app.services.stats_service import StatsService
 
 router = APIRouter()
 templates = Jinja2Templates(directory=os.path.join(os.getcwd(), 'app', 'templates'))
 
+REPORTS_PAGE_SIZE = 20
+
+
+def _encode_cursor(row) -> str:
+    return base64.urlsafe_b64encode(f"{row.created_at.isoformat()}|{row.id}".encode()).decode().rstrip('=')
+
+
+def _decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+        created_at, _, report_pk = raw.partition('|')
+        return datetime.fromisoformat(created_at), int(report_pk)
+    except (ValueError, UnicodeDecodeError):
+        raise HTTPException(status_code=400, detail='Invalid cursor')
+
 
 @router.get('/app/analyze', response_class=HTMLResponse)
 def analyze_page(request: Request):
@@ -14,53 +35,46 @@ def analyze_page(request: Request):
 
 
 @router.get('/app/dashboard', response_class=HTMLResponse)
-def dashboard(request: Request):
-    from app.accessors.users_accessor import UsersAccessor
-    from app.accessors.runs_accessor import RunsAccessor
+def dashboard(request: Request, stats_service: StatsService = Depends(get_stats_service)):
+    stats = stats_service.get_dashboard_stats()
+    return templates.TemplateResponse('app/dashboard.html', {
+        'request': request,
+        'total_users': stats.total_users,
+        'total_runs': stats.total_runs,
+        'total_reports': stats.total_reports,
+        'runs_by_status': stats.runs_by_status,
+        'runs_by_day': stats.runs_by_day,
+    })
+
+
+@router.get('/app/reports', response_class=HTMLResponse)
+def reports_list(request: Request, cursor: Optional[str] = None):
     from app.db import SessionLocal
 
+    before = _decode_cursor(cursor) if cursor else None
+    user = request.state.user
     db = SessionLocal()
     try:
-        users = UsersAccessor(db).list_users()
-        runs = RunsAccessor(db).list_runs()
-        total_users = len(users)
-        total_runs = len(runs)
+        # admins see every report, users their own
+        rows = ReportsAccessor(db).list_reports_page(
+            REPORTS_PAGE_SIZE + 1,
+            user_id=None if user.role == 'ADMIN' else user.id,
+            before=before,
+        )
     finally:
         db.close()
-
-    # count reports
-    reports_dir = os.path.join(os.getcwd(), 'reports')
-    total_reports = 0
-    try:
-        total_reports = len([f for f in os.listdir(reports_dir) if f.endswith('.pdf')])
-    except Exception:
-        total_reports = 0
-
-    return templates.TemplateResponse('app/dashboard.html', {'request': request, 'total_users': total_users, 'total_runs': total_runs, 'total_reports': total_reports})
-
-
-@router.get('/app/reports', response_class=HTMLResponse)
-def reports_list(request: Request):
-    reports_dir = os.path.join(os.getcwd(), 'reports')
-    entries = []
-    if os.path.exists(reports_dir):
-        for fname in sorted(os.listdir(reports_dir), reverse=True):
-            if not fname.endswith('.pdf'):
-                continue
-            meta = None
-            json_path = os.path.join(reports_dir, os.path.splitext(fname)[0] + '.json')
-            if os.path.exists(json_path):
-                try:
-                    import json
-
-                    with open(json_path, 'r') as fh:
-                        meta = json.load(fh)
-                except Exception:
-                    meta = None
-            entries.append({'filename': fname, 'meta': meta})
-    # show last 20
-    entries = entries[:20]
-    return templates.TemplateResponse('app/reports.html', {'request': request, 'reports': entries})
+    entries = [
+        {
+            'report_id': r.report_id,
+            'filename': f'report_{r.report_id}.pdf',
+            'original_filename': r.original_filename,
+            'metrics': r.metrics,
+            'created_at': r.created_at,
+        }
+        for r in rows[:REPORTS_PAGE_SIZE]
+    ]
+    next_cursor = _encode_cursor(rows[REPORTS_PAGE_SIZE - 1]) if len(rows) > REPORTS_PAGE_SIZE else None
+    return templates.TemplateResponse('app/reports.html', {'request': request, 'reports': entries, 'next_cursor': next_cursor})
 
 
 @router.get('/app/upgrade', response_class=HTMLResponse)
@@ -70,16 +84,15 @@ def upgrade_page(request: Request):
 
 @router.get('/app/reports/{report_id}', response_class=HTMLResponse)
 def report_page(request: Request, report_id: str):
-    # Try in-memory meta first, else try to read JSON file next to the PDF
-    from app.api.analyze_api import REPORTS_META
-    meta = REPORTS_META.get(report_id)
-    if not meta:
-        import os, json
-        meta_path = os.path.join(os.getcwd(), 'reports', f'report_{report_id}.json')
-        if os.path.exists(meta_path):
-            try:
-                with open(meta_path, 'r') as fh:
-                    meta = json.load(fh)
-            except Exception:
-                meta = None
+    from app.db import SessionLocal
+
+    user = request.state.user
+    meta = None
+    db = SessionLocal()
+    try:
+        report = ReportsAccessor(db).get_report(report_id)
+        if report is not None and report.metrics is not None and (user.role == 'ADMIN' or report.user_id == user.id):
+            meta = report_meta(report)
+    finally:
+        db.close()
     return templates.TemplateResponse('app/report.html', {'request': request, 'meta': meta, 'report_id': report_id})
@@ -3,8 +3,11 @@ from fastapi.responses import RedirectResponse
 from fastapi.templating import Jinja2Templates
 from app.db import get_db
 from app.accessors.users_accessor import UsersAccessor
-from app.deps.auth import verify_password, hash_password
 from app.db import SessionLocal
+from app.deps.services import get_password_hasher
+from app.services.password_hasher import LoginThrottled, PasswordHasher
+from starlette.concurrency import run_in_threadpool
+from sqlalchemy import select, update
 
 templates = Jinja2Templates(directory='app/templates')
 router = APIRouter()
@@ -15,48 +18,67 @@ def login_page(request: Request):
     return templates.TemplateResponse('auth/login.html', {'request': request, 'error': None})
 
 
-@router.post('/auth/login')
-async def login_post(request: Request, email: str = Form(...), password: str = Form(...)):
+def _login_error(request: Request, error: str, status_code: int = 401, headers: dict = None):
+    return templates.TemplateResponse('auth/login.html', {'request': request, 'error': error}, status_code=status_code, headers=headers)
+
+
+def _load_login_user(email: str):
+    """(id, role, is_active, password_hash) of the account or None; own session per threadpool call."""
     from app.models.models import User
+    with SessionLocal() as db:
+        return db.execute(
+            select(User.id, User.role, User.is_active, User.password_hash).where(User.email == email)
+        ).first()
 
-    db = SessionLocal()
+
+def _store_password_hash(user_id: int, password_hash: str) -> None:
+    from app.models.models import User
+    with SessionLocal() as db:
+        db.execute(update(User).where(User.id == user_id).values(password_hash=password_hash))
+        db.commit()
+
+
+@router.post('/auth/login')
+async def login_post(
+    request: Request,
+    email: str = Form(...),
+    password: str = Form(...),
+    hasher: PasswordHasher = Depends(get_password_hasher),
+):
+    client_ip = request.client.host if request.client else 'unknown'
     try:
-        user = db.query(User).filter(User.email == email).first()
-    finally:
-        db.close()
-
-    if not user:
-        return templates.TemplateResponse('auth/login.html', {'request': request, 'error': 'Пользователь не найден'}, status_code=401)
-
-    if not user.is_active:
-        return templates.TemplateResponse('auth/login.html', {'request': request, 'error': 'Пользователь не активен'}, status_code=401)
-
-    # password verification
-    ok = False
-    if user.password_hash and user.password_hash not in ("", "fakehash"):
-        ok = verify_password(password, user.password_hash)
-    else:
-        # demo mode: allow 'admin' for ADMIN and 'user' for USER
-        if user.role == 'ADMIN' and password == 'admin':
-            ok = True
-        if user.role == 'USER' and password == 'user':
-            ok = True
-        if ok:
-            # store hashed password for future
-            try:
-                db = SessionLocal()
-                u_db = db.get(type(user), user.id)
-                u_db.password_hash = hash_password(password)
-                db.add(u_db)
-                db.commit()
-            finally:
-                db.close()
+        with hasher.admit(email, client_ip):
+            # each DB step opens its own session (the connection is not held while hashing);
+            # pbkdf2 runs in the hasher's pool
+            user = await run_in_threadpool(_load_login_user, email)
+            if not user:
+                return _login_error(request, 'Пользователь не найден')
+            if not user.is_active:
+                return _login_error(request, 'Пользователь не активен')
+            user_id, role, password_hash = user.id, user.role, user.password_hash
+
+            # password verification
+            ok = False
+            if password_hash and password_hash not in ("", "fakehash"):
+                ok = await hasher.verify(password, password_hash)
+            else:
+                # demo mode: allow 'admin' for ADMIN and 'user' for USER
+                if role == 'ADMIN' and password == 'admin':
+                    ok = True
+                if role == 'USER' and password == 'user':
+                    ok = True
+                if ok:
+                    # store hashed password for future
+                    new_hash = await hasher.hash(password)
+                    await run_in_threadpool(_store_password_hash, user_id, new_hash)
+    except LoginThrottled as e:
+        return _login_error(request, 'Слишком много попыток входа, повторите позже', status_code=429, headers={'Retry-After': str(e.retry_after)})
 
     if not ok:
-        return templates.TemplateResponse('auth/login.html', {'request': request, 'error': 'Неверный пароль'}, status_code=401)
+        return _login_error(request, 'Неверный пароль')
 
     # success - set session
-    request.session['user_id'] = user.id
+    request.session['user_id'] = user_id
     return RedirectResponse(url='/app/dashboard', status_code=303)
 
 
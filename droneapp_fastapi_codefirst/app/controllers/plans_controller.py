@@ -16,9 +16,12 @@ def _get_accessor(db: Session) -> UsersAccessor:
 
 
 @router.get("/")
-def plans_index(request: Request, db: Session = Depends(get_db)):
-    accessor = _get_accessor(db)
-    plans = accessor.list_plans()
+def plans_index(
+    request: Request,
+    db: Session = Depends(get_db),
+    plans_service: PlansService = Depends(get_plans_service),
+):
+    plans = plans_service.list_plans()
     
     # Get user count for each plan
     from app.models.models import User
@@ -51,7 +54,11 @@ def plans_create(request: Request, db: Session = Depends(get_db)):
 
 
 @router.post("/create")
-async def plans_create_post(request: Request, db: Session = Depends(get_db)):
+async def plans_create_post(
+    request: Request,
+    db: Session = Depends(get_db),
+    plans_service: PlansService = Depends(get_plans_service),
+):
     accessor = _get_accessor(db)
     errors = []
 
@@ -85,6 +92,7 @@ async def plans_create_post(request: Request, db: Session = Depends(get_db)):
 
     try:
         accessor.create_plan(payload)
+        plans_service.invalidate_cache()
     except ValueError as exc:
         errors.append(str(exc))
         return templates.TemplateResponse(
@@ -117,8 +125,7 @@ def plan_delete(
     except ValueError as exc:
         error_msg = str(exc)
         # Для отображения ошибки нужно загрузить планы и статистику
-        accessor = _get_accessor(db)
-        plans = accessor.list_plans()
+        plans = plans_service.list_plans()
         from app.models.models import User
         plan_stats = {}
         for plan in plans:
@@ -4,7 +4,7 @@ from fastapi.templating import Jinja2Templates
 from sqlalchemy.orm import Session
 from sqlalchemy.exc import IntegrityError, SQLAlchemyError
 from pydantic import ValidationError
-import traceback
+import logging
 
 from app.db import get_db
 from app.accessors.runs_accessor import RunsAccessor
@@ -14,6 +14,7 @@ from app.viewmodels.run_vm import RunViewModel
 
 templates = Jinja2Templates(directory="app/templates")
 router = APIRouter(prefix="/runs", tags=["Runs"])
+logger = logging.getLogger(__name__)
 
 
 def _get_accessor(db: Session) -> RunsAccessor:
@@ -69,10 +70,7 @@ async def runs_create_post(request: Request, db: Session = Depends(get_db)):
         payload["user_id"] = int(payload["user_id"]) if payload["user_id"] not in (None, "") else None
         form_data = RunViewModel(**payload)
     except (ValidationError, ValueError) as e:
-        error_msg = str(e)
-        print(f"ERROR: Validation error when creating run: {error_msg}")
-        print(f"ERROR: Payload was: {payload}")
-        traceback.print_exc()
+        logger.warning(f"validation error when creating run: {e}; payload={payload}")
         errors.append("Проверьте корректность введённых данных (user/index_type/status).")
         return templates.TemplateResponse(
             "runs/create.html",
@@ -86,13 +84,10 @@ async def runs_create_post(request: Request, db: Session = Depends(get_db)):
         )
 
     try:
-        print(f"INFO: Creating run with data: {form_data.dict()}")
+        logger.debug(f"creating run with data: {form_data.dict()}")
         accessor.create_run(form_data.dict())
-        print(f"INFO: Run created successfully")
     except ValueError as exc:
-        error_msg = str(exc)
-        print(f"ERROR: ValueError when creating run: {error_msg}")
-        traceback.print_exc()
+        logger.warning(f"run not created: {exc}")
         errors.append(str(exc))
         return templates.TemplateResponse(
             "runs/create.html",
@@ -106,8 +101,7 @@ async def runs_create_post(request: Request, db: Session = Depends(get_db)):
         )
     except (IntegrityError, SQLAlchemyError) as exc:
         error_msg = str(exc)
-        print(f"ERROR: Database error when creating run: {error_msg}")
-        traceback.print_exc()
+        logger.exception("database error when creating run")
         errors.append(f"Ошибка базы данных: {error_msg}")
         return templates.TemplateResponse(
             "runs/create.html",
@@ -121,8 +115,7 @@ async def runs_create_post(request: Request, db: Session = Depends(get_db)):
         )
     except Exception as exc:
         error_msg = str(exc)
-        print(f"ERROR: Unexpected error when creating run: {error_msg}")
-        traceback.print_exc()
+        logger.exception("unexpected error when creating run")
         errors.append(f"Неожиданная ошибка: {error_msg}")
         return templates.TemplateResponse(
             "runs/create.html",
@@ -7,8 +7,10 @@ from pydantic import ValidationError
 from app.accessors.users_accessor import UsersAccessor
 from app.db import get_db
 from app.viewmodels.user_vm import UserViewModel
-from app.deps.services import get_users_service
+from app.deps.auth import load_session_user
+from app.deps.services import get_users_service, get_plans_service
 from app.services.users_service import UsersService
+from app.services.plans_service import PlansService
 
 templates = Jinja2Templates(directory="app/templates")
 router = APIRouter(prefix="/users", tags=["Users"])
@@ -19,11 +21,14 @@ def _get_accessor(db: Session) -> UsersAccessor:
 
 
 @router.get("/")
-def users_index(request: Request, db: Session = Depends(get_db)):
-    accessor = _get_accessor(db)
-    # Показываем всех пользователей (включая неактивных) для управления
-    users = accessor.list_users(active_only=False)
-    plans = accessor.list_plans()
+def users_index(
+    request: Request,
+    users_service: UsersService = Depends(get_users_service),
+    plans_service: PlansService = Depends(get_plans_service),
+):
+    # Показываем всех пользователей (включая неактивных) для управления; списки кэшируются
+    users = users_service.list_users(active_only=False)
+    plans = plans_service.list_plans()
     return templates.TemplateResponse(
         "users/index.html",
         {
@@ -52,7 +57,11 @@ def users_create(request: Request, db: Session = Depends(get_db)):
 
 
 @router.post("/create")
-async def users_create_post(request: Request, db: Session = Depends(get_db)):
+async def users_create_post(
+    request: Request,
+    db: Session = Depends(get_db),
+    users_service: UsersService = Depends(get_users_service),
+):
     accessor = _get_accessor(db)
     plans = accessor.list_plans()
     errors = []
@@ -152,6 +161,7 @@ async def users_create_post(request: Request, db: Session = Depends(get_db)):
 
     try:
         accessor.create_user(form_data.dict())
+        users_service.invalidate_cache()
     except ValueError as exc:
         error_msg = str(exc)
         errors.append(error_msg)
@@ -187,9 +197,8 @@ async def users_create_post(request: Request, db: Session = Depends(get_db)):
 
 
 @router.get("/{user_id}")
-def user_details(user_id: int, request: Request, db: Session = Depends(get_db)):
-    accessor = _get_accessor(db)
-    user = accessor.get_user(user_id)
+def user_details(user_id: int, request: Request, users_service: UsersService = Depends(get_users_service)):
+    user = users_service.get_user(user_id)
     if not user:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Пользователь не найден")
     return templates.TemplateResponse(
@@ -217,7 +226,12 @@ def user_edit(user_id: int, request: Request, db: Session = Depends(get_db)):
 
 
 @router.post("/{user_id}/edit")
-async def user_edit_post(user_id: int, request: Request, db: Session = Depends(get_db)):
+async def user_edit_post(
+    user_id: int,
+    request: Request,
+    db: Session = Depends(get_db),
+    users_service: UsersService = Depends(get_users_service),
+):
     accessor = _get_accessor(db)
     plans = accessor.list_plans()
     errors = []
@@ -302,17 +316,12 @@ async def user_edit_post(user_id: int, request: Request, db: Session = Depends(g
 
     try:
         updated_user = accessor.update_user(user_id, form_data.dict())
+        # also drops the cached session snapshots ("users:session:*")
+        users_service.invalidate_cache()
         # If current user updated their own plan, refresh session data
         if hasattr(request.state, 'user') and request.state.user and request.state.user.id == user_id:
-            # Reload user with plan relationship for session
-            from sqlalchemy.orm import joinedload
-            from app.models.models import User as UserModel
-            refreshed_user = db.query(UserModel).options(joinedload(UserModel.plan)).filter(UserModel.id == user_id).first()
+            refreshed_user = load_session_user(user_id)
             if refreshed_user:
-                # Access plan to trigger eager load before session closes
-                if refreshed_user.plan:
-                    _ = refreshed_user.plan.name
-                db.expunge(refreshed_user)
                 request.state.user = refreshed_user
     except ValueError as exc:
         errors.append(str(exc))
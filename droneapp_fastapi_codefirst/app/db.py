@@ -1,18 +1,132 @@
 import os
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.orm import Session
 from dotenv import load_dotenv
 
+from app.services.db_pool_metrics import InstrumentedAsyncQueuePool, InstrumentedQueuePool, PoolMetrics
+
 load_dotenv()
 
 DATABASE_URL = os.getenv('DATABASE_URL')
 if not DATABASE_URL:
     raise RuntimeError('DATABASE_URL not set in .env')
 
-engine = create_engine(DATABASE_URL, future=True)
+
+def _env_bool(name: str, default: bool) -> bool:
+    value = os.getenv(name)
+    if value is None:
+        return default
+    return value.lower() in ('1', 'true', 'yes')
+
+
+# Настройки пула соединений (переопределяются через окружение)
+DB_POOL_SIZE = int(os.getenv('DB_POOL_SIZE', '5'))
+DB_MAX_OVERFLOW = int(os.getenv('DB_MAX_OVERFLOW', '10'))
+DB_POOL_TIMEOUT = float(os.getenv('DB_POOL_TIMEOUT', '30'))
+DB_POOL_RECYCLE = int(os.getenv('DB_POOL_RECYCLE', '1800'))  # -1 = не пересоздавать
+DB_POOL_PRE_PING = _env_bool('DB_POOL_PRE_PING', True)
+# Предупреждение в лог, когда занято >= этой доли соединений (size + overflow)
+DB_POOL_WARN_RATIO = float(os.getenv('DB_POOL_WARN_RATIO', '0.8'))
+# Лимит времени выполнения запроса (PostgreSQL statement_timeout), 0 = без лимита
+DB_STATEMENT_TIMEOUT_MS = int(os.getenv('DB_STATEMENT_TIMEOUT_MS', '0'))
+# SQLite: ожидание снятия блокировки записи и режим журнала
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv('SQLITE_BUSY_TIMEOUT_MS', '5000'))
+SQLITE_JOURNAL_MODE = os.getenv('SQLITE_JOURNAL_MODE', 'WAL')
+
+
+def _is_sqlite_memory(url) -> bool:
+    return url.database in (None, '', ':memory:') or url.query.get('mode') == 'memory'
+
+
+def async_database_url(database_url: str) -> str:
+    """
+    URL для AsyncEngine: тот же сервер через асинхронный драйвер
+    (asyncpg для PostgreSQL, aiosqlite для SQLite).
+    """
+    url = make_url(database_url)
+    backend = url.get_backend_name()
+    if backend == 'postgresql':
+        url = url.set(drivername='postgresql+asyncpg')
+    elif backend == 'sqlite':
+        url = url.set(drivername='sqlite+aiosqlite')
+    else:
+        raise RuntimeError(f'No async driver configured for {backend}; set ASYNC_DATABASE_URL')
+    return url.render_as_string(hide_password=False)
+
+
+def engine_options(database_url: str, poolclass=InstrumentedQueuePool) -> dict:
+    """
+    Параметры create_engine / create_async_engine для URL.
+
+    Для PostgreSQL statement_timeout передается в параметры соединения,
+    для SQLite соединения разрешено передавать между потоками
+    (check_same_thread=False), in-memory база остается на пуле по умолчанию.
+    """
+    url = make_url(database_url)
+    options = {'pool_pre_ping': DB_POOL_PRE_PING}
+    connect_args = {}
+    if url.get_backend_name() == 'sqlite':
+        connect_args['check_same_thread'] = False
+        if _is_sqlite_memory(url):
+            options['connect_args'] = connect_args
+            return options
+    elif url.get_backend_name() == 'postgresql' and DB_STATEMENT_TIMEOUT_MS > 0:
+        if url.get_driver_name() == 'asyncpg':
+            connect_args['server_settings'] = {'statement_timeout': str(DB_STATEMENT_TIMEOUT_MS)}
+        else:
+            connect_args['options'] = f'-c statement_timeout={DB_STATEMENT_TIMEOUT_MS}'
+    options.update(
+        poolclass=poolclass,
+        pool_size=DB_POOL_SIZE,
+        max_overflow=DB_MAX_OVERFLOW,
+        pool_timeout=DB_POOL_TIMEOUT,
+        pool_recycle=DB_POOL_RECYCLE,
+        connect_args=connect_args,
+    )
+    return options
+
+
+def _configure_sqlite_connection(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    try:
+        cursor.execute(f'PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}')
+        if SQLITE_JOURNAL_MODE:
+            cursor.execute(f'PRAGMA journal_mode={SQLITE_JOURNAL_MODE}')
+            if SQLITE_JOURNAL_MODE.upper() == 'WAL':
+                # в режиме WAL synchronous=NORMAL не теряет целостность, fsync реже
+                cursor.execute('PRAGMA synchronous=NORMAL')
+    finally:
+        cursor.close()
+
+
+engine = create_engine(DATABASE_URL, future=True, **engine_options(DATABASE_URL))
+if engine.dialect.name == 'sqlite' and not _is_sqlite_memory(engine.url):
+    event.listen(engine, 'connect', _configure_sqlite_connection)
+
+pool_metrics = PoolMetrics('default', warn_ratio=DB_POOL_WARN_RATIO)
+pool_metrics.attach(engine)
+
 SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False, class_=Session)
 
+# Асинхронный стек для JSON API (/api/runs, /api/users): запросы не занимают
+# поток threadpool, пока ждут БД. Пул отдельный, с теми же настройками.
+ASYNC_DATABASE_URL = os.getenv('ASYNC_DATABASE_URL') or async_database_url(DATABASE_URL)
+async_engine = create_async_engine(
+    ASYNC_DATABASE_URL, **engine_options(ASYNC_DATABASE_URL, poolclass=InstrumentedAsyncQueuePool)
+)
+if async_engine.dialect.name == 'sqlite' and not _is_sqlite_memory(async_engine.url):
+    event.listen(async_engine.sync_engine, 'connect', _configure_sqlite_connection)
+
+async_pool_metrics = PoolMetrics('async', warn_ratio=DB_POOL_WARN_RATIO)
+async_pool_metrics.attach(async_engine.sync_engine)
+
+# expire_on_commit=False: после commit атрибуты читаются без ленивой загрузки,
+# которая в async-сессии недоступна
+AsyncSessionLocal = async_sessionmaker(bind=async_engine, autoflush=False, expire_on_commit=False, class_=AsyncSession)
+
 
 def get_db():
     db = SessionLocal()
@@ -20,3 +134,8 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
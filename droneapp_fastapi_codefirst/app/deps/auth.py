@@ -1,9 +1,11 @@
 from typing import Optional
 from fastapi import Request, HTTPException, Depends
 from passlib.context import CryptContext
-from app.db import get_db
+from app.db import get_db, SessionLocal
 from app.models.models import User
-from sqlalchemy.orm import Session
+from app.services.api_tokens import ApiPrincipal, InvalidToken
+from app.services.snapshots import UserSnapshot
+from sqlalchemy.orm import Session, joinedload
 
 pwd_context = CryptContext(schemes=["pbkdf2_sha256", "bcrypt"], deprecated="auto")
 
@@ -23,14 +25,39 @@ def get_user_from_session(request: Request) -> Optional[int]:
     return request.session.get("user_id")
 
 
-def get_current_user_api(request: Request, db: Session = Depends(get_db)):
+def get_bearer_token(request: Request) -> Optional[str]:
+    scheme, _, token = request.headers.get("authorization", "").partition(" ")
+    if scheme.lower() != "bearer" or not token.strip():
+        return None
+    return token.strip()
+
+
+def get_current_user_api(request: Request) -> ApiPrincipal:
+    """
+    Вызывающий /api: из подписанного Bearer-токена (без обращения к БД)
+    или, для браузера, из сессии (кэшированный снимок пользователя).
+    """
+    token = get_bearer_token(request)
+    if token is not None:
+        from app.deps.services import get_api_token_service
+        try:
+            return get_api_token_service().verify(token)
+        except InvalidToken as e:
+            raise HTTPException(status_code=401, detail=f"Invalid token: {e}", headers={"WWW-Authenticate": "Bearer"})
     user_id = get_user_from_session(request)
     if not user_id:
         raise HTTPException(status_code=401, detail="Not authenticated")
-    user = db.get(User, user_id)
+    user = load_session_user(user_id)
     if not user:
         raise HTTPException(status_code=401, detail="User not found")
-    return user
+    return ApiPrincipal(id=user.id, role=user.role, plan_id=user.plan_id)
+
+
+def get_admin_user_api(current_user: ApiPrincipal = Depends(get_current_user_api)) -> ApiPrincipal:
+    """get_current_user_api, ограниченный ролью ADMIN (служебная статистика /api)."""
+    if current_user.role != "ADMIN":
+        raise HTTPException(status_code=403, detail="Admin only")
+    return current_user
 
 
 def get_current_user_optional(request: Request, db: Session = Depends(get_db)):
@@ -38,3 +65,38 @@ def get_current_user_optional(request: Request, db: Session = Depends(get_db)):
     if not user_id:
         return None
     return db.get(User, user_id)
+
+
+# Снимок пользователя для UI (request.state.user) кэшируется в общем MemoryCacheService.
+# Ключ в пространстве "users:", поэтому remove_by_prefix("users:") при изменении
+# пользователей/планов сбрасывает и его.
+SESSION_USER_TTL = 30
+
+
+def session_user_key(user_id: int) -> str:
+    return f"users:session:{user_id}"
+
+
+def get_cached_session_user(user_id: int) -> Optional[UserSnapshot]:
+    from app.deps.services import get_cache_service
+    return get_cache_service().get(session_user_key(user_id))
+
+
+def load_session_user(user_id: int) -> Optional[UserSnapshot]:
+    """Снимок пользователя (вместе с планом) из кэша, при промахе — из БД."""
+    user = get_cached_session_user(user_id)
+    if user is not None:
+        return user
+    with SessionLocal() as db:
+        orm_user = db.query(User).options(joinedload(User.plan)).filter(User.id == user_id).first()
+        user = UserSnapshot.from_orm(orm_user) if orm_user else None
+    if user is not None:
+        from app.deps.services import get_cache_service
+        get_cache_service().set(session_user_key(user_id), user, ttl_seconds=SESSION_USER_TTL)
+    return user
+
+
+def invalidate_session_user(user_id: int) -> None:
+    """Сбрасывает кэшированный снимок (например, после списания попытки)."""
+    from app.deps.services import get_cache_service
+    get_cache_service().remove(session_user_key(user_id))
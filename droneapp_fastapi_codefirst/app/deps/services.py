@@ -6,14 +6,23 @@ Dependency Injection (DI) слой для сервисов и accessors.
 - Scoped: создается один раз на HTTP запрос (например, DB session)
 - Transient: создается новый экземпляр при каждом вызове dependency (например, сервисы)
 """
+import ipaddress
+import os
 from functools import lru_cache
 from fastapi import Depends
 from sqlalchemy.orm import Session
-from app.db import get_db
+from app.db import SessionLocal, get_db
 from app.accessors.users_accessor import UsersAccessor
 from app.services.users_service import UsersService
 from app.services.plans_service import PlansService
+from app.services.stats_service import StatsService
 from app.services.cache_service import MemoryCacheService
+from app.services.analysis_pool import AnalysisPool
+from app.services.metrics import ANALYSIS_IN_FLIGHT, ANALYSIS_QUEUE_DEPTH
+from app.services.result_cache import AnalysisResultCache
+from app.services.report_renderer import ReportRenderer
+from app.services.password_hasher import PasswordHasher
+from app.services.api_tokens import ApiTokenService
 
 
 # ============================================================================
@@ -47,10 +56,10 @@ def get_users_service(
     Dependency для получения UsersService.
     
     Lifetime: Transient (создается новый экземпляр при каждом вызове)
-    Зависит от UsersAccessor.
+    Зависит от UsersAccessor и singleton-кэша (кэшируются снимки UserSnapshot,
+    а не ORM-объекты, поэтому они переживают закрытие Session).
     """
-    # Временно отключаем кэш из-за проблем с SQLAlchemy объектами
-    return UsersService(accessor, cache_service=None)
+    return UsersService(accessor, cache_service=get_cache_service())
 
 
 def get_plans_service(
@@ -60,10 +69,21 @@ def get_plans_service(
     Dependency для получения PlansService.
     
     Lifetime: Transient (создается новый экземпляр при каждом вызове)
-    Получает DB сессию напрямую.
+    Получает DB сессию напрямую и singleton-кэш (кэшируются снимки PlanSnapshot).
     """
-    # Временно отключаем кэш из-за проблем с SQLAlchemy объектами
-    return PlansService(db, cache_service=None)
+    return PlansService(db, cache_service=get_cache_service())
+
+
+def get_stats_service(
+    db: Session = Depends(get_db)
+) -> StatsService:
+    """
+    Dependency для получения StatsService.
+
+    Lifetime: Transient (создается новый экземпляр при каждом вызове)
+    Счетчики dashboard кэшируются в singleton-кэше на короткий TTL.
+    """
+    return StatsService(db, cache_service=get_cache_service())
 
 
 # ============================================================================
@@ -83,8 +103,14 @@ def get_cache_service() -> MemoryCacheService:
         @router.get("/users")
         def get_users(cache: MemoryCacheService = Depends(get_cache_service)):
             ...
+
+    Размер ограничен CACHE_MAX_ENTRIES / CACHE_MAX_BYTES (LRU-вытеснение).
     """
-    return MemoryCacheService()
+    settings = get_app_settings()
+    return MemoryCacheService(
+        max_entries=settings["cache_max_entries"],
+        max_bytes=settings["cache_max_bytes"],
+    )
 
 
 @lru_cache()
@@ -102,9 +128,135 @@ def get_app_settings() -> dict:
     
     Важно: @lru_cache() делает функцию singleton, результат кешируется навсегда.
     """
+    analysis_workers = int(os.getenv("ANALYSIS_WORKERS", "0")) or (os.cpu_count() or 1)
     return {
         "app_name": "DroneApp",
         "version": "1.0.0",
-        "max_upload_size": 10 * 1024 * 1024,  # 10MB
+        # Максимальный размер одного загружаемого файла (ортофотопланы TIFF бывают 50–200MB)
+        "max_upload_size": int(os.getenv("MAX_UPLOAD_SIZE", str(256 * 1024 * 1024))),  # 256MB
+        # Суммарный объем одного пакета /api/analyze/batch (файлы + распакованные кадры из zip)
+        "batch_max_upload_size": int(os.getenv("BATCH_MAX_UPLOAD_SIZE", str(2 * 1024 ** 3))),  # 2GB
+        # Пул для анализа изображений и генерации PDF
+        "analysis_executor": os.getenv("ANALYSIS_EXECUTOR", "process"),  # process | thread
+        "analysis_workers": analysis_workers,
+        "analysis_max_queue": int(os.getenv("ANALYSIS_MAX_QUEUE", str(2 * analysis_workers))),
+        # In-memory кэш (MemoryCacheService)
+        "cache_max_entries": int(os.getenv("CACHE_MAX_ENTRIES", "10000")),
+        "cache_max_bytes": int(os.getenv("CACHE_MAX_BYTES", str(64 * 1024 * 1024))),  # 64MB
+        # Кэш результатов анализа (по SHA-256 изображения), LRU-вытеснение
+        "analysis_cache_max_entries": int(os.getenv("ANALYSIS_CACHE_MAX_ENTRIES", "10000")),
+        "analysis_cache_max_bytes": int(os.getenv("ANALYSIS_CACHE_MAX_BYTES", str(2 * 1024 ** 3))),  # 2GB
+        # PDF-отчеты рендерятся при первом скачивании и хранятся на диске (LRU)
+        "report_cache_max_files": int(os.getenv("REPORT_CACHE_MAX_FILES", "1000")),
+        "report_cache_max_bytes": int(os.getenv("REPORT_CACHE_MAX_BYTES", str(1024 ** 3))),  # 1GB
+        # Хэширование паролей (pbkdf2) в отдельном пуле потоков с ограничениями
+        "auth_hash_workers": int(os.getenv("AUTH_HASH_WORKERS", "2")),
+        "auth_hash_max_pending": int(os.getenv("AUTH_HASH_MAX_PENDING", "16")),
+        "auth_logins_per_account": int(os.getenv("AUTH_LOGINS_PER_ACCOUNT", "2")),
+        "auth_logins_per_ip": int(os.getenv("AUTH_LOGINS_PER_IP", "8")),
+        "auth_verify_cache_ttl": int(os.getenv("AUTH_VERIFY_CACHE_TTL", "300")),
+        # Доступ к /metrics: из этих сетей или с Bearer METRICS_TOKEN
+        "metrics_token": os.getenv("METRICS_TOKEN", ""),
+        "metrics_allowed_networks": tuple(
+            ipaddress.ip_network(net.strip())
+            for net in os.getenv("METRICS_ALLOWED_NETWORKS", "127.0.0.1/32,::1/128").split(",")
+            if net.strip()
+        ),
+        # Подписанные API-токены (/api/auth/token) и синхронизация списка отозванных
+        "api_token_ttl": int(os.getenv("API_TOKEN_TTL", "3600")),
+        "api_token_denylist_sync": float(os.getenv("API_TOKEN_DENYLIST_SYNC", "30")),
     }
 
+
+@lru_cache()
+def get_analysis_pool() -> AnalysisPool:
+    """
+    Dependency для получения AnalysisPool (singleton).
+
+    Lifetime: Singleton (один пул процессов на всё приложение)
+    Ограничивает число одновременных анализов: workers + max_queue.
+    Настраивается через ANALYSIS_EXECUTOR / ANALYSIS_WORKERS / ANALYSIS_MAX_QUEUE.
+    """
+    settings = get_app_settings()
+    pool = AnalysisPool(
+        workers=settings["analysis_workers"],
+        max_queue=settings["analysis_max_queue"],
+        kind=settings["analysis_executor"],
+    )
+    # gauges /metrics читает из пула в момент запроса
+    ANALYSIS_IN_FLIGHT.set_function(lambda: pool.stats()["in_flight"])
+    ANALYSIS_QUEUE_DEPTH.set_function(lambda: pool.stats()["queue_depth"])
+    return pool
+
+
+@lru_cache()
+def get_result_cache() -> AnalysisResultCache:
+    """
+    Dependency для получения AnalysisResultCache (singleton).
+
+    Lifetime: Singleton (счетчики hit/miss общие для всего процесса)
+    Записи хранятся в таблице analysis_cache, лимиты задаются через
+    ANALYSIS_CACHE_MAX_ENTRIES / ANALYSIS_CACHE_MAX_BYTES.
+    """
+    settings = get_app_settings()
+    return AnalysisResultCache(
+        max_entries=settings["analysis_cache_max_entries"],
+        max_bytes=settings["analysis_cache_max_bytes"],
+    )
+
+
+@lru_cache()
+def get_report_renderer() -> ReportRenderer:
+    """
+    Dependency для получения ReportRenderer (singleton).
+
+    Lifetime: Singleton (общая таблица рендеров "в полете" для single-flight)
+    PDF строится при первом запросе /reports/{filename}; размер кэша на диске
+    задается через REPORT_CACHE_MAX_FILES / REPORT_CACHE_MAX_BYTES.
+    """
+    settings = get_app_settings()
+    return ReportRenderer(
+        max_files=settings["report_cache_max_files"],
+        max_bytes=settings["report_cache_max_bytes"],
+    )
+
+
+@lru_cache()
+def get_password_hasher() -> PasswordHasher:
+    """
+    Dependency для получения PasswordHasher (singleton).
+
+    Lifetime: Singleton (один пул потоков для pbkdf2 на всё приложение)
+    Ограничения: AUTH_HASH_WORKERS / AUTH_HASH_MAX_PENDING (всего),
+    AUTH_LOGINS_PER_ACCOUNT / AUTH_LOGINS_PER_IP (одновременных входов),
+    успешные проверки кэшируются на AUTH_VERIFY_CACHE_TTL секунд.
+    """
+    settings = get_app_settings()
+    return PasswordHasher(
+        workers=settings["auth_hash_workers"],
+        max_pending=settings["auth_hash_max_pending"],
+        per_account=settings["auth_logins_per_account"],
+        per_ip=settings["auth_logins_per_ip"],
+        cache_service=get_cache_service(),
+        cache_ttl=settings["auth_verify_cache_ttl"],
+    )
+
+
+@lru_cache()
+def get_api_token_service() -> ApiTokenService:
+    """
+    Dependency для получения ApiTokenService (singleton).
+
+    Lifetime: Singleton (общий список отозванных токенов на процесс)
+    Ключ подписи — API_TOKEN_SECRET (по умолчанию APP_SECRET_KEY), срок жизни
+    токена — API_TOKEN_TTL секунд; отзывы из БД подтягиваются раз в
+    API_TOKEN_DENYLIST_SYNC секунд.
+    """
+    settings = get_app_settings()
+    secret = os.getenv("API_TOKEN_SECRET") or os.getenv("APP_SECRET_KEY") or "dev-secret-key-change-me"
+    return ApiTokenService(
+        secret=secret,
+        ttl_seconds=settings["api_token_ttl"],
+        session_factory=SessionLocal,
+        sync_interval=settings["api_token_denylist_sync"],
+    )
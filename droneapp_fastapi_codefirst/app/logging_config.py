@@ -1,44 +1,176 @@
 """
 Настройка логирования для приложения.
-Простое логирование в файл и консоль.
+
+Запись в лог не блокирует поток запроса: root logger получает только
+QueueHandler, который кладет запись в ограниченную очередь (при переполнении
+запись отбрасывается и учитывается в dropped_records()). Файл и консоль
+обслуживает QueueListener в отдельном потоке.
+
+Параметры (переменные окружения):
+- LOG_LEVEL: уровень root logger (INFO)
+- LOG_FORMAT: text | json (text)
+- LOG_FILE: путь к файлу, ротация по LOG_MAX_BYTES / LOG_BACKUP_COUNT.
+  По умолчанию logs/app.log относительно os.getcwd(), т.е. внутри рабочей
+  копии при запуске из нее (logs/ в .gitignore); в проде задавайте явно
+- LOG_QUEUE_SIZE: емкость очереди записей (10000)
+- LOG_DEBUG_SAMPLE_RATE: доля DEBUG-записей, которые попадают в лог (0.1)
 """
+import atexit
+import contextvars
+import copy
+import json
 import logging
+import logging.handlers
 import os
+import queue
+import random
+import threading
+from datetime import datetime, timezone
+from typing import Optional
+
+TEXT_FORMAT = "%(asctime)s | %(levelname)s | %(name)s | %(request_id)s | %(message)s"
+
+# Идентификатор текущего запроса (RequestIdMiddleware) или задачи воркера
+request_id_var: contextvars.ContextVar[str] = contextvars.ContextVar("request_id", default="-")
+
+_EXC_FORMATTER = logging.Formatter()
+
+_listener: Optional[logging.handlers.QueueListener] = None
+_queue_handler: Optional["NonBlockingQueueHandler"] = None
+
+
+class RequestIdFilter(logging.Filter):
+    """Добавляет record.request_id из contextvars (выполняется в потоке, который пишет в лог)."""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.request_id = request_id_var.get()
+        return True
+
+
+class SamplingFilter(logging.Filter):
+    """Пропускает только долю sample_rate записей уровня DEBUG и ниже; остальные уровни — все."""
+
+    def __init__(self, sample_rate: float):
+        super().__init__()
+        self.sample_rate = sample_rate
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno > logging.DEBUG or self.sample_rate >= 1.0:
+            return True
+        return random.random() < self.sample_rate
+
+
+class NonBlockingQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler, который не ждет при переполненной очереди, а отбрасывает запись."""
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self._dropped = 0
+        self._dropped_lock = threading.Lock()
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # сообщение и traceback форматируются здесь: args/exc_info могут измениться
+        # после возврата из logger.*(); traceback сохраняется отдельно в exc_text
+        record = copy.copy(record)
+        record.message = record.getMessage()
+        record.msg = record.message
+        record.args = None
+        if record.exc_info:
+            record.exc_text = _EXC_FORMATTER.formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            with self._dropped_lock:
+                self._dropped += 1
+
+    @property
+    def dropped(self) -> int:
+        return self._dropped
+
+
+class _QueueListener(logging.handlers.QueueListener):
+    def enqueue_sentinel(self) -> None:
+        # очередь может быть заполнена: ждем, пока поток listener освободит место
+        self.queue.put(self._sentinel)
+
+
+class JsonFormatter(logging.Formatter):
+    """Одна JSON-строка на запись: ts, level, logger, request_id, message (+ exc_info)."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        payload = {
+            "ts": datetime.fromtimestamp(record.created, tz=timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "request_id": getattr(record, "request_id", "-"),
+            "message": record.getMessage(),
+        }
+        if record.exc_text:
+            payload["exc_info"] = record.exc_text
+        return json.dumps(payload, ensure_ascii=False)
+
+
+def dropped_records() -> int:
+    """Сколько записей отброшено из-за переполненной очереди."""
+    return _queue_handler.dropped if _queue_handler is not None else 0
+
+
+def stop_logging() -> None:
+    """Дописывает очередь и останавливает поток QueueListener."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+        _listener = None
 
 
 def setup_logging():
     """
-    Настраивает логирование: в файл logs/app.log и в консоль.
-    Уровень: INFO
-    Формат: "%(asctime)s | %(levelname)s | %(name)s | %(message)s"
+    Настраивает логирование: root logger -> очередь -> (logs/app.log с ротацией, консоль).
+
+    Повторный вызов перенастраивает пайплайн (старый QueueListener останавливается).
     """
-    # Создаем директорию для логов, если её нет
-    logs_dir = os.path.join(os.getcwd(), 'logs')
-    os.makedirs(logs_dir, exist_ok=True)
-    
-    log_file = os.path.join(logs_dir, 'app.log')
-    
-    # Формат логов
-    log_format = "%(asctime)s | %(levelname)s | %(name)s | %(message)s"
-    
+    global _listener, _queue_handler
+    stop_logging()
+
+    level = getattr(logging, os.getenv("LOG_LEVEL", "INFO").upper(), logging.INFO)
+    log_file = os.getenv("LOG_FILE") or os.path.join(os.getcwd(), "logs", "app.log")
+    os.makedirs(os.path.dirname(log_file), exist_ok=True)
+
+    if os.getenv("LOG_FORMAT", "text").lower() == "json":
+        formatter: logging.Formatter = JsonFormatter()
+    else:
+        formatter = logging.Formatter(TEXT_FORMAT)
+
+    # Handler для файла (с ротацией) и для консоли: работают в потоке QueueListener
+    file_handler = logging.handlers.RotatingFileHandler(
+        log_file,
+        maxBytes=int(os.getenv("LOG_MAX_BYTES", str(10 * 1024 * 1024))),
+        backupCount=int(os.getenv("LOG_BACKUP_COUNT", "5")),
+        encoding="utf-8",
+    )
+    file_handler.setFormatter(formatter)
+    console_handler = logging.StreamHandler()
+    console_handler.setFormatter(formatter)
+
+    log_queue: queue.Queue = queue.Queue(int(os.getenv("LOG_QUEUE_SIZE", "10000")))
+    _queue_handler = NonBlockingQueueHandler(log_queue)
+    _queue_handler.addFilter(SamplingFilter(float(os.getenv("LOG_DEBUG_SAMPLE_RATE", "0.1"))))
+    _queue_handler.addFilter(RequestIdFilter())
+
     # Настраиваем root logger
     logger = logging.getLogger()
-    logger.setLevel(logging.INFO)
-    
-    # Удаляем существующие handlers, если есть
+    logger.setLevel(level)
     logger.handlers.clear()
-    
-    # Handler для файла
-    file_handler = logging.FileHandler(log_file, encoding='utf-8')
-    file_handler.setLevel(logging.INFO)
-    file_formatter = logging.Formatter(log_format)
-    file_handler.setFormatter(file_formatter)
-    logger.addHandler(file_handler)
-    
-    # Handler для консоли
-    console_handler = logging.StreamHandler()
-    console_handler.setLevel(logging.INFO)
-    console_formatter = logging.Formatter(log_format)
-    console_handler.setFormatter(console_formatter)
-    logger.addHandler(console_handler)
+    logger.addHandler(_queue_handler)
+
+    _listener = _QueueListener(log_queue, file_handler, console_handler, respect_handler_level=True)
+    _listener.start()
+
 
+atexit.register(stop_logging)
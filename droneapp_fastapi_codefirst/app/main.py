@@ -1,12 +1,18 @@
+import os
+import threading
+import time
+import uuid
 from fastapi import FastAPI, Depends
 from fastapi.responses import RedirectResponse
 from typing import List
-from app.db import get_db
+from app.db import get_db, get_async_db
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.accessors.users_accessor import UsersAccessor
+from app.accessors.users_async_accessor import AsyncUsersAccessor
 from app.accessors.runs_accessor import RunsAccessor
 from .controllers import users_controller, runs_controller
-from app.logging_config import setup_logging
+from app.logging_config import request_id_var, setup_logging, stop_logging
 
 # Настройка логирования при старте приложения
 setup_logging()
@@ -36,9 +42,9 @@ def _serialize_run_basic(run):
 
 
 @app.get('/api/users', response_model=List[dict])
-def get_users(db: Session = Depends(get_db)):
-    accessor = UsersAccessor(db)
-    users = accessor.list_users()
+async def get_users(db: AsyncSession = Depends(get_async_db)):
+    accessor = AsyncUsersAccessor(db)
+    users = await accessor.list_users()
     return [_serialize_user_basic(u) for u in users]
 
 
@@ -54,6 +60,74 @@ from app.controllers import users_controller
 app.include_router(analyze_api.router)
 app.include_router(analyze_ui_controller.router)
 
+from app.api import metrics_api
+app.include_router(metrics_api.router)
+
+from app.api import usage_api
+app.include_router(usage_api.router)
+
+from app.api import auth_api
+app.include_router(auth_api.router)
+
+
+@app.on_event('shutdown')
+def shutdown_analysis_pool():
+    from app.deps.services import get_analysis_pool
+    get_analysis_pool().shutdown()
+
+
+@app.on_event('shutdown')
+def shutdown_password_hasher():
+    from app.deps.services import get_password_hasher
+    get_password_hasher().shutdown()
+
+
+@app.on_event('startup')
+def start_api_token_sync():
+    from app.deps.services import get_api_token_service
+    get_api_token_service().start()
+
+
+@app.on_event('shutdown')
+def stop_api_token_sync():
+    from app.deps.services import get_api_token_service
+    get_api_token_service().close()
+
+
+@app.on_event('shutdown')
+async def dispose_async_engine():
+    from app.db import async_engine
+    await async_engine.dispose()
+
+
+# Optional in-process worker for async analysis jobs (otherwise run run_worker.py)
+_job_worker_stop = threading.Event()
+
+
+@app.on_event('startup')
+def start_embedded_job_worker():
+    if os.getenv('ANALYSIS_EMBEDDED_WORKER', 'false').lower() not in ('1', 'true', 'yes'):
+        return
+    from app.services.analysis_jobs import run_worker_loop
+    threading.Thread(target=run_worker_loop, args=(_job_worker_stop,), name='analysis-jobs', daemon=True).start()
+
+
+@app.on_event('shutdown')
+def stop_embedded_job_worker():
+    _job_worker_stop.set()
+
+
+@app.on_event('shutdown')
+def close_cache_service():
+    from app.deps.services import get_cache_service
+    get_cache_service().close()
+
+
+# registered last: flushes what the other shutdown hooks logged
+@app.on_event('shutdown')
+def shutdown_logging():
+    stop_logging()
+
 # Auth controllers
 from app.controllers import auth_controller
 app.include_router(auth_controller.router)
@@ -64,88 +138,181 @@ app.include_router(plans_controller.router)
 
 # Static files
 from fastapi.staticfiles import StaticFiles
-import os
 app_dir = os.path.dirname(__file__)
 static_dir = os.path.join(app_dir, 'static')
 app.mount('/static', StaticFiles(directory=static_dir), name='static')
 
 # Session middleware
 from starlette.middleware.sessions import SessionMiddleware
-import os as _os
-SECRET_KEY = _os.getenv('APP_SECRET_KEY') or 'dev-secret-key-change-me'
-app.add_middleware(SessionMiddleware, secret_key=SECRET_KEY)
+SECRET_KEY = os.getenv('APP_SECRET_KEY') or 'dev-secret-key-change-me'
 
 # Simple middleware: attach current user to request.state for templates and enforce UI login
+from starlette.concurrency import run_in_threadpool
 from starlette.responses import RedirectResponse
-from starlette.middleware.base import BaseHTTPMiddleware
-from app.deps.auth import get_user_from_session
-from app.db import SessionLocal
-from app.models.models import User
-
-class AttachUserAndProtectUIMiddleware(BaseHTTPMiddleware):
-    async def dispatch(self, request, call_next):
-        path = request.url.path
-        # Skip auth/static/api endpoints
-        if path.startswith('/auth') or path.startswith('/static') or path.startswith('/api'):
-            return await call_next(request)
-
-        # Try to read user_id from session cookie directly (do not rely on Request.session availability)
-        try:
-            print("DEBUG: request.cookies:", request.cookies)
-            cookie_val = request.cookies.get('session')
-            print("DEBUG: session_cookie:", cookie_val)
-            user_id = None
-            if cookie_val:
-                try:
-                    # SessionMiddleware uses itsdangerous.TimestampSigner over a b64-encoded JSON payload
-                    from itsdangerous import TimestampSigner, BadSignature
-                    import json
-                    from base64 import b64decode
-                    s = TimestampSigner(SECRET_KEY)
-                    unsigned = s.unsign(cookie_val.encode('utf-8'))
-                    payload = json.loads(b64decode(unsigned))
-                    if isinstance(payload, dict):
-                        user_id = payload.get('user_id')
-                except Exception:
-                    # Can't decode cookie; fallback to request.session if available
-                    try:
-                        user_id = get_user_from_session(request)
-                    except Exception:
-                        user_id = None
-            else:
-                try:
-                    user_id = get_user_from_session(request)
-                except Exception:
-                    user_id = None
-        except Exception:
-            # Any unexpected error while parsing session — treat as not authenticated
-            user_id = None
-
-        if not user_id:
+from app.deps.auth import get_cached_session_user, load_session_user
+
+# /api authenticates per route; /metrics checks its own token / allowed networks (metrics_api)
+UI_PUBLIC_PREFIXES = ('/auth', '/static', '/api', '/metrics')
+
+
+class AttachUserAndProtectUIMiddleware:
+    """Pure ASGI middleware (no BaseHTTPMiddleware buffering/extra task).
+
+    Runs inside SessionMiddleware, so scope['session'] is already decoded and
+    verified. The user snapshot comes from the session-user cache; the DB is
+    queried only on a cache miss (in the threadpool).
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http' or scope['path'].startswith(UI_PUBLIC_PREFIXES):
+            await self.app(scope, receive, send)
+            return
+
+        user_id = scope.get('session', {}).get('user_id')
+        user = None
+        if user_id:
+            user = get_cached_session_user(user_id)
+            if user is None:
+                user = await run_in_threadpool(load_session_user, user_id)
+        if user is None:
             # redirect to login for UI pages
-            print("DEBUG: No user_id in session; redirecting to login")
-            return RedirectResponse(url='/auth/login')
+            await RedirectResponse(url='/auth/login')(scope, receive, send)
+            return
+
+        # request.state is backed by scope['state']
+        scope.setdefault('state', {})['user'] = user
+        await self.app(scope, receive, send)
+
+
+# Order matters: the middleware added last is the outermost, so the session is
+# decoded before AttachUserAndProtectUIMiddleware reads it.
+app.add_middleware(AttachUserAndProtectUIMiddleware)
+app.add_middleware(SessionMiddleware, secret_key=SECRET_KEY)
+
+
+class UploadSizeLimitMiddleware:
+    """Reject analysis uploads by Content-Length before the body is read.
+
+    The exact per-file and per-batch limits are enforced while storing in
+    analyze_api; this only spares the server from receiving an obviously
+    oversized request.
+    """
+    # room for the multipart boundaries and the other form fields
+    MULTIPART_OVERHEAD = 1024 * 1024
+    # path -> app setting with its size limit
+    LIMITS = {
+        '/api/analyze': 'max_upload_size',
+        '/api/analyze/batch': 'batch_max_upload_size',
+    }
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'http' and scope['method'] == 'POST' and scope['path'] in self.LIMITS:
+            from app.deps.services import get_app_settings
+            from starlette.responses import JSONResponse
+            max_size = get_app_settings()[self.LIMITS[scope['path']]]
+            content_length = dict(scope['headers']).get(b'content-length')
+            if content_length is not None and content_length.isdigit() and int(content_length) > max_size + self.MULTIPART_OVERHEAD:
+                response = JSONResponse(
+                    {'detail': f'Upload is too large, maximum is {max_size // (1024 * 1024)} MB'}, status_code=413
+                )
+                await response(scope, receive, send)
+                return
+        await self.app(scope, receive, send)
+
+
+app.add_middleware(UploadSizeLimitMiddleware)
+
+
+class RequestMetricsMiddleware:
+    """Observe request latency into http_request_duration_seconds.
+
+    The route label is the path template ('/api/runs/{run_id}'), looked up by
+    the endpoint the router put into the scope, so label cardinality stays
+    bounded whatever the URLs; requests no route matched share 'unmatched'.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self._templates = None
+
+    def _route_template(self, scope) -> str:
+        if self._templates is None:
+            from starlette.routing import Mount
+            templates = {}
+            for route in scope['app'].routes:
+                target = route.app if isinstance(route, Mount) else getattr(route, 'endpoint', None)
+                if target is not None:
+                    templates.setdefault(target, route.path)
+            self._templates = templates
+        endpoint = scope.get('endpoint')
+        if endpoint is None:
+            return 'unmatched'
+        return self._templates.get(endpoint, 'unmatched')
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+        from app.services.metrics import HTTP_REQUEST_SECONDS
+        started = time.perf_counter()
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message['type'] == 'http.response.start':
+                status_code = message['status']
+            await send(message)
 
-        # Attach full user from db to request.state for templates
         try:
-            db = SessionLocal()
-            from sqlalchemy.orm import joinedload
-            user = db.query(User).options(joinedload(User.plan)).filter(User.id == user_id).first()
-            print("DEBUG: resolved user from db:", user)
-            # Access related objects while session is open to load them
-            if user and user.plan:
-                _ = user.plan.name  # Trigger eager load
-            # Expunge user from session so it can be used after session closes
-            db.expunge(user)
-            request.state.user = user
+            await self.app(scope, receive, send_wrapper)
         finally:
-            db.close()
+            HTTP_REQUEST_SECONDS.observe(
+                time.perf_counter() - started,
+                method=scope['method'], route=self._route_template(scope), status=status_code,
+            )
 
-        return await call_next(request)
 
-# Register middleware so it runs after SessionMiddleware
-app.add_middleware(AttachUserAndProtectUIMiddleware)
-print("MIDDLEWARE STACK:", [m.cls.__name__ for m in app.user_middleware])
+# outermost: the latency includes session decoding and the UI auth middleware
+app.add_middleware(RequestMetricsMiddleware)
+
+
+class RequestIdMiddleware:
+    """Bind a request id (X-Request-ID or a new one) to the logging context.
+
+    contextvars follow the request into run_in_threadpool, so every log line
+    of the request carries the id; it is echoed in the X-Request-ID header.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+        incoming = dict(scope['headers']).get(b'x-request-id', b'').decode('latin-1')
+        # accept a caller-supplied id only if it is short and printable
+        request_id = incoming if 0 < len(incoming) <= 64 and incoming.isprintable() else uuid.uuid4().hex
+        token = request_id_var.set(request_id)
+
+        async def send_wrapper(message):
+            if message['type'] == 'http.response.start':
+                message.setdefault('headers', []).append((b'x-request-id', request_id.encode('latin-1')))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            request_id_var.reset(token)
+
+
+app.add_middleware(RequestIdMiddleware)
 
 @app.get('/api/users-eager', response_model=List[dict])
 def get_users_eager(db: Session = Depends(get_db)):
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, BigInteger, Integer, String, Boolean, DateTime, Text, ForeignKey
+from sqlalchemy import Column, BigInteger, Integer, String, Boolean, Date, DateTime, Text, ForeignKey, Index, JSON
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from .base import Base
@@ -17,6 +17,9 @@ class SubscriptionPlan(Base):
 
 class User(Base):
     __tablename__ = 'users'
+    __table_args__ = (
+        Index('ix_users_plan_id', 'plan_id'),
+    )
 
     id = Column(BigInteger, primary_key=True)
     email = Column(String(255), nullable=False, unique=True)
@@ -34,8 +37,15 @@ class User(Base):
     processing_runs = relationship('ProcessingRun', back_populates='user')
 
 
+# case-insensitive lookups (UsersAccessor.get_user_by_email)
+Index('ix_users_email_lower', func.lower(User.email))
+
+
 class InputImage(Base):
     __tablename__ = 'input_images'
+    __table_args__ = (
+        Index('ix_input_images_user_id_id', 'user_id', 'id'),
+    )
 
     id = Column(BigInteger, primary_key=True)
     user_id = Column(BigInteger, ForeignKey('users.id'), nullable=False)
@@ -49,6 +59,11 @@ class InputImage(Base):
 
 class ProcessingRun(Base):
     __tablename__ = 'processing_runs'
+    __table_args__ = (
+        Index('ix_processing_runs_user_id_id', 'user_id', 'id'),
+        Index('ix_processing_runs_status_id', 'status', 'id'),
+        Index('ix_processing_runs_created_at', 'created_at'),
+    )
 
     id = Column(BigInteger, primary_key=True)
     user_id = Column(BigInteger, ForeignKey('users.id'), nullable=False)
@@ -56,6 +71,8 @@ class ProcessingRun(Base):
     index_type = Column(String(10), nullable=False)
     status = Column(String(10), nullable=False, server_default='QUEUED')
     created_at = Column(DateTime, nullable=False, server_default=func.now())
+    # set when a worker claims the run; RUNNING runs older than the job timeout are reclaimed
+    started_at = Column(DateTime)
 
     user = relationship('User', back_populates='processing_runs')
     input_image = relationship('InputImage', back_populates='processing_runs')
@@ -64,6 +81,9 @@ class ProcessingRun(Base):
 
 class OutputArtifact(Base):
     __tablename__ = 'output_artifacts'
+    __table_args__ = (
+        Index('ix_output_artifacts_run_id_type', 'processing_run_id', 'artifact_type'),
+    )
 
     id = Column(BigInteger, primary_key=True)
     processing_run_id = Column(BigInteger, ForeignKey('processing_runs.id'), nullable=False)
@@ -73,3 +93,76 @@ class OutputArtifact(Base):
 
     processing_run = relationship('ProcessingRun', back_populates='output_artifacts')
 
+
+class Report(Base):
+    __tablename__ = 'reports'
+    __table_args__ = (
+        Index('ix_reports_user_id_created_at', 'user_id', 'created_at'),
+        Index('ix_reports_created_at', 'created_at'),
+        Index('ix_reports_run_id', 'run_id'),
+        Index('ix_reports_sha256', 'sha256'),
+    )
+
+    id = Column(BigInteger, primary_key=True)
+    # public id: /reports/report_<report_id>.pdf, /app/reports/<report_id>
+    report_id = Column(String(32), nullable=False, unique=True)
+    # NULL for flight (batch) reports, which cover several runs
+    run_id = Column(BigInteger, ForeignKey('processing_runs.id'))
+    user_id = Column(BigInteger, ForeignKey('users.id'), nullable=False)
+    pdf_path = Column(Text, nullable=False)
+    original_filename = Column(String(255))
+    plot_name = Column(String(255))
+    sha256 = Column(String(64))
+    # NULL until the analysis finished (async jobs)
+    metrics = Column(JSON(none_as_null=True))
+    frames = Column(JSON(none_as_null=True))
+    # inputs of the PDF, rendered on first download
+    assets = Column(JSON(none_as_null=True))
+    image_path = Column(Text)
+    created_at = Column(DateTime, nullable=False, server_default=func.now())
+
+    processing_run = relationship('ProcessingRun')
+    user = relationship('User')
+
+
+
+class AnalysisCacheEntry(Base):
+    __tablename__ = 'analysis_cache'
+
+    # '<sha256 of image bytes>:<analyzer params hash>'
+    cache_key = Column(String(100), primary_key=True)
+    user_id = Column(BigInteger, ForeignKey('users.id'), nullable=False)
+    metrics = Column(Text, nullable=False)
+    assets = Column(Text, nullable=False)
+    report_path = Column(Text, nullable=False)
+    size_bytes = Column(BigInteger, nullable=False, server_default='0')
+    hits = Column(Integer, nullable=False, server_default='0')
+    created_at = Column(DateTime, nullable=False, server_default=func.now())
+    last_used_at = Column(DateTime, nullable=False, server_default=func.now(), index=True)
+
+
+class UserUsageDaily(Base):
+    """Per-user, per-day usage rollup, incremented in the analysis transactions."""
+    __tablename__ = 'user_usage_daily'
+    __table_args__ = (
+        Index('ix_user_usage_daily_day', 'day'),
+    )
+
+    user_id = Column(BigInteger, ForeignKey('users.id'), primary_key=True)
+    day = Column(Date, primary_key=True)
+    runs = Column(Integer, nullable=False, server_default='0')
+    successes = Column(Integer, nullable=False, server_default='0')
+    failures = Column(Integer, nullable=False, server_default='0')
+    bytes_uploaded = Column(BigInteger, nullable=False, server_default='0')
+    analysis_ms = Column(BigInteger, nullable=False, server_default='0')
+
+
+class ApiTokenRevocation(Base):
+    """Revoked API token ids; synced into the in-memory denylist (app.services.api_tokens)."""
+    __tablename__ = 'api_token_revocations'
+
+    jti = Column(String(32), primary_key=True)
+    user_id = Column(BigInteger, ForeignKey('users.id'), nullable=False)
+    # rows past expires_at no longer matter: the token itself has expired
+    expires_at = Column(DateTime, nullable=False, index=True)
+    revoked_at = Column(DateTime, nullable=False, server_default=func.now())
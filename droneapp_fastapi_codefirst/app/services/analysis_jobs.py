@@ -0,0 +1,237 @@
+"""
+Asynchronous analysis jobs on top of the ProcessingRun.status lifecycle.
+
+POST /api/analyze?async=1 stores the upload, a QUEUED ProcessingRun, a
+REPORT_PDF OutputArtifact pointing at the future report and its Report row
+(which carries the job parameters). A worker (run_worker.py, or the
+embedded thread enabled with ANALYSIS_EMBEDDED_WORKER=1) claims queued runs,
+moves them to RUNNING and finally to SUCCESS or FAILED. The worker only fills in the
+report's metrics and assets; the PDF is rendered when first downloaded.
+
+Claiming is a conditional UPDATE ... WHERE status='QUEUED', so several
+workers never take the same run; on Postgres the candidate row is picked
+with SELECT ... FOR UPDATE SKIP LOCKED so workers do not contend for it.
+
+A claimed run records started_at. Runs left RUNNING for longer than
+ANALYSIS_JOB_TIMEOUT seconds (the worker crashed or was restarted mid-job)
+are marked FAILED by reclaim_stale_jobs and their attempt is refunded.
+"""
+import logging
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from app.db import SessionLocal
+from app.logging_config import request_id_var
+from app.accessors.reports_accessor import ReportsAccessor
+from app.models.models import ProcessingRun
+from app.services.metrics import ANALYSIS_SCANS, stage
+from app.services.quota_service import QuotaService
+from app.services.rgb_analyzer import analyze_image
+from app.services.usage_rollup import record_usage
+
+logger = logging.getLogger(__name__)
+
+STATUS_QUEUED = 'QUEUED'
+STATUS_RUNNING = 'RUNNING'
+STATUS_SUCCESS = 'SUCCESS'
+STATUS_FAILED = 'FAILED'
+FINAL_STATUSES = (STATUS_SUCCESS, STATUS_FAILED)
+
+REPORT_ARTIFACT = 'REPORT_PDF'
+
+# A RUNNING run older than this is considered abandoned by its worker
+JOB_TIMEOUT = float(os.getenv('ANALYSIS_JOB_TIMEOUT', '900'))
+# Pause after an unexpected error in the worker loop, doubled up to the maximum
+WORKER_ERROR_BACKOFF = 1.0
+WORKER_MAX_BACKOFF = 60.0
+
+
+def _upload_size(run: ProcessingRun) -> int:
+    try:
+        return os.path.getsize(run.input_image.storage_path)
+    except (OSError, AttributeError):
+        return 0
+
+
+def claim_next_job(db: Session, attempts: int = 5) -> Optional[ProcessingRun]:
+    """Atomically move the oldest QUEUED run to RUNNING and return it."""
+    for _ in range(attempts):
+        query = (
+            db.query(ProcessingRun.id)
+            .filter(ProcessingRun.status == STATUS_QUEUED)
+            .order_by(ProcessingRun.id)
+        )
+        if db.get_bind().dialect.name == 'postgresql':
+            query = query.with_for_update(skip_locked=True)
+        row = query.first()
+        if row is None:
+            db.rollback()
+            return None
+        claimed = (
+            db.query(ProcessingRun)
+            .filter(ProcessingRun.id == row.id, ProcessingRun.status == STATUS_QUEUED)
+            .update({ProcessingRun.status: STATUS_RUNNING, ProcessingRun.started_at: datetime.utcnow()}, synchronize_session=False)
+        )
+        db.commit()
+        if claimed:
+            return db.get(ProcessingRun, row.id)
+        # another worker won the race for this row; try the next one
+    return None
+
+
+def reclaim_stale_jobs(db: Session, timeout: float = JOB_TIMEOUT) -> int:
+    """Mark runs RUNNING for longer than timeout as FAILED and refund their attempts."""
+    from app.deps.auth import invalidate_session_user
+    cutoff = datetime.utcnow() - timedelta(seconds=timeout)
+    # runs claimed before started_at existed have none: fall back to created_at
+    started = func.coalesce(ProcessingRun.started_at, ProcessingRun.created_at)
+    stale = (
+        db.query(ProcessingRun.id, ProcessingRun.user_id)
+        .filter(ProcessingRun.status == STATUS_RUNNING, started < cutoff)
+        .all()
+    )
+    db.rollback()
+    reclaimed = 0
+    for run_id, user_id in stale:
+        # conditional: the run may have finished since it was selected
+        failed = (
+            db.query(ProcessingRun)
+            .filter(ProcessingRun.id == run_id, ProcessingRun.status == STATUS_RUNNING, started < cutoff)
+            .update({ProcessingRun.status: STATUS_FAILED}, synchronize_session=False)
+        )
+        if not failed:
+            db.rollback()
+            continue
+        QuotaService(db).refund(user_id, commit=False)
+        record_usage(db, user_id, failures=1)
+        db.commit()
+        invalidate_session_user(user_id)
+        ANALYSIS_SCANS.inc(mode='async', status='failed')
+        logger.warning(f"job timed out run_id={run_id} user_id={user_id} timeout={timeout:.0f}s")
+        reclaimed += 1
+    return reclaimed
+
+
+def _finish_run(db: Session, run_id: int, status: str) -> bool:
+    """Move a RUNNING run to status (not committed); False if it is no longer RUNNING.
+
+    reclaim_stale_jobs may already have failed and refunded a slow run.
+    """
+    return bool(
+        db.query(ProcessingRun)
+        .filter(ProcessingRun.id == run_id, ProcessingRun.status == STATUS_RUNNING)
+        .update({ProcessingRun.status: status}, synchronize_session=False)
+    )
+
+
+def execute_job(db: Session, run: ProcessingRun) -> bool:
+    """Run analysis for a RUNNING run, fill in its Report row and record SUCCESS/FAILED.
+
+    Images already in the result cache skip analyze_image.
+    """
+    from app.deps.auth import invalidate_session_user
+    from app.deps.services import get_result_cache
+    result_cache = get_result_cache()
+    logger.info(f"job started run_id={run.id} user_id={run.user_id}")
+    started = time.perf_counter()
+    try:
+        report = ReportsAccessor(db).get_run_report(run.id)
+        if report is None:
+            raise RuntimeError('report row is missing')
+        upload_path = run.input_image.storage_path
+        workdir = os.path.join(os.path.dirname(report.pdf_path), 'tmp')
+        cached = result_cache.lookup(db, report.sha256) if report.sha256 else None
+        if cached is not None:
+            metrics, assets = cached.metrics, cached.assets
+        else:
+            metrics, assets = analyze_image(upload_path, workdir)
+        report.metrics = metrics
+        report.assets = assets
+        report.image_path = upload_path
+    except Exception:
+        db.rollback()
+        logger.exception(f"job failed run_id={run.id} user_id={run.user_id}")
+        if not _finish_run(db, run.id, STATUS_FAILED):
+            db.rollback()
+            logger.warning(f"job already reclaimed run_id={run.id} user_id={run.user_id}")
+            return False
+        # the attempt was reserved when the job was queued
+        QuotaService(db).refund(run.user_id, commit=False)
+        record_usage(db, run.user_id, failures=1, bytes_uploaded=_upload_size(run), analysis_ms=(time.perf_counter() - started) * 1000)
+        db.commit()
+        invalidate_session_user(run.user_id)
+        ANALYSIS_SCANS.inc(mode='async', status='failed')
+        return False
+
+    if not _finish_run(db, run.id, STATUS_SUCCESS):
+        # timed out meanwhile: the run is FAILED and its attempt refunded, keep it that way
+        db.rollback()
+        logger.warning(f"job finished after it was reclaimed run_id={run.id} user_id={run.user_id}")
+        return False
+    record_usage(db, run.user_id, successes=1, bytes_uploaded=_upload_size(run), analysis_ms=(time.perf_counter() - started) * 1000)
+    with stage('db_commit'):
+        db.commit()
+    ANALYSIS_SCANS.inc(mode='async', status='success' if cached is None else 'cached')
+    if report.sha256 and cached is None:
+        result_cache.store(db, report.sha256, run.user_id, metrics, assets, report.pdf_path)
+    logger.info(f"job finished status=SUCCESS cached={cached is not None} run_id={run.id} user_id={run.user_id}")
+    return True
+
+
+def get_job_status(run_id: int) -> Optional[Dict[str, Any]]:
+    """Status of a run plus report path and metrics once it succeeded."""
+    with SessionLocal() as db:
+        run = db.get(ProcessingRun, run_id)
+        if run is None:
+            return None
+        report = ReportsAccessor(db).get_run_report(run_id)
+        return {
+            'run_id': run.id,
+            'user_id': run.user_id,
+            'status': run.status,
+            'report_path': report.pdf_path if report else None,
+            'metrics': report.metrics if report and run.status == STATUS_SUCCESS else None,
+        }
+
+
+def run_worker_loop(stop_event: Optional[threading.Event] = None, poll_interval: float = 1.0, once: bool = False) -> None:
+    """Claim and execute queued runs until stop_event is set.
+
+    With once=True the loop exits as soon as the queue is empty. Abandoned
+    runs are reclaimed whenever the queue runs dry. An unexpected error (the
+    database being unreachable, say) is logged and the loop backs off
+    instead of letting the worker die (with once=True the error propagates).
+    """
+    stop_event = stop_event or threading.Event()
+    backoff = WORKER_ERROR_BACKOFF
+    while not stop_event.is_set():
+        try:
+            with SessionLocal() as db:
+                run = claim_next_job(db)
+                if run is not None:
+                    # log lines of the job share a correlation id, like a request's
+                    token = request_id_var.set(f'run-{run.id}')
+                    try:
+                        execute_job(db, run)
+                    finally:
+                        request_id_var.reset(token)
+                    backoff = WORKER_ERROR_BACKOFF
+                    continue
+                reclaim_stale_jobs(db)
+        except Exception:
+            if once:
+                raise
+            logger.exception(f"job worker iteration failed, retrying in {backoff:.0f}s")
+            stop_event.wait(backoff)
+            backoff = min(backoff * 2, WORKER_MAX_BACKOFF)
+            continue
+        backoff = WORKER_ERROR_BACKOFF
+        if once:
+            return
+        stop_event.wait(poll_interval)
@@ -0,0 +1,153 @@
+"""
+Bounded worker pool for the CPU-bound analysis pipeline.
+
+analyze_image (NumPy) and render_report (ReportLab) run in a process pool (or
+a thread pool) instead of on the event loop. Admission is bounded: at most
+``workers + max_queue`` pipelines may be in flight; beyond that try_acquire()
+fails and the caller answers 429 with a Retry-After estimate.
+"""
+import asyncio
+import math
+import multiprocessing
+import threading
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Tuple
+
+from app.services.metrics import ANALYSIS_POOL_WAIT_SECONDS, collect_stage_timings, observe_stage_timings
+
+
+def _timed_call(fn: Callable, args: tuple, kwargs: dict) -> Tuple[float, Any, list]:
+    # Runs inside the worker; the start timestamp lets the parent measure
+    # how long the task waited in the executor queue, the stage timings
+    # recorded by fn are observed into the parent's metrics registry.
+    started_at = time.time()
+    result, stages = collect_stage_timings(fn, *args, **kwargs)
+    return started_at, result, stages
+
+
+class AnalysisPool:
+    """Executor wrapper with admission control and queue/wait statistics."""
+
+    def __init__(self, workers: int, max_queue: int, kind: str = 'process'):
+        if workers < 1:
+            raise ValueError('workers must be >= 1')
+        if kind not in ('process', 'thread'):
+            raise ValueError(f"unknown executor kind '{kind}'")
+        self.workers = workers
+        self.max_queue = max(0, max_queue)
+        self.kind = kind
+        self._executor: Executor = None
+        self._lock = threading.Lock()
+        # pipelines admitted via try_acquire (a pipeline = several tasks)
+        self._admitted = 0
+        # tasks submitted to the executor and not finished yet
+        self._tasks = 0
+        self._counters = {
+            'submitted': 0,
+            'completed': 0,
+            'failed': 0,
+            'rejected': 0,
+        }
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+        self._run_total = 0.0
+
+    @property
+    def capacity(self) -> int:
+        return self.workers + self.max_queue
+
+    def _get_executor(self) -> Executor:
+        with self._lock:
+            if self._executor is None:
+                if self.kind == 'process':
+                    # spawn: do not fork the server's threads and DB connections
+                    self._executor = ProcessPoolExecutor(
+                        max_workers=self.workers,
+                        mp_context=multiprocessing.get_context('spawn'),
+                    )
+                else:
+                    self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='analysis')
+            return self._executor
+
+    def try_acquire(self) -> bool:
+        """Admit one pipeline; False when the pool is saturated."""
+        with self._lock:
+            if self._admitted >= self.capacity:
+                self._counters['rejected'] += 1
+                return False
+            self._admitted += 1
+            return True
+
+    def acquire_up_to(self, count: int) -> int:
+        """Admit up to `count` more pipelines without blocking; returns how many were admitted.
+
+        Used by a pipeline that already holds a slot to widen its own fan-out,
+        so a shortfall is not counted as a rejection.
+        """
+        with self._lock:
+            granted = max(0, min(count, self.capacity - self._admitted))
+            self._admitted += granted
+            return granted
+
+    def release(self, count: int = 1) -> None:
+        with self._lock:
+            self._admitted = max(0, self._admitted - count)
+
+    async def run(self, fn: Callable, *args, **kwargs) -> Any:
+        """Run fn(*args, **kwargs) in the pool and await its result."""
+        executor = self._get_executor()
+        submitted_at = time.time()
+        with self._lock:
+            self._tasks += 1
+            self._counters['submitted'] += 1
+        failed = True
+        started_at = None
+        try:
+            future = executor.submit(_timed_call, fn, args, kwargs)
+            started_at, result, stages = await asyncio.wrap_future(future)
+            failed = False
+            observe_stage_timings(stages)
+            return result
+        finally:
+            finished_at = time.time()
+            with self._lock:
+                self._tasks -= 1
+                self._counters['failed' if failed else 'completed'] += 1
+                if started_at is not None:
+                    wait = max(0.0, started_at - submitted_at)
+                    self._wait_total += wait
+                    self._wait_max = max(self._wait_max, wait)
+                    self._run_total += max(0.0, finished_at - started_at)
+            if started_at is not None:
+                ANALYSIS_POOL_WAIT_SECONDS.observe(wait)
+
+    def retry_after(self) -> int:
+        """Seconds a rejected client should wait before retrying (>= 1)."""
+        with self._lock:
+            done = self._counters['completed']
+            avg_run = self._run_total / done if done else 1.0
+            backlog = self._admitted
+        return max(1, math.ceil(avg_run * backlog / self.workers))
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            done = self._counters['completed']
+            return {
+                'executor': self.kind,
+                'workers': self.workers,
+                'max_queue': self.max_queue,
+                'in_flight': self._admitted,
+                'running_tasks': min(self._tasks, self.workers),
+                'queue_depth': max(0, self._tasks - self.workers),
+                **self._counters,
+                'wait_ms_avg': (self._wait_total / done * 1000.0) if done else 0.0,
+                'wait_ms_max': self._wait_max * 1000.0,
+                'run_ms_avg': (self._run_total / done * 1000.0) if done else 0.0,
+            }
+
+    def shutdown(self) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True, cancel_futures=True)
@@ -0,0 +1,184 @@
+"""
+Stateless signed API tokens.
+
+A token is ``<payload>.<signature>``, both base64url: the payload is JSON
+with the user id, role, plan id, expiry and a random token id (jti), the
+signature an HMAC-SHA256 of the payload. Verifying a token costs one HMAC
+and a set lookup — no database round trip.
+
+Revocation goes through a denylist of jti values kept in memory and
+refreshed from the api_token_revocations table every sync_interval seconds
+by a background thread, so a token revoked on another worker is rejected
+here after at most one interval. Revocations made in this process apply
+immediately. start() (app startup) loads the denylist before the first
+request and starts the thread; a token verified before any load triggers
+a synchronous one, so revoked tokens are never accepted for lack of a sync.
+"""
+import base64
+import hashlib
+import hmac
+import json
+import logging
+import secrets
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Callable, Optional, Set, Tuple
+
+from sqlalchemy.orm import Session
+
+from app.models.models import ApiTokenRevocation
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True, slots=True)
+class ApiPrincipal:
+    """Authenticated caller of the JSON API (from a token or the session)."""
+    id: int
+    role: str
+    plan_id: int
+    # set for token-authenticated calls
+    jti: Optional[str] = None
+    expires_at: Optional[int] = None
+
+
+class InvalidToken(Exception):
+    pass
+
+
+def _b64encode(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).decode('ascii').rstrip('=')
+
+
+def _b64decode(data: str) -> bytes:
+    return base64.urlsafe_b64decode(data + '=' * (-len(data) % 4))
+
+
+class ApiTokenService:
+    """Issue/verify HMAC-signed tokens with a periodically synced revocation denylist."""
+
+    def __init__(
+        self,
+        secret: str,
+        ttl_seconds: int,
+        session_factory: Callable[[], Session],
+        sync_interval: float = 30.0,
+    ):
+        if not secret:
+            raise ValueError('API token secret must not be empty')
+        self._key = hashlib.sha256(f'api-token:{secret}'.encode('utf-8')).digest()
+        self.ttl_seconds = ttl_seconds
+        self.sync_interval = sync_interval
+        self._session_factory = session_factory
+        self._lock = threading.Lock()
+        self._denylist: Set[str] = set()
+        self._last_sync = 0.0
+        self._initial_sync = threading.Lock()
+        self._stop = threading.Event()
+        self._syncer: Optional[threading.Thread] = None
+
+    def _sign(self, payload: str) -> str:
+        return _b64encode(hmac.new(self._key, payload.encode('utf-8'), hashlib.sha256).digest())
+
+    def issue(self, user_id: int, role: str, plan_id: int) -> Tuple[str, ApiPrincipal]:
+        """New token for the user and the principal it stands for."""
+        principal = ApiPrincipal(
+            id=user_id,
+            role=role,
+            plan_id=plan_id,
+            jti=secrets.token_hex(16),
+            expires_at=int(time.time()) + self.ttl_seconds,
+        )
+        body = {'uid': principal.id, 'role': principal.role, 'plan': principal.plan_id, 'exp': principal.expires_at, 'jti': principal.jti}
+        payload = _b64encode(json.dumps(body, separators=(',', ':')).encode('utf-8'))
+        return f'{payload}.{self._sign(payload)}', principal
+
+    def verify(self, token: str) -> ApiPrincipal:
+        """Principal of a valid, unexpired, unrevoked token; InvalidToken otherwise."""
+        payload, _, signature = token.partition('.')
+        if not payload or not signature or not hmac.compare_digest(signature.encode('utf-8'), self._sign(payload).encode('ascii')):
+            raise InvalidToken('bad signature')
+        try:
+            body = json.loads(_b64decode(payload))
+            principal = ApiPrincipal(
+                id=int(body['uid']),
+                role=str(body['role']),
+                plan_id=int(body['plan']),
+                jti=str(body['jti']),
+                expires_at=int(body['exp']),
+            )
+        except (ValueError, KeyError, TypeError):
+            raise InvalidToken('malformed token')
+        if principal.expires_at <= time.time():
+            raise InvalidToken('token expired')
+        if not self._last_sync:
+            self._load_denylist()
+        with self._lock:
+            if principal.jti in self._denylist:
+                raise InvalidToken('token revoked')
+        return principal
+
+    def revoke(self, db: Session, principal: ApiPrincipal) -> None:
+        """Persist the revocation (own commit) and deny the token in this process at once."""
+        db.merge(ApiTokenRevocation(
+            jti=principal.jti,
+            user_id=principal.id,
+            expires_at=datetime.utcfromtimestamp(principal.expires_at),
+        ))
+        db.commit()
+        with self._lock:
+            self._denylist.add(principal.jti)
+
+    def sync(self) -> int:
+        """Reload the denylist from revocations of tokens that have not expired yet."""
+        with self._session_factory() as db:
+            jtis = {
+                jti for (jti,) in db.query(ApiTokenRevocation.jti)
+                .filter(ApiTokenRevocation.expires_at > datetime.utcnow())
+            }
+        with self._lock:
+            self._denylist = jtis
+            self._last_sync = time.monotonic()
+        return len(jtis)
+
+    def _load_denylist(self) -> None:
+        # first load: concurrent verifications wait for one sync instead of each running it
+        with self._initial_sync:
+            if not self._last_sync:
+                self.sync()
+
+    def start(self) -> None:
+        """Load the denylist now and keep it fresh in a background thread."""
+        try:
+            self._load_denylist()
+        except Exception:
+            # verify() retries the load and fails closed until it succeeds
+            logger.warning('api token denylist initial sync failed', exc_info=True)
+        if self._syncer is not None or self.sync_interval <= 0:
+            return
+        self._stop.clear()
+        self._syncer = threading.Thread(target=self._sync_loop, name='api-token-denylist', daemon=True)
+        self._syncer.start()
+
+    def _sync_loop(self) -> None:
+        while not self._stop.wait(self.sync_interval):
+            try:
+                self.sync()
+            except Exception:
+                logger.warning('api token denylist sync failed', exc_info=True)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                'denylist_size': len(self._denylist),
+                'last_sync_age': time.monotonic() - self._last_sync if self._last_sync else None,
+                'ttl_seconds': self.ttl_seconds,
+            }
+
+    def close(self) -> None:
+        self._stop.set()
+        if self._syncer is not None:
+            self._syncer.join(timeout=5)
+            self._syncer = None
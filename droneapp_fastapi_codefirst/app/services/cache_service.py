@@ -1,101 +1,296 @@
 """
 In-memory cache service для кэширования данных приложения.
-Простая реализация на основе dict с поддержкой TTL.
+Ограниченный по размеру потокобезопасный LRU-кэш с поддержкой TTL.
 """
+import heapq
+import sys
+import threading
 import time
-from typing import Any, Optional, Dict, Tuple
+from collections import OrderedDict
+from itertools import islice
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+# Разделитель пространств имен в ключах: "users:detail:5"
+NAMESPACE_SEPARATOR = ':'
+
+
+_SCALAR_TYPES = frozenset({str, bytes, bytearray, int, float, bool, type(None)})
+# у длинных коллекций оценивается только начало, результат масштабируется
+_SIZE_SAMPLE = 16
+
+
+def estimate_size(value: Any, _depth: int = 0) -> int:
+    """
+    Приблизительный размер значения в байтах (для лимита max_bytes).
+
+    Учитывает вложенные контейнеры и объекты со __slots__/__dict__
+    на глубину до 3 уровней; точность не требуется, важен порядок величины.
+    """
+    size = sys.getsizeof(value)
+    kind = type(value)
+    if kind in _SCALAR_TYPES or _depth >= 3:
+        return size
+    if kind is dict:
+        items = value.items()
+        if len(value) > _SIZE_SAMPLE:
+            items = islice(items, _SIZE_SAMPLE)
+        inner = sum(estimate_size(k, _depth + 1) + estimate_size(v, _depth + 1) for k, v in items)
+        return size + inner * max(1, len(value)) // max(1, min(len(value), _SIZE_SAMPLE))
+    if kind in (list, tuple, set, frozenset):
+        inner = sum(estimate_size(v, _depth + 1) for v in islice(value, _SIZE_SAMPLE))
+        return size + inner * max(1, len(value)) // max(1, min(len(value), _SIZE_SAMPLE))
+    slots = getattr(kind, '__slots__', None)
+    if slots:
+        return size + sum(estimate_size(getattr(value, name, None), _depth + 1) for name in slots)
+    if hasattr(value, '__dict__'):
+        return size + estimate_size(vars(value), _depth + 1)
+    return size
+
+
+def _namespace(key: str) -> Optional[str]:
+    """Пространство имен ключа: "users:detail:5" -> "users:" (None, если без ':')."""
+    pos = key.find(NAMESPACE_SEPARATOR)
+    return key[:pos + 1] if pos != -1 else None
 
 
 class MemoryCacheService:
     """
-    Простой in-memory cache с поддержкой TTL.
-    
-    Хранит данные в формате: {key: (expires_at, value)}
-    Автоматически очищает истекшие записи при get/is_set.
+    Потокобезопасный in-memory LRU-кэш с поддержкой TTL.
+
+    Хранит данные в формате: {key: (expires_at, value, size)} в порядке
+    последнего обращения. Ограничен max_entries и max_bytes: при превышении
+    вытесняются давно не использованные записи. Истекшие записи удаляются
+    при чтении и фоновым потоком раз в sweep_interval секунд.
+
+    Ключи индексируются по пространству имен (часть до первого ':'),
+    поэтому remove_by_prefix("users:") работает за O(число совпадений).
     """
-    
-    def __init__(self):
-        self._cache: Dict[str, Tuple[float, Any]] = {}
-    
+
+    def __init__(
+        self,
+        max_entries: int = 10_000,
+        max_bytes: int = 64 * 1024 * 1024,
+        sweep_interval: float = 30.0,
+        sizeof: Callable[[Any], int] = estimate_size,
+    ):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.sweep_interval = sweep_interval
+        self._sizeof = sizeof
+        self._lock = threading.Lock()
+        self._cache: "OrderedDict[str, Tuple[float, Any, int]]" = OrderedDict()
+        self._bytes = 0
+        # namespace ("users:") -> ключи в нем
+        self._namespaces: Dict[str, Set[str]] = {}
+        # (expires_at, key) для фоновой очистки; устаревшие элементы пропускаются
+        self._expiry_heap: List[Tuple[float, str]] = []
+        self._stats = {'hits': 0, 'misses': 0, 'sets': 0, 'evictions': 0, 'expirations': 0}
+        self._stop = threading.Event()
+        self._sweeper: Optional[threading.Thread] = None
+
+    # ------------------------------------------------------------------
+    # Внутренние операции (вызываются под self._lock)
+    # ------------------------------------------------------------------
+
+    def _delete(self, key: str) -> None:
+        _, _, size = self._cache.pop(key)
+        self._bytes -= size
+        ns = _namespace(key)
+        if ns is not None:
+            bucket = self._namespaces[ns]
+            bucket.discard(key)
+            if not bucket:
+                del self._namespaces[ns]
+
+    def _evict_overflow(self) -> None:
+        while self._cache and (len(self._cache) > self.max_entries or self._bytes > self.max_bytes):
+            oldest = next(iter(self._cache))
+            self._delete(oldest)
+            self._stats['evictions'] += 1
+
+    def _sweep_expired(self, now: float) -> int:
+        removed = 0
+        heap = self._expiry_heap
+        while heap and heap[0][0] <= now:
+            expires_at, key = heapq.heappop(heap)
+            entry = self._cache.get(key)
+            # ключ мог быть перезаписан с новым TTL или уже удален
+            if entry is not None and entry[0] == expires_at:
+                self._delete(key)
+                removed += 1
+        # куча копит устаревшие элементы после перезаписей — периодически перестраиваем
+        if len(heap) > 2 * len(self._cache) + 1024:
+            self._expiry_heap = [(entry[0], key) for key, entry in self._cache.items()]
+            heapq.heapify(self._expiry_heap)
+        self._stats['expirations'] += removed
+        return removed
+
+    def _ensure_sweeper(self) -> None:
+        if self._sweeper is None and self.sweep_interval > 0:
+            self._sweeper = threading.Thread(target=self._sweep_loop, name='cache-sweeper', daemon=True)
+            self._sweeper.start()
+
+    def _sweep_loop(self) -> None:
+        while not self._stop.wait(self.sweep_interval):
+            self.sweep()
+
+    # ------------------------------------------------------------------
+    # Публичный API
+    # ------------------------------------------------------------------
+
     def get(self, key: str) -> Optional[Any]:
         """
         Получает значение из кэша по ключу.
-        
+
         Args:
             key: Ключ для поиска
-            
+
         Returns:
             Значение или None, если ключ не найден или истек TTL
         """
-        if key not in self._cache:
-            return None
-        
-        expires_at, value = self._cache[key]
-        
-        # Проверка TTL
-        if time.time() > expires_at:
-            del self._cache[key]
-            return None
-        
-        return value
-    
+        with self._lock:
+            entry = self._cache.get(key)
+            if entry is None:
+                self._stats['misses'] += 1
+                return None
+
+            # Проверка TTL
+            if time.time() > entry[0]:
+                self._delete(key)
+                self._stats['expirations'] += 1
+                self._stats['misses'] += 1
+                return None
+
+            self._cache.move_to_end(key)
+            self._stats['hits'] += 1
+            return entry[1]
+
     def set(self, key: str, value: Any, ttl_seconds: int = 60) -> None:
         """
         Сохраняет значение в кэш с указанным TTL.
-        
+        При превышении лимитов вытесняет давно не использованные записи.
+
         Args:
             key: Ключ для сохранения
             value: Значение для сохранения
             ttl_seconds: Время жизни в секундах (по умолчанию 60)
         """
         expires_at = time.time() + ttl_seconds
-        self._cache[key] = (expires_at, value)
-    
+        size = self._sizeof(value)
+        with self._lock:
+            if key in self._cache:
+                self._delete(key)
+            self._cache[key] = (expires_at, value, size)
+            self._bytes += size
+            ns = _namespace(key)
+            if ns is not None:
+                bucket = self._namespaces.get(ns)
+                if bucket is None:
+                    bucket = self._namespaces[ns] = set()
+                bucket.add(key)
+            heapq.heappush(self._expiry_heap, (expires_at, key))
+            self._stats['sets'] += 1
+            if len(self._cache) > self.max_entries or self._bytes > self.max_bytes:
+                self._evict_overflow()
+            if self._sweeper is None:
+                self._ensure_sweeper()
+
     def is_set(self, key: str) -> bool:
         """
         Проверяет, существует ли ключ в кэше (и не истек ли TTL).
-        
+        Не влияет на порядок LRU и статистику попаданий.
+
         Args:
             key: Ключ для проверки
-            
+
         Returns:
             True, если ключ существует и не истек, False иначе
         """
-        if key not in self._cache:
-            return False
-        
-        expires_at, _ = self._cache[key]
-        
-        # Проверка TTL
-        if time.time() > expires_at:
-            del self._cache[key]
-            return False
-        
-        return True
-    
+        with self._lock:
+            entry = self._cache.get(key)
+            if entry is None:
+                return False
+
+            # Проверка TTL
+            if time.time() > entry[0]:
+                self._delete(key)
+                self._stats['expirations'] += 1
+                return False
+
+            return True
+
     def remove(self, key: str) -> None:
         """
         Удаляет ключ из кэша.
-        
+
         Args:
             key: Ключ для удаления
         """
-        self._cache.pop(key, None)
-    
+        with self._lock:
+            if key in self._cache:
+                self._delete(key)
+
     def remove_by_prefix(self, prefix: str) -> None:
         """
         Удаляет все ключи, начинающиеся с указанного префикса.
-        
+        Для пространства имен ("users:") — O(число совпадений), для более
+        длинного префикса ("users:detail:") — просмотр только ключей "users:",
+        для префикса без ':' — полный просмотр ключей.
+
         Args:
             prefix: Префикс для поиска ключей
         """
-        keys_to_remove = [key for key in self._cache.keys() if key.startswith(prefix)]
-        for key in keys_to_remove:
-            del self._cache[key]
-    
+        with self._lock:
+            ns = _namespace(prefix)
+            if ns is None:
+                keys_to_remove = [key for key in self._cache if key.startswith(prefix)]
+            elif ns == prefix:
+                keys_to_remove = list(self._namespaces.get(ns, ()))
+            else:
+                keys_to_remove = [key for key in self._namespaces.get(ns, ()) if key.startswith(prefix)]
+            for key in keys_to_remove:
+                self._delete(key)
+
+    def sweep(self) -> int:
+        """
+        Удаляет все истекшие записи (вызывается фоновым потоком).
+
+        Returns:
+            Количество удаленных записей
+        """
+        with self._lock:
+            return self._sweep_expired(time.time())
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Статистика кэша: попадания, промахи, вытеснения, текущий размер.
+        """
+        with self._lock:
+            lookups = self._stats['hits'] + self._stats['misses']
+            return {
+                **self._stats,
+                'hit_ratio': self._stats['hits'] / lookups if lookups else 0.0,
+                'entries': len(self._cache),
+                'bytes': self._bytes,
+                'max_entries': self.max_entries,
+                'max_bytes': self.max_bytes,
+            }
+
     def clear(self) -> None:
         """
         Очищает весь кэш.
         """
-        self._cache.clear()
+        with self._lock:
+            self._cache.clear()
+            self._namespaces.clear()
+            self._expiry_heap.clear()
+            self._bytes = 0
 
+    def close(self) -> None:
+        """
+        Останавливает фоновую очистку.
+        """
+        self._stop.set()
+        if self._sweeper is not None:
+            self._sweeper.join(timeout=5)
+            self._sweeper = None
@@ -0,0 +1,168 @@
+"""
+Connection pool instrumentation for the SQLAlchemy engine.
+
+InstrumentedQueuePool / InstrumentedAsyncQueuePool time every checkout
+(including the wait for a free connection) and count QueuePool limit
+timeouts; pool events count new connections and invalidations. PoolMetrics
+records them in the shared metrics REGISTRY (label pool=<name>), so they are
+served by GET /metrics with everything else, and logs a warning when the pool
+is close to exhaustion.
+"""
+import logging
+import threading
+import time
+from typing import Any, Dict, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+from app.services.metrics import REGISTRY, Counter, Gauge, Histogram
+
+logger = logging.getLogger(__name__)
+
+# upper bounds (seconds) of the checkout latency histogram
+CHECKOUT_BUCKETS = (0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 30.0)
+# at most one "pool nearly exhausted" warning per interval
+WARN_INTERVAL = 60.0
+
+DB_POOL_SIZE = REGISTRY.register(Gauge('db_pool_size', 'Configured number of persistent connections.', ('pool',)))
+DB_POOL_MAX_OVERFLOW = REGISTRY.register(Gauge('db_pool_max_overflow', 'Configured overflow connections.', ('pool',)))
+DB_POOL_CHECKED_OUT = REGISTRY.register(Gauge('db_pool_checked_out', 'Connections currently in use.', ('pool',)))
+DB_POOL_CHECKED_IN = REGISTRY.register(Gauge('db_pool_checked_in', 'Idle connections in the pool.', ('pool',)))
+DB_POOL_OVERFLOW = REGISTRY.register(Gauge('db_pool_overflow', 'Overflow connections currently open.', ('pool',)))
+DB_POOL_CHECKOUTS = REGISTRY.register(Counter('db_pool_checkouts_total', 'Connection checkouts.', ('pool',)))
+DB_POOL_TIMEOUTS = REGISTRY.register(Counter('db_pool_checkout_timeouts_total', 'Checkouts that hit the pool timeout.', ('pool',)))
+DB_POOL_CONNECTS = REGISTRY.register(Counter('db_pool_connects_total', 'New DBAPI connections opened.', ('pool',)))
+DB_POOL_INVALIDATIONS = REGISTRY.register(Counter('db_pool_invalidations_total', 'Connections invalidated.', ('pool',)))
+DB_POOL_CHECKOUT_SECONDS = REGISTRY.register(Histogram(
+    'db_pool_checkout_seconds', 'Time to check a connection out of the pool, including waiting.', ('pool',),
+    buckets=CHECKOUT_BUCKETS,
+))
+
+
+class PoolMetrics:
+    """Checkout latency, counters and saturation warnings of one pool."""
+
+    def __init__(self, name: str = 'default', warn_ratio: float = 0.8, slow_checkout: float = 1.0):
+        self.name = name
+        self.warn_ratio = warn_ratio
+        self.slow_checkout = slow_checkout
+        self._lock = threading.Lock()
+        self._pool: Optional[QueuePool] = None
+        self._checkout_max = 0.0
+        self._last_warning = 0.0
+
+    def attach(self, engine: Engine) -> None:
+        """Hook into engine.pool (sync Engine or AsyncEngine.sync_engine).
+
+        A no-op for pools other than the instrumented QueuePool classes.
+        """
+        pool = engine.pool
+        if not isinstance(pool, _InstrumentedPoolMixin):
+            return
+        pool.metrics = self
+        self._pool = pool
+        event.listen(pool, 'connect', self._on_connect)
+        event.listen(pool, 'invalidate', self._on_invalidate)
+        # export the counters from zero, before the first event
+        for counter in (DB_POOL_CHECKOUTS, DB_POOL_TIMEOUTS, DB_POOL_CONNECTS, DB_POOL_INVALIDATIONS):
+            counter.inc(0, pool=self.name)
+        # read at scrape time from the current pool (engine.dispose() replaces it)
+        DB_POOL_SIZE.set_function(lambda: self._pool.size(), pool=self.name)
+        DB_POOL_MAX_OVERFLOW.set_function(lambda: self._pool._max_overflow, pool=self.name)
+        DB_POOL_CHECKED_OUT.set_function(lambda: self._pool.checkedout(), pool=self.name)
+        DB_POOL_CHECKED_IN.set_function(lambda: self._pool.checkedin(), pool=self.name)
+        DB_POOL_OVERFLOW.set_function(lambda: max(0, self._pool.overflow()), pool=self.name)
+
+    def _on_connect(self, dbapi_connection, connection_record) -> None:
+        DB_POOL_CONNECTS.inc(pool=self.name)
+
+    def _on_invalidate(self, dbapi_connection, connection_record, exception) -> None:
+        DB_POOL_INVALIDATIONS.inc(pool=self.name)
+
+    def record_checkout(self, pool: QueuePool, seconds: float) -> None:
+        DB_POOL_CHECKOUTS.inc(pool=self.name)
+        DB_POOL_CHECKOUT_SECONDS.observe(seconds, pool=self.name)
+        with self._lock:
+            self._checkout_max = max(self._checkout_max, seconds)
+        limit = pool.size() + max(0, pool._max_overflow)
+        in_use = pool.checkedout()
+        if seconds >= self.slow_checkout or (limit > 0 and in_use >= limit * self.warn_ratio):
+            self._warn(f'db pool {self.name} under pressure: {in_use}/{limit} connections in use, '
+                       f'checkout took {seconds * 1000.0:.1f} ms')
+
+    def record_timeout(self, pool: QueuePool, seconds: float) -> None:
+        DB_POOL_TIMEOUTS.inc(pool=self.name)
+        logger.error(f'db pool {self.name} exhausted: no connection after {seconds:.1f}s '
+                     f'({pool.checkedout()} in use, overflow {max(0, pool.overflow())})')
+
+    def _warn(self, message: str) -> None:
+        now = time.monotonic()
+        with self._lock:
+            if now - self._last_warning < WARN_INTERVAL:
+                return
+            self._last_warning = now
+        logger.warning(message)
+
+    def stats(self) -> Dict[str, Any]:
+        pool = self._pool
+        checkouts, checkout_sum = DB_POOL_CHECKOUT_SECONDS.snapshot(pool=self.name)
+        with self._lock:
+            checkout_max = self._checkout_max
+        stats: Dict[str, Any] = {
+            'checkouts': int(DB_POOL_CHECKOUTS.value(pool=self.name)),
+            'timeouts': int(DB_POOL_TIMEOUTS.value(pool=self.name)),
+            'connects': int(DB_POOL_CONNECTS.value(pool=self.name)),
+            'invalidations': int(DB_POOL_INVALIDATIONS.value(pool=self.name)),
+            'checkout_ms_avg': (checkout_sum / checkouts * 1000.0) if checkouts else 0.0,
+            'checkout_ms_max': checkout_max * 1000.0,
+        }
+        if pool is not None:
+            stats.update({
+                'size': pool.size(),
+                'max_overflow': pool._max_overflow,
+                'checked_out': pool.checkedout(),
+                'checked_in': pool.checkedin(),
+                'overflow': max(0, pool.overflow()),
+            })
+        return stats
+
+
+class _InstrumentedPoolMixin:
+    """Reports checkout latency and timeouts of a QueuePool to PoolMetrics."""
+
+    metrics: Optional[PoolMetrics] = None
+
+    def connect(self):
+        metrics = self.metrics
+        if metrics is None:
+            return super().connect()
+        started = time.perf_counter()
+        try:
+            connection = super().connect()
+        except PoolTimeoutError:
+            metrics.record_timeout(self, time.perf_counter() - started)
+            raise
+        metrics.record_checkout(self, time.perf_counter() - started)
+        return connection
+
+    def recreate(self):
+        # engine.dispose() swaps in a new pool; keep reporting to the same metrics
+        pool = super().recreate()
+        pool.metrics = self.metrics
+        if self.metrics is not None:
+            self.metrics._pool = pool
+        return pool
+
+
+class InstrumentedQueuePool(_InstrumentedPoolMixin, QueuePool):
+    # log under SQLAlchemy's QueuePool logger (WARN unless echo_pool is set)
+    _sqla_logger_namespace = 'sqlalchemy.pool.impl.QueuePool'
+
+
+class InstrumentedAsyncQueuePool(_InstrumentedPoolMixin, AsyncAdaptedQueuePool):
+    """Same for the AsyncEngine (checkout runs in SQLAlchemy's greenlet bridge)."""
+
+    _sqla_logger_namespace = 'sqlalchemy.pool.impl.AsyncAdaptedQueuePool'
@@ -0,0 +1,117 @@
+"""
+LUT-based heatmap rendering for analysis assets.
+
+Maps a 2D float array through a 256-entry RGB lookup table with NumPy fancy
+indexing and writes the PNG directly through Pillow. Output colors match
+matplotlib's ``cmap(Normalize()(arr), bytes=True)`` for the same colormap, but
+no pyplot figure or global state is involved, so rendering is thread-safe.
+"""
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+from PIL import Image
+
+
+# 256 x RGB tables, identical to matplotlib's RdYlGn / viridis at N=256.
+_LUT_HEX: Dict[str, str] = {
+    'RdYlGn': (
+    'a50026a60126a80326aa0526ac0726ae0926b00b26b20d26b40f26b61026b81226ba1426bc1626be1826c01a26c21c26'
+    'c41e26c62026c82126ca2326cc2526ce2726d02926d22b26d42d26d62f26d73127d83328d93529da382adc3a2bdd3d2d'
+    'de3f2edf412fe04430e14631e24932e44b33e54d34e65035e75236e85538e95739ea593aec5c3bed5e3cee613def633e'
+    'f0653ff16840f26a41f46d43f46f44f47245f57446f57747f57948f67c4af67e4bf6814cf7834df7864ef7894ff88b51'
+    'f88e52f89053f99354f99555fa9856fa9a58fa9d59fb9f5afba25bfba55cfca75efcaa5ffcac60fdae61fdb063fdb265'
+    'fdb466fdb668fdb86afdba6bfdbc6dfdbe6efdc070fdc272fdc473fdc675fdc877fdca78fdcc7afdce7cfdd07dfdd27f'
+    'fdd481fdd682fdd884fdda86fddc87fdde89fee08bfee18dfee28ffee391fee493fee695fee797fee899fee99bfeea9d'
+    'feec9ffeeda1feeea3feefa5fef1a7fef2a9fef3abfef4adfef5affef7b1fef8b3fef9b5fefab7fefbb9fefdbbfefebd'
+    'fefebdfcfebbfbfdb9f9fcb7f8fcb5f6fbb3f5fab1f3faaff2f9adf0f9abeff8a9edf7a7ecf7a5eaf6a3e9f5a1e7f59f'
+    'e6f49de4f49be3f399e1f297e0f295def193ddf091dbf08fdaef8dd9ef8bd7ee89d5ed88d3ec87d1eb85cfea84cde983'
+    'cbe881c9e880c7e77fc5e67ec3e57cc1e47bbfe37abde278bbe277b9e176b7e075b5df73b3de72b1dd71afdc6faddc6e'
+    'abdb6da9da6ba7d96aa4d869a2d7699fd6699dd5699ad46898d26895d16893d06790cf678ece678bcd6789cc6686cb66'
+    '84ca6681c9667fc7657cc6657ac56577c46475c36472c26470c1646dc0636bbf6368be6366bd6363bb6260ba615db860'
+    '5ab76057b55f54b45e51b25d4eb15d4baf5c48ae5b45ad5a42ab5a3faa593ca85839a75736a55733a45630a2552da154'
+    '2a9f54279e53249d52219b511e9a511b985019974f18954e17934d16914c158f4b148d4a138b49128948118847108646'
+    '0f84450e82440d80430c7e420b7c410a7a4009783f08773e07753d06733c05713b046f3a036d39026b38016937006837'
+    ),
+    'viridis': (
+    '44015444025544035745055845065a45085b46095c460b5e460c5f460e61470f62471163471265471466471567471669'
+    '47186a48196b481a6c481c6e481d6f481e70482071482172482273482374472575472676472777472878472a79472b7a'
+    '472c7b462d7c462f7c46307d46317e45327f45347f453580453681443781443982433a83433b83433c84423d84423e85'
+    '4240854141864142864043874044873f45873f47883e48883e49893d4a893d4b893d4c893c4d8a3c4e8a3b508a3b518a'
+    '3a528b3a538b39548b39558b38568b38578c37588c37598c365a8c365b8c355c8c355d8c345e8d345f8d33608d33618d'
+    '32628d32638d31648d31658d31668d30678d30688d2f698d2f6a8d2e6b8e2e6c8e2e6d8e2d6e8e2d6f8e2c708e2c718e'
+    '2c728e2b738e2b748e2a758e2a768e2a778e29788e29798e287a8e287a8e287b8e277c8e277d8e277e8e267f8e26808e'
+    '26818e25828e25838d24848d24858d24868d23878d23888d23898d22898d228a8d228b8d218c8d218d8c218e8c208f8c'
+    '20908c20918c1f928c1f938b1f948b1f958b1f968b1e978a1e988a1e998a1e998a1e9a891e9b891e9c891e9d881e9e88'
+    '1e9f881ea0871fa1871fa2861fa38620a48520a58521a68521a78422a78423a88323a98224aa8225ab8126ac8127ad80'
+    '28ae7f29af7f2ab07e2bb17d2cb17d2eb27c2fb37b30b47a32b57a33b67935b77836b87738b97639b9763bba753dbb74'
+    '3ebc7340bd7242be7144be7045bf6f47c06e49c16d4bc26c4dc26b4fc36951c46853c56755c66657c66559c7645bc862'
+    '5ec96160c96062ca5f64cb5d67cc5c69cc5b6bcd596dce5870ce5672cf5574d05477d05279d1517cd24f7ed24e81d34c'
+    '83d34b86d44988d5478bd5468dd64490d64392d74195d73f97d83e9ad83c9dd93a9fd938a2da37a5da35a7db33aadb32'
+    'addc30afdc2eb2dd2cb5dd2bb7dd29bade27bdde26bfdf24c2df22c5df21c7e01fcae01ecde01dcfe11cd2e11bd4e11a'
+    'd7e219dae218dce218dfe318e1e318e4e318e7e419e9e419ece41aeee51bf1e51cf3e51ef6e61ff8e621fae622fde724'
+    ),
+}
+
+LUTS: Dict[str, np.ndarray] = {
+    name: np.frombuffer(bytes.fromhex(data), dtype=np.uint8).reshape(256, 3)
+    for name, data in _LUT_HEX.items()
+}
+
+# The matplotlib figure used before was 6x4 inches at 100 dpi.
+HEATMAP_MAX_SIZE: Optional[Tuple[int, int]] = (600, 400)
+HEATMAP_PNG_COMPRESS_LEVEL = 3
+
+
+def _fit_size(width: int, height: int, max_size: Tuple[int, int]) -> Tuple[int, int]:
+    scale = min(max_size[0] / width, max_size[1] / height, 1.0)
+    return max(1, int(round(width * scale))), max(1, int(round(height * scale)))
+
+
+def colorize(arr: np.ndarray, cmap: str = 'RdYlGn', vmin: Optional[float] = None, vmax: Optional[float] = None) -> np.ndarray:
+    """Map a 2D array to uint8 RGB through the named LUT.
+
+    Like imshow, the value range defaults to the array's own min/max; values
+    are quantized the way matplotlib's Colormap does (x * N, top edge folded
+    into the last bin).
+    """
+    lut = LUTS[cmap]
+    if vmin is None:
+        vmin = float(arr.min())
+    if vmax is None:
+        vmax = float(arr.max())
+    # same float32 operation order as Normalize + Colormap for identical bins
+    lo, hi = np.float32(vmin), np.float32(vmax)
+    x = np.subtract(arr, lo, dtype=np.float32)
+    if hi > lo:
+        x /= hi - lo
+        x *= np.float32(lut.shape[0])
+    else:
+        x.fill(0.0)
+    np.clip(x, 0, lut.shape[0] - 1, out=x)
+    return lut[x.astype(np.uint8)]
+
+
+def render_heatmap(
+    arr: np.ndarray,
+    path: str,
+    cmap: str = 'RdYlGn',
+    max_size: Optional[Tuple[int, int]] = HEATMAP_MAX_SIZE,
+    compress_level: int = HEATMAP_PNG_COMPRESS_LEVEL,
+) -> str:
+    """Render arr as a colormapped PNG at path.
+
+    max_size bounds the output (width, height) while keeping the aspect
+    ratio; None writes at native resolution. The array is box-downsampled
+    before colormapping, with the color range taken from the full array.
+    """
+    vmin = float(arr.min())
+    vmax = float(arr.max())
+    height, width = arr.shape[:2]
+    if max_size is not None:
+        size = _fit_size(width, height, max_size)
+        if size != (width, height):
+            img = Image.fromarray(np.asarray(arr, dtype=np.float32))
+            arr = np.asarray(img.resize(size, Image.BOX))
+    rgb = colorize(arr, cmap=cmap, vmin=vmin, vmax=vmax)
+    Image.fromarray(rgb).save(path, format='PNG', compress_level=compress_level)
+    return path
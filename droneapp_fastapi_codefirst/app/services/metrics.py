@@ -0,0 +1,280 @@
+"""
+In-process metrics rendered in the Prometheus text exposition format.
+
+Counter / Gauge / Histogram keep their samples in dicts keyed by label
+values behind one lock each; an observation is a bisect plus two additions,
+cheap enough to leave on in production. REGISTRY.render() is what GET /metrics
+serves, no exporter process is involved; other modules register their
+metrics here too (the DB pool metrics in app.services.db_pool_metrics).
+
+Pipeline stages that run inside the analysis pool (possibly a child process)
+use stage(); AnalysisPool collects those timings in the worker and observes
+them into ANALYSIS_STAGE_SECONDS in the server process (collect_stage_timings /
+observe_stage_timings). Every uvicorn worker process has its own registry.
+"""
+import functools
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Sequence, Tuple
+
+from app.logging_config import dropped_records
+
+# seconds; covers a cached hit (ms) up to a large orthomosaic (minutes)
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+
+
+def _escape_label_value(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = '') -> str:
+    pairs = [f'{name}="{_escape_label_value(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+class _Metric:
+    kind = ''
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, Any]) -> Tuple[str, ...]:
+        if len(labels) != len(self.labelnames):
+            raise ValueError(f'{self.name} expects labels {self.labelnames}, got {tuple(labels)}')
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def _samples(self) -> List[str]:
+        raise NotImplementedError
+
+    def render(self) -> List[str]:
+        return [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} {self.kind}', *self._samples()]
+
+
+class Counter(_Metric):
+    kind = 'counter'
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            values = list(self._values.items())
+        return [f'{self.name}{_format_labels(self.labelnames, key)} {value}' for key, value in values]
+
+
+class Gauge(_Metric):
+    """Gauge set directly, or computed at scrape time via set_function()."""
+
+    kind = 'gauge'
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._functions: Dict[Tuple[str, ...], Callable[[], float]] = {}
+
+    def set(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels) -> None:
+        self.inc(-amount, **labels)
+
+    def set_function(self, fn: Callable[[], float], **labels) -> None:
+        """Report fn() for these label values at scrape time instead of a stored value."""
+        key = self._key(labels)
+        with self._lock:
+            self._functions[key] = fn
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            values = dict(self._values)
+            functions = list(self._functions.items())
+        values.update((key, fn()) for key, fn in functions)
+        return [f'{self.name}{_format_labels(self.labelnames, key)} {value}' for key, value in values.items()]
+
+
+class Histogram(_Metric):
+    kind = 'histogram'
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # label values -> [per-bucket counts (+Inf last), sum]
+        self._values: Dict[Tuple[str, ...], list] = {}
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            entry[0][index] += 1
+            entry[1] += value
+
+    def snapshot(self, **labels) -> Tuple[int, float]:
+        """(count, sum) of the observations with these label values."""
+        with self._lock:
+            entry = self._values.get(self._key(labels))
+            return (sum(entry[0]), entry[1]) if entry is not None else (0, 0.0)
+
+    @contextmanager
+    def time(self, **labels) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            values = [(key, list(counts), total) for key, (counts, total) in self._values.items()]
+        lines = []
+        bounds = [f'le="{bound}"' for bound in self.buckets] + ['le="+Inf"']
+        for key, counts, total in values:
+            cumulative = 0
+            for bound, count in zip(bounds, counts):
+                cumulative += count
+                lines.append(f'{self.name}_bucket{_format_labels(self.labelnames, key, bound)} {cumulative}')
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f'{self.name}_sum{labels} {total}')
+            lines.append(f'{self.name}_count{labels} {cumulative}')
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f'metric {metric.name} is already registered')
+            self._metrics[metric.name] = metric
+        return metric
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines: List[str] = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = Registry()
+
+HTTP_REQUEST_SECONDS = REGISTRY.register(Histogram(
+    'http_request_duration_seconds', 'HTTP request latency by route template.', ('method', 'route', 'status'),
+))
+ANALYSIS_STAGE_SECONDS = REGISTRY.register(Histogram(
+    'analysis_stage_duration_seconds',
+    'Time spent in each analysis pipeline stage (upload, load_image, indices, heatmaps, pdf, db_commit).',
+    ('stage',),
+))
+ANALYSIS_POOL_WAIT_SECONDS = REGISTRY.register(Histogram(
+    'analysis_pool_wait_seconds', 'Time a task waited in the analysis pool queue before a worker took it.',
+))
+ANALYSIS_SCANS = REGISTRY.register(Counter(
+    'analysis_scans_total', 'Analysed images by mode (single, async, batch) and status.', ('mode', 'status'),
+))
+ANALYSIS_QUOTA_REJECTIONS = REGISTRY.register(Counter(
+    'analysis_quota_rejections_total', 'Analysis requests refused with 402 (attempts exhausted).',
+))
+ANALYSIS_POOL_REJECTIONS = REGISTRY.register(Counter(
+    'analysis_pool_rejections_total', 'Analysis requests refused with 429 (analysis pool saturated).',
+))
+ANALYSIS_IN_FLIGHT = REGISTRY.register(Gauge(
+    'analysis_in_flight', 'Analysis pipelines admitted to the pool and not finished yet.',
+))
+ANALYSIS_QUEUE_DEPTH = REGISTRY.register(Gauge(
+    'analysis_queue_depth', 'Tasks waiting in the analysis pool queue.',
+))
+REPORT_DOWNLOADS = REGISTRY.register(Counter(
+    'report_downloads_total',
+    'PDF report downloads by source (cache: already rendered, rendered: first request, shared: joined a render).',
+    ('source',),
+))
+LOG_RECORDS_DROPPED = REGISTRY.register(Gauge(
+    'log_records_dropped', 'Log records dropped because the logging queue was full.',
+))
+LOG_RECORDS_DROPPED.set_function(dropped_records)
+
+
+# ---------------------------------------------------------------------------
+# Pipeline stages
+# ---------------------------------------------------------------------------
+
+_stage_buffer = threading.local()
+
+
+def record_stage(name: str, seconds: float) -> None:
+    """Observe a stage duration, or buffer it while collect_stage_timings runs."""
+    timings = getattr(_stage_buffer, 'timings', None)
+    if timings is not None:
+        timings.append((name, seconds))
+    else:
+        ANALYSIS_STAGE_SECONDS.observe(seconds, stage=name)
+
+
+@contextmanager
+def stage(name: str) -> Iterator[None]:
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_stage(name, time.perf_counter() - started)
+
+
+def timed_stage(name: str) -> Callable:
+    """Decorator form of stage() (keeps the function picklable by name)."""
+    def decorator(fn: Callable) -> Callable:
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with stage(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def collect_stage_timings(fn: Callable, *args, **kwargs) -> Tuple[Any, List[Tuple[str, float]]]:
+    """Run fn and return (result, [(stage, seconds), ...]) recorded inside it.
+
+    Used in pool workers: a child process cannot update this process' registry,
+    so the timings travel back with the result.
+    """
+    previous = getattr(_stage_buffer, 'timings', None)
+    _stage_buffer.timings = timings = []
+    try:
+        return fn(*args, **kwargs), timings
+    finally:
+        _stage_buffer.timings = previous
+
+
+def observe_stage_timings(timings: List[Tuple[str, float]]) -> None:
+    for name, seconds in timings:
+        ANALYSIS_STAGE_SECONDS.observe(seconds, stage=name)
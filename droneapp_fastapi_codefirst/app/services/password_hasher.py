@@ -0,0 +1,149 @@
+"""
+Password hashing off the event loop.
+
+pbkdf2_sha256 costs hundreds of milliseconds of CPU per call, so verify and
+hash run in a dedicated, bounded thread pool (hashlib releases the GIL while
+deriving the key). Admission is limited globally (workers + max_pending) and
+per account and per client IP, so a login burst gets 429s instead of
+stalling unrelated requests.
+
+Successful verifications are remembered for a short TTL under an HMAC of
+(password hash, password) with a per-process random key: a user logging in
+again does not pay for pbkdf2, and the cache never holds anything that can
+be checked offline. A password change yields a new hash, hence a new key.
+"""
+import asyncio
+import hashlib
+import hmac
+import secrets
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Dict, Iterator, Optional
+
+from app.deps.auth import hash_password, verify_password
+from app.services.cache_service import MemoryCacheService
+
+
+class LoginThrottled(Exception):
+    def __init__(self, retry_after: int):
+        super().__init__('Too many concurrent login attempts')
+        self.retry_after = retry_after
+
+
+class PasswordHasher:
+    """Bounded executor for verify/hash with per-account and per-IP limits."""
+
+    def __init__(
+        self,
+        workers: int,
+        max_pending: int,
+        per_account: int,
+        per_ip: int,
+        cache_service: Optional[MemoryCacheService] = None,
+        cache_ttl: int = 300,
+    ):
+        if workers < 1:
+            raise ValueError('workers must be >= 1')
+        self.workers = workers
+        self.max_pending = max(0, max_pending)
+        self.per_account = per_account
+        self.per_ip = per_ip
+        self.cache_service = cache_service
+        self.cache_ttl = cache_ttl
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='pwhash')
+        self._cache_key = secrets.token_bytes(32)
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._by_account: Dict[str, int] = {}
+        self._by_ip: Dict[str, int] = {}
+        self._counters = {'verified': 0, 'cache_hits': 0, 'hashed': 0, 'throttled': 0}
+        self._run_total = 0.0
+
+    @property
+    def capacity(self) -> int:
+        return self.workers + self.max_pending
+
+    def retry_after(self) -> int:
+        with self._lock:
+            done = self._counters['verified'] + self._counters['hashed']
+            avg_run = self._run_total / done if done else 0.5
+            backlog = self._in_flight
+        return max(1, round(avg_run * backlog / self.workers))
+
+    @contextmanager
+    def admit(self, account: str, client_ip: str) -> Iterator[None]:
+        """Reserve a slot for one login; raises LoginThrottled when a limit is reached."""
+        account = account.lower()
+        with self._lock:
+            if (
+                self._in_flight >= self.capacity
+                or self._by_account.get(account, 0) >= self.per_account
+                or self._by_ip.get(client_ip, 0) >= self.per_ip
+            ):
+                self._counters['throttled'] += 1
+                throttled = True
+            else:
+                throttled = False
+                self._in_flight += 1
+                self._by_account[account] = self._by_account.get(account, 0) + 1
+                self._by_ip[client_ip] = self._by_ip.get(client_ip, 0) + 1
+        if throttled:
+            raise LoginThrottled(self.retry_after())
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._in_flight -= 1
+                for counts, key in ((self._by_account, account), (self._by_ip, client_ip)):
+                    if counts[key] <= 1:
+                        del counts[key]
+                    else:
+                        counts[key] -= 1
+
+    def _verification_key(self, plain: str, hashed: str) -> str:
+        digest = hmac.new(self._cache_key, f'{hashed}\0{plain}'.encode('utf-8'), hashlib.sha256).hexdigest()
+        return f'auth:verified:{digest}'
+
+    def _timed(self, fn, *args):
+        started = time.perf_counter()
+        try:
+            return fn(*args)
+        finally:
+            with self._lock:
+                self._run_total += time.perf_counter() - started
+
+    async def verify(self, plain: str, hashed: str) -> bool:
+        """verify_password in the executor, short-circuited by the verification cache."""
+        key = self._verification_key(plain, hashed)
+        if self.cache_service and self.cache_service.get(key):
+            with self._lock:
+                self._counters['cache_hits'] += 1
+            return True
+        loop = asyncio.get_running_loop()
+        ok = await loop.run_in_executor(self._executor, self._timed, verify_password, plain, hashed)
+        with self._lock:
+            self._counters['verified'] += 1
+        if ok and self.cache_service:
+            self.cache_service.set(key, True, ttl_seconds=self.cache_ttl)
+        return ok
+
+    async def hash(self, plain: str) -> str:
+        loop = asyncio.get_running_loop()
+        hashed = await loop.run_in_executor(self._executor, self._timed, hash_password, plain)
+        with self._lock:
+            self._counters['hashed'] += 1
+        return hashed
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                'workers': self.workers,
+                'max_pending': self.max_pending,
+                'in_flight': self._in_flight,
+                **self._counters,
+            }
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
@@ -1,16 +1,83 @@
+import io
 import os
+import tempfile
 from reportlab.lib.pagesizes import A4
 from reportlab.lib.units import mm
 from reportlab.lib import colors
 from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Image as RLImage, Table, TableStyle
 from reportlab.lib.styles import getSampleStyleSheet
+from PIL import Image
 from datetime import datetime
-import json
+from app.services.metrics import timed_stage
 
+# Embedded images are resampled to their printed size at this resolution and
+# stored as JPEG: a 20 MP upload becomes ~0.4 MP instead of being zlib-packed
+# pixel by pixel by ReportLab.
+REPORT_IMAGE_DPI = int(os.getenv('REPORT_IMAGE_DPI', '150'))
+REPORT_JPEG_QUALITY = int(os.getenv('REPORT_JPEG_QUALITY', '85'))
 
-def generate_pdf(report_path: str, meta: dict, assets: dict, original_image_path: str):
-    doc = SimpleDocTemplate(report_path, pagesize=A4)
-    styles = getSampleStyleSheet()
+# Built once per process: getSampleStyleSheet() creates ~20 ParagraphStyles
+STYLES = getSampleStyleSheet()
+METRICS_TABLE_STYLE = TableStyle([
+    ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
+    ('BACKGROUND', (0, 0), (-1, 0), colors.lightgrey),
+])
+FRAMES_TABLE_STYLE = TableStyle([
+    ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
+    ('BACKGROUND', (0, 0), (-1, 0), colors.lightgrey),
+    ('FONTSIZE', (0, 0), (-1, -1), 8),
+])
+
+
+def _print_pixels(size_mm: float, dpi: int) -> int:
+    return max(1, round(size_mm / 25.4 * dpi))
+
+
+def print_image(path: str, width_mm: float, height_mm: float, dpi: int = REPORT_IMAGE_DPI) -> RLImage:
+    """RLImage of path drawn at width_mm x height_mm, resampled to dpi and JPEG-encoded in memory.
+
+    Images already smaller than the print size are not upscaled. Transparency
+    is flattened onto white, as it would show on the page.
+    """
+    target = (_print_pixels(width_mm, dpi), _print_pixels(height_mm, dpi))
+    with Image.open(path) as img:
+        # JPEG: let the decoder downscale by a power of two first
+        img.draft('RGB', target)
+        if img.mode in ('RGBA', 'LA') or (img.mode == 'P' and 'transparency' in img.info):
+            rgba = img.convert('RGBA')
+            img = Image.new('RGB', rgba.size, (255, 255, 255))
+            img.paste(rgba, mask=rgba.getchannel('A'))
+        elif img.mode != 'RGB':
+            img = img.convert('RGB')
+        if img.width > target[0] or img.height > target[1]:
+            img = img.resize((min(img.width, target[0]), min(img.height, target[1])), Image.Resampling.LANCZOS)
+        buffer = io.BytesIO()
+        img.save(buffer, format='JPEG', quality=REPORT_JPEG_QUALITY, optimize=True)
+    buffer.seek(0)
+    return RLImage(buffer, width=width_mm * mm, height=height_mm * mm)
+
+
+def write_atomic(path: str, data: bytes) -> None:
+    """Write data to path via a temp file + os.replace: readers never see a partial file."""
+    directory = os.path.dirname(path) or '.'
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.tmp_', suffix=os.path.splitext(path)[1])
+    try:
+        with os.fdopen(fd, 'wb') as fh:
+            fh.write(data)
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+def build_pdf(meta: dict, assets: dict, original_image_path: str) -> bytes:
+    """Render the report into memory and return the PDF bytes."""
+    styles = STYLES
+    buffer = io.BytesIO()
+    doc = SimpleDocTemplate(buffer, pagesize=A4)
     story = []
 
     title = Paragraph('DroneAPP Plant Health Report', styles['Title'])
@@ -25,7 +92,7 @@ def generate_pdf(report_path: str, meta: dict, assets: dict, original_image_path
     story.append(Paragraph('Original image:', styles['Heading3']))
     story.append(Spacer(1, 2 * mm))
     try:
-        story.append(RLImage(original_image_path, width=140 * mm, height=90 * mm))
+        story.append(print_image(original_image_path, 140, 90))
     except Exception:
         story.append(Paragraph('Could not include original image.', styles['Normal']))
     story.append(Spacer(1, 4 * mm))
@@ -36,11 +103,11 @@ def generate_pdf(report_path: str, meta: dict, assets: dict, original_image_path
     # Table of two images
     imgs = []
     try:
-        imgs.append(RLImage(assets['heat_exg'], width=80 * mm, height=60 * mm))
+        imgs.append(print_image(assets['heat_exg'], 80, 60))
     except Exception:
         imgs.append(Paragraph('ExG heatmap not available', styles['Normal']))
     try:
-        imgs.append(RLImage(assets['heat_vari'], width=80 * mm, height=60 * mm))
+        imgs.append(print_image(assets['heat_vari'], 80, 60))
     except Exception:
         imgs.append(Paragraph('VARI heatmap not available', styles['Normal']))
 
@@ -51,7 +118,7 @@ def generate_pdf(report_path: str, meta: dict, assets: dict, original_image_path
     story.append(Paragraph('Overlay:', styles['Heading3']))
     story.append(Spacer(1, 2 * mm))
     try:
-        story.append(RLImage(assets['overlay'], width=140 * mm, height=90 * mm))
+        story.append(print_image(assets['overlay'], 140, 90))
     except Exception:
         story.append(Paragraph('Overlay not available', styles['Normal']))
     story.append(Spacer(1, 6 * mm))
@@ -65,15 +132,32 @@ def generate_pdf(report_path: str, meta: dict, assets: dict, original_image_path
         table_data.append([k, f"{v:.2f}" if isinstance(v, float) else str(v)])
 
     tbl = Table(table_data, colWidths=[90 * mm, 90 * mm])
-    tbl.setStyle(
-        TableStyle([
-            ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
-            ('BACKGROUND', (0, 0), (-1, 0), colors.lightgrey),
-        ])
-    )
+    tbl.setStyle(METRICS_TABLE_STYLE)
     story.append(tbl)
     story.append(Spacer(1, 6 * mm))
 
+    # Per-frame table for flight (batch) reports
+    frames = meta.get('frames')
+    if frames:
+        story.append(Paragraph('Frames:', styles['Heading3']))
+        story.append(Spacer(1, 2 * mm))
+        frame_data = [['Frame', 'Coverage, %', 'VARI mean', 'Health score']]
+        for frame in frames:
+            m = frame.get('metrics')
+            if m:
+                frame_data.append([
+                    frame['filename'],
+                    f"{m['vegetation_coverage_percent']:.2f}",
+                    f"{m['vari_mean']:.2f}",
+                    f"{m['health_score']:.2f}",
+                ])
+            else:
+                frame_data.append([frame['filename'], 'failed', '', ''])
+        frame_tbl = Table(frame_data, colWidths=[90 * mm, 30 * mm, 30 * mm, 30 * mm], repeatRows=1)
+        frame_tbl.setStyle(FRAMES_TABLE_STYLE)
+        story.append(frame_tbl)
+        story.append(Spacer(1, 6 * mm))
+
     # Conclusion
     story.append(Paragraph('Conclusion:', styles['Heading3']))
     if metrics.get('vegetation_coverage_percent', 0) < 5:
@@ -87,10 +171,18 @@ def generate_pdf(report_path: str, meta: dict, assets: dict, original_image_path
     story.append(Paragraph('Note: NDVI requires multispectral data and will be added later.', styles['Italic']))
 
     doc.build(story)
+    return buffer.getvalue()
 
-    # Write meta to JSON next to pdf
-    meta_path = os.path.splitext(report_path)[0] + '.json'
-    with open(meta_path, 'w') as fh:
-        json.dump(meta, fh)
 
+@timed_stage('pdf')
+def generate_pdf(report_path: str, meta: dict, assets: dict, original_image_path: str):
+    write_atomic(report_path, build_pdf(meta, assets, original_image_path))
     return report_path
+
+
+def render_report(report_path: str, meta: dict) -> str:
+    """Build the PDF of a stored report; meta names the upload (image_path) and the assets.
+
+    Assets that no longer exist are replaced by a placeholder in the PDF.
+    """
+    return generate_pdf(report_path, meta, meta.get('assets') or {}, meta.get('image_path') or '')
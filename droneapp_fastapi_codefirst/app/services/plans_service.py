@@ -1,8 +1,9 @@
-from typing import Optional, List
+from typing import Optional, Tuple
 import logging
 from sqlalchemy.orm import Session
 from app.models.models import User, SubscriptionPlan
 from app.services.cache_service import MemoryCacheService
+from app.services.snapshots import PlanSnapshot
 
 logger = logging.getLogger(__name__)
 
@@ -11,18 +12,19 @@ class PlansService:
     """
     Сервис для бизнес-логики работы с тарифными планами.
     Не зависит от FastAPI напрямую, работает только с моделями и сессией БД.
+    list_plans возвращает неизменяемые снимки PlanSnapshot (их можно кэшировать).
     """
     
     def __init__(self, db: Session, cache_service: Optional[MemoryCacheService] = None):
         self.db = db
         self.cache_service = cache_service
     
-    def list_plans(self) -> List[SubscriptionPlan]:
+    def list_plans(self) -> Tuple[PlanSnapshot, ...]:
         """
         Возвращает список тарифных планов с кэшированием.
         
         Returns:
-            Список тарифных планов
+            Снимки тарифных планов
         """
         cache_key = "plans:list"
         
@@ -33,13 +35,23 @@ class PlansService:
                 return cached
             logger.info(f"cache miss: {cache_key}")
         
-        plans = self.db.query(SubscriptionPlan).order_by(SubscriptionPlan.name).all()
+        plans = tuple(
+            PlanSnapshot.from_orm(p)
+            for p in self.db.query(SubscriptionPlan).order_by(SubscriptionPlan.name).all()
+        )
         
         if self.cache_service:
             self.cache_service.set(cache_key, plans, ttl_seconds=60)
         
         return plans
     
+    def invalidate_cache(self) -> None:
+        """
+        Сбрасывает кэш планов (после создания плана через UsersAccessor).
+        """
+        if self.cache_service:
+            self.cache_service.remove_by_prefix("plans:")
+    
     def delete_plan_hard(self, plan_id: int) -> None:
         """
         Выполняет hard delete тарифного плана после проверки безопасности.
@@ -0,0 +1,118 @@
+from typing import Optional, Union
+import logging
+from sqlalchemy import select, update
+from sqlalchemy.orm import Session
+from app.models.models import SubscriptionPlan, User
+from app.services.cache_service import MemoryCacheService
+from app.services.plans_service import PlansService
+from app.services.snapshots import PlanSnapshot
+
+logger = logging.getLogger(__name__)
+
+# Лимит для пользователя без плана (plan_id NOT NULL, так что только на всякий случай)
+DEFAULT_ATTEMPTS_LIMIT = 2
+
+
+def attempts_limit(plan: Union[SubscriptionPlan, PlanSnapshot, None]) -> int:
+    """Лимит попыток плана: SubscriptionPlan.free_attempts_limit."""
+    if plan is None or plan.free_attempts_limit is None:
+        return DEFAULT_ATTEMPTS_LIMIT
+    return plan.free_attempts_limit
+
+
+class QuotaExceeded(Exception):
+    pass
+
+
+class QuotaService:
+    """
+    Резервирование попыток анализа одним условным UPDATE.
+
+    reserve() выполняет
+        UPDATE users SET free_attempts_used = free_attempts_used + n
+        WHERE id = ? AND free_attempts_used + n <= (лимит плана пользователя)
+    и сразу фиксирует транзакцию: проверка и списание атомарны, параллельные
+    загрузки одного аккаунта не могут превысить лимит или затереть инкременты
+    друг друга, а блокировка строки не удерживается на время анализа.
+    Неудавшийся анализ возвращает попытки через refund().
+
+    Строка пользователя целиком не загружается: UPDATE возвращает только
+    счетчик и plan_id, лимит плана берется из кэша снимков PlansService.
+    """
+
+    def __init__(self, db: Session, cache_service: Optional[MemoryCacheService] = None):
+        self.db = db
+        self.cache_service = cache_service
+
+    def plan_limit(self, plan_id: Optional[int]) -> int:
+        """Лимит попыток плана по id (из закэшированного списка планов)."""
+        plans = PlansService(self.db, cache_service=self.cache_service).list_plans()
+        return attempts_limit(next((p for p in plans if p.id == plan_id), None))
+
+    def remaining(self, user_id: int) -> int:
+        """
+        Остаток попыток пользователя (SELECT двух столбцов, без загрузки User).
+
+        Только для предварительных проверок: авторитетна проверка в reserve().
+        """
+        row = self.db.execute(
+            select(User.free_attempts_used, User.plan_id).where(User.id == user_id)
+        ).first()
+        if row is None:
+            return 0
+        used, plan_id = row
+        return self.plan_limit(plan_id) - (used or 0)
+
+    def reserve(self, user_id: int, attempts: int = 1, commit: bool = True) -> int:
+        """
+        Списывает attempts попыток, если они укладываются в лимит плана.
+
+        Returns:
+            Остаток попыток после списания
+
+        Raises:
+            QuotaExceeded: если попыток не хватает (ничего не списано)
+        """
+        plan_limit = (
+            select(SubscriptionPlan.free_attempts_limit)
+            .where(SubscriptionPlan.id == User.plan_id)
+            .scalar_subquery()
+        )
+        stmt = (
+            update(User)
+            .where(User.id == user_id, User.free_attempts_used + attempts <= plan_limit)
+            .values(free_attempts_used=User.free_attempts_used + attempts)
+            .returning(User.free_attempts_used, User.plan_id)
+            .execution_options(synchronize_session=False)
+        )
+        row = self.db.execute(stmt).first()
+        if row is None:
+            self.db.rollback()
+            raise QuotaExceeded()
+        used, plan_id = row
+        if commit:
+            self.db.commit()
+        return self.plan_limit(plan_id) - used
+
+    def refund(self, user_id: int, attempts: int = 1, commit: bool = True) -> Optional[int]:
+        """
+        Возвращает attempts попыток (не опускаясь ниже нуля).
+
+        Returns:
+            free_attempts_used после возврата или None, если пользователь не найден
+        """
+        if attempts <= 0:
+            return None
+        stmt = (
+            update(User)
+            .where(User.id == user_id, User.free_attempts_used >= attempts)
+            .values(free_attempts_used=User.free_attempts_used - attempts)
+            .returning(User.free_attempts_used)
+            .execution_options(synchronize_session=False)
+        )
+        used = self.db.execute(stmt).scalar_one_or_none()
+        if used is None:
+            logger.warning(f"quota refund skipped user_id={user_id} attempts={attempts}")
+        if commit:
+            self.db.commit()
+        return used
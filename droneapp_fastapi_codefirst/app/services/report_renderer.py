@@ -0,0 +1,121 @@
+"""
+On-demand PDF reports.
+
+Analysis persists only the report's row (metrics plus the paths of the
+upload and its assets); the PDF is rendered in the analysis pool the first
+time /reports/{filename} is requested. Concurrent first requests for
+the same report share one render (single flight), and rendered PDFs form a
+bounded on-disk cache: LRU by mtime, bounded by file count and bytes. An
+evicted PDF is simply rendered again from its row.
+"""
+import asyncio
+import logging
+import os
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from fastapi.concurrency import run_in_threadpool
+
+from app.services.analysis_pool import AnalysisPool
+from app.services.metrics import REPORT_DOWNLOADS
+from app.services.pdf_report import render_report
+
+logger = logging.getLogger(__name__)
+
+
+class RenderRejected(Exception):
+    """The analysis pool is saturated; the render was not started."""
+
+
+def _touch(path: str) -> bool:
+    try:
+        os.utime(path)
+        return True
+    except OSError:
+        return False
+
+
+def _rendered_reports(directory: str) -> List[Tuple[float, int, str]]:
+    entries = []
+    with os.scandir(directory) as it:
+        for entry in it:
+            if entry.name.startswith('report_') and entry.name.endswith('.pdf'):
+                try:
+                    st = entry.stat()
+                except OSError:
+                    continue
+                entries.append((st.st_mtime, st.st_size, entry.path))
+    return entries
+
+
+class ReportRenderer:
+    """Single-flight, disk-cached PDF rendering of persisted reports."""
+
+    def __init__(self, max_files: int, max_bytes: int):
+        self.max_files = max_files
+        self.max_bytes = max_bytes
+        # report_path -> render task; only touched from the event loop
+        self._inflight: Dict[str, asyncio.Task] = {}
+
+    async def get(self, report_path: str, pool: AnalysisPool, load_meta: Callable[[], Awaitable[Optional[Dict[str, Any]]]]) -> str:
+        """Path of the rendered PDF, rendering it first if needed.
+
+        load_meta is only awaited (once per render) when the PDF is missing.
+        Raises FileNotFoundError for unknown (or not yet analysed) reports and
+        RenderRejected when a render is needed and the pool is full.
+        """
+        if _touch(report_path):
+            REPORT_DOWNLOADS.inc(source='cache')
+            return report_path
+        task = self._inflight.get(report_path)
+        if task is None:
+            task = asyncio.ensure_future(self._render(report_path, pool, load_meta))
+            self._inflight[report_path] = task
+            task.add_done_callback(lambda t: self._render_done(report_path, t))
+            REPORT_DOWNLOADS.inc(source='rendered')
+        else:
+            REPORT_DOWNLOADS.inc(source='shared')
+        # a disconnecting client must not cancel the render other requests wait for
+        return await asyncio.shield(task)
+
+    def _render_done(self, report_path: str, task: asyncio.Task) -> None:
+        self._inflight.pop(report_path, None)
+        # retrieve the exception even if every waiter went away
+        if not task.cancelled():
+            task.exception()
+
+    async def _render(self, report_path: str, pool: AnalysisPool, load_meta) -> str:
+        meta = await load_meta()
+        if meta is None:
+            raise FileNotFoundError(report_path)
+        if not pool.try_acquire():
+            raise RenderRejected()
+        try:
+            await pool.run(render_report, report_path, meta)
+        finally:
+            pool.release()
+        logger.info(f"report rendered path={os.path.basename(report_path)}")
+        try:
+            await run_in_threadpool(self._evict, os.path.dirname(report_path), report_path)
+        except Exception:
+            logger.warning('report cache eviction failed', exc_info=True)
+        return report_path
+
+    def _evict(self, directory: str, keep: str) -> int:
+        entries = _rendered_reports(directory)
+        count, total = len(entries), sum(size for _, size, _ in entries)
+        if count <= self.max_files and total <= self.max_bytes:
+            return 0
+        evicted = 0
+        for _, size, path in sorted(entries):
+            if count <= self.max_files and total <= self.max_bytes:
+                break
+            if path == keep:
+                continue
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            count -= 1
+            total -= size
+            evicted += 1
+        return evicted
@@ -0,0 +1,189 @@
+"""
+Content-addressed cache of analysis results (table analysis_cache).
+
+Key: SHA-256 of the uploaded bytes + analyzer_params_hash(), so re-uploading
+the same frame skips analyze_image, and changing the analyzer (version,
+ExG threshold, ...) naturally invalidates old entries. An entry keeps the
+metrics, the generated assets and the report built for the first upload.
+
+Eviction is LRU by last_used_at, bounded by entry count and by the bytes of
+cached assets on disk. The table is not counted on every store: each
+process keeps a running estimate of entries/bytes and recounts exactly only
+when the estimate is over a limit or every RECOUNT_EVERY stores (which also
+picks up entries stored by other workers). Reports are rendered lazily from the same asset
+files, so an evicted entry's assets are deleted only when no Report row
+(matched by sha256) still points at them; otherwise the report keeps them.
+"""
+import json
+import logging
+import os
+import threading
+from datetime import datetime
+from typing import Any, Dict, List, NamedTuple, Optional, Set, Tuple
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from app.models.models import AnalysisCacheEntry, Report
+from app.services.rgb_analyzer import analyzer_params_hash
+
+logger = logging.getLogger(__name__)
+
+
+class CachedResult(NamedTuple):
+    metrics: Dict[str, Any]
+    assets: Dict[str, str]
+    report_path: str
+    user_id: int
+
+
+def _remove_files(paths: List[str]) -> None:
+    for path in paths:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+def _table_size(db: Session) -> Tuple[int, int]:
+    """Exact (entries, bytes) of the cache table: a full scan, keep it off the hot path."""
+    entries, total_bytes = db.query(
+        func.count(AnalysisCacheEntry.cache_key),
+        func.coalesce(func.sum(AnalysisCacheEntry.size_bytes), 0),
+    ).one()
+    return entries, int(total_bytes)
+
+
+class AnalysisResultCache:
+    """Lookup/store of analysis results with LRU eviction and hit/miss counters."""
+
+    RECOUNT_EVERY = 100
+
+    def __init__(self, max_entries: int, max_bytes: int):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._counters = {'hits': 0, 'misses': 0, 'stores': 0, 'evictions': 0}
+        # (entries, bytes) as of the last exact count plus stores since then
+        self._estimate: Optional[Tuple[int, int]] = None
+        self._stores_since_count = 0
+
+    @staticmethod
+    def make_key(sha256: str) -> str:
+        return f'{sha256}:{analyzer_params_hash()}'
+
+    def _count(self, name: str, n: int = 1) -> None:
+        with self._lock:
+            self._counters[name] += n
+
+    def lookup(self, db: Session, sha256: str) -> Optional[CachedResult]:
+        """Cached result for the image, or None.
+
+        The hit bookkeeping (hits, last_used_at) joins the caller's transaction.
+        """
+        key = self.make_key(sha256)
+        entry = db.get(AnalysisCacheEntry, key)
+        if entry is not None:
+            assets = json.loads(entry.assets)
+            if all(os.path.exists(p) for p in assets.values()):
+                entry.hits = entry.hits + 1
+                entry.last_used_at = datetime.utcnow()
+                self._count('hits')
+                return CachedResult(json.loads(entry.metrics), assets, entry.report_path, entry.user_id)
+            # assets were removed behind our back; drop the stale entry
+            db.delete(entry)
+        self._count('misses')
+        return None
+
+    def store(self, db: Session, sha256: str, user_id: int, metrics: Dict[str, Any], assets: Dict[str, str], report_path: str) -> None:
+        """Insert an entry and evict LRU entries beyond the limits (own commit).
+
+        A failure (e.g. the same image stored concurrently) is logged and ignored.
+        """
+        size = sum(os.path.getsize(p) for p in assets.values() if os.path.exists(p))
+        try:
+            db.merge(AnalysisCacheEntry(
+                cache_key=self.make_key(sha256),
+                user_id=user_id,
+                metrics=json.dumps(metrics),
+                assets=json.dumps(assets),
+                report_path=report_path,
+                size_bytes=size,
+                hits=0,
+                last_used_at=datetime.utcnow(),
+            ))
+            db.flush()
+            evicted, orphaned = self._evict(db, size)
+            db.commit()
+        except Exception:
+            db.rollback()
+            logger.warning('analysis cache store failed', exc_info=True)
+            return
+        self._count('stores')
+        if evicted:
+            self._count('evictions', evicted)
+            _remove_files(orphaned)
+
+    @staticmethod
+    def _referenced_paths(db: Session, sha256s: List[str]) -> Set[str]:
+        """Asset paths that reports of these images still render from."""
+        referenced: Set[str] = set()
+        # ix_reports_sha256
+        for (assets,) in db.query(Report.assets).filter(Report.sha256.in_(sha256s), Report.assets.isnot(None)):
+            referenced.update(assets.values())
+        return referenced
+
+    def _within_limits(self, entries: int, total_bytes: int) -> bool:
+        return entries <= self.max_entries and total_bytes <= self.max_bytes
+
+    def _evict(self, db: Session, added_bytes: int) -> Tuple[int, List[str]]:
+        """Delete LRU entries beyond the limits; returns their count and the asset files no report references."""
+        with self._lock:
+            if self._estimate is not None and self._stores_since_count < self.RECOUNT_EVERY:
+                # an overwritten entry is counted twice: the estimate errs high, never low
+                entries, total_bytes = self._estimate[0] + 1, self._estimate[1] + added_bytes
+                if self._within_limits(entries, total_bytes):
+                    self._estimate = (entries, total_bytes)
+                    self._stores_since_count += 1
+                    return 0, []
+
+        entries, total_bytes = _table_size(db)
+        if self._within_limits(entries, total_bytes):
+            self._reset_estimate(entries, total_bytes)
+            return 0, []
+
+        victims, paths = [], []
+        oldest = (
+            db.query(AnalysisCacheEntry.cache_key, AnalysisCacheEntry.size_bytes, AnalysisCacheEntry.assets)
+            .order_by(AnalysisCacheEntry.last_used_at)
+            .yield_per(500)
+        )
+        for key, size, assets in oldest:
+            if entries <= self.max_entries and total_bytes <= self.max_bytes:
+                break
+            victims.append(key)
+            paths.extend(json.loads(assets).values())
+            entries -= 1
+            total_bytes -= size
+        db.query(AnalysisCacheEntry).filter(AnalysisCacheEntry.cache_key.in_(victims)).delete(synchronize_session=False)
+        self._reset_estimate(entries, total_bytes)
+        referenced = self._referenced_paths(db, list({key.split(':', 1)[0] for key in victims}))
+        return len(victims), [p for p in paths if p not in referenced]
+
+    def _reset_estimate(self, entries: int, total_bytes: int) -> None:
+        with self._lock:
+            self._estimate = (entries, int(total_bytes))
+            self._stores_since_count = 0
+
+    def stats(self, db: Optional[Session] = None) -> Dict[str, Any]:
+        with self._lock:
+            stats: Dict[str, Any] = dict(self._counters)
+        lookups = stats['hits'] + stats['misses']
+        stats['hit_ratio'] = stats['hits'] / lookups if lookups else 0.0
+        stats['max_entries'] = self.max_entries
+        stats['max_bytes'] = self.max_bytes
+        if db is not None:
+            entries, total_bytes = _table_size(db)
+            stats['entries'] = entries
+            stats['bytes'] = int(total_bytes)
+        return stats
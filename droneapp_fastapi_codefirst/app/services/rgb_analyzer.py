@@ -1,20 +1,36 @@
+import hashlib
+import io
 import os
+import struct
+import threading
+import time
 import uuid
+import warnings
 import numpy as np
-from PIL import Image
-import matplotlib.pyplot as plt
-from typing import Dict, Any, Tuple
+from PIL import Image, TiffImagePlugin
+from typing import Dict, Any, List, Optional, Tuple
+from app.services.heatmap_renderer import render_heatmap
+from app.services.metrics import record_stage, stage
 
 
 EPS = 1e-6
+EXG_THRESHOLD = 0.15
+VARI_LOW_PERCENTILE = 2.0
+VARI_HIGH_PERCENTILE = 98.0
 
+# Bump when a change alters metrics or generated assets: cached results
+# (app.services.result_cache) are keyed by analyzer_params_hash().
+ANALYZER_VERSION = '2'
 
-def _load_image_rgb(path: str) -> np.ndarray:
-    img = Image.open(path).convert('RGB')
-    arr = np.array(img).astype(np.float32)
-    # Normalize to 0..1
-    arr /= 255.0
-    return arr
+# The fused kernel works on raw 0..255 channel values instead of a 0..1 float
+# copy; scaling EPS by 255 keeps the formulas algebraically identical.
+_EPS_U8 = EPS * 255.0
+
+
+def analyzer_params_hash() -> str:
+    """Short hash of the analyzer version and every parameter affecting its output."""
+    params = f'{ANALYZER_VERSION}|{EXG_THRESHOLD}|{VARI_LOW_PERCENTILE}|{VARI_HIGH_PERCENTILE}'
+    return hashlib.sha256(params.encode('ascii')).hexdigest()[:16]
 
 
 def compute_exg(arr: np.ndarray) -> np.ndarray:
@@ -51,54 +67,161 @@ def make_mask_from_exg(exg: np.ndarray, threshold: float = 0.15) -> np.ndarray:
     return mask
 
 
-def _save_heatmap(img: np.ndarray, path: str, cmap: str = 'RdYlGn'):
-    plt.figure(figsize=(6, 4))
-    plt.axis('off')
-    plt.imshow(img, cmap=cmap)
-    plt.tight_layout(pad=0)
-    plt.savefig(path, bbox_inches='tight', pad_inches=0)
-    plt.close()
+class IndexBuffers:
+    """Work buffers for compute_indices, reusable across frames of one shape."""
 
+    __slots__ = ('shape', 'exg', 'vari', 'mask', 'scratch')
 
-def _overlay_mask_on_image(orig_arr: np.ndarray, mask: np.ndarray) -> Image.Image:
-    img = (orig_arr * 255).astype(np.uint8)
-    pil = Image.fromarray(img)
-    overlay = Image.new('RGBA', pil.size, (0, 0, 0, 0))
-    mask_img = Image.fromarray((mask.astype(np.uint8) * 255).astype(np.uint8))
-    # create green overlay where mask
-    green = Image.new('RGBA', pil.size, (0, 255, 0, 100))
-    overlay.paste(green, (0, 0), mask_img)
-    combined = Image.alpha_composite(pil.convert('RGBA'), overlay)
-    return combined
+    def __init__(self, shape: Tuple[int, int]):
+        self.shape = tuple(shape)
+        self.exg = np.empty(self.shape, dtype=np.float32)
+        self.vari = np.empty(self.shape, dtype=np.float32)
+        self.mask = np.empty(self.shape, dtype=bool)
+        self.scratch = np.empty(self.shape, dtype=np.float32)
 
 
-def analyze_image(path: str, workdir: str) -> Tuple[Dict[str, Any], Dict[str, str]]:
-    """Analyze image and produce metrics and paths to generated images.
+def _percentile_pair(values: np.ndarray, scratch: np.ndarray, low: float, high: float) -> Tuple[float, float]:
+    """Linear-interpolated percentiles (same as np.percentile) from one in-place partition."""
+    flat = scratch.reshape(-1)
+    np.copyto(flat, values.reshape(-1))
+    n = flat.size
+    positions = [q / 100.0 * (n - 1) for q in (low, high)]
+    kth = set()
+    for pos in positions:
+        lo = int(np.floor(pos))
+        kth.add(lo)
+        kth.add(min(lo + 1, n - 1))
+    flat.partition(sorted(kth))
+    result = []
+    for pos in positions:
+        lo = int(np.floor(pos))
+        hi = min(lo + 1, n - 1)
+        a, b = flat[lo], flat[hi]
+        result.append(float(a + (pos - lo) * (b - a)))
+    return result[0], result[1]
 
-    Returns (metrics, assets) where assets contain paths to heatmap_exg, heatmap_vari, overlay.
+
+def _raw_indices(rgb: np.ndarray, buffers: IndexBuffers) -> None:
+    """Write un-normalized ExG (0..255 units) and VARI into buffers.exg/buffers.vari."""
+    exg, vari, scratch = buffers.exg, buffers.vari, buffers.scratch
+    R = rgb[:, :, 0]
+    G = rgb[:, :, 1]
+    B = rgb[:, :, 2]
+
+    # ExG = 2G - R - B
+    np.add(G, G, out=exg, dtype=np.float32)
+    np.subtract(exg, R, out=exg)
+    np.subtract(exg, B, out=exg)
+
+    # VARI = (G - R) / (G + R - B + EPS); with integer channels the
+    # denominator never reaches zero, so no nan/inf cleanup is needed.
+    np.subtract(G, R, out=vari, dtype=np.float32)
+    np.add(G, R, out=scratch, dtype=np.float32)
+    np.subtract(scratch, B, out=scratch)
+    scratch += np.float32(_EPS_U8)
+    np.divide(vari, scratch, out=vari)
+
+
+def _normalize_indices(
+    buffers: IndexBuffers,
+    exg_min: float,
+    exg_max: float,
+    vari_low: float,
+    vari_high: float,
+    threshold: float,
+) -> None:
+    """Normalize raw indices in place to 0..1 and fill the vegetation mask."""
+    exg, vari = buffers.exg, buffers.vari
+    exg -= np.float32(exg_min)
+    exg /= np.float32(exg_max - exg_min + _EPS_U8)
+    vari -= np.float32(vari_low)
+    vari /= np.float32(vari_high - vari_low + EPS)
+    np.clip(vari, 0.0, 1.0, out=vari)
+    np.greater(exg, threshold, out=buffers.mask)
+
+
+def _masked_sums(buffers: IndexBuffers) -> Tuple[int, float, float]:
+    mask = buffers.mask
+    count = int(np.count_nonzero(mask))
+    if count == 0:
+        return 0, 0.0, 0.0
+    exg_sum = float(np.sum(buffers.exg, where=mask, dtype=np.float64))
+    vari_sum = float(np.sum(buffers.vari, where=mask, dtype=np.float64))
+    return count, exg_sum, vari_sum
+
+
+def compute_indices(
+    rgb: np.ndarray,
+    threshold: float = EXG_THRESHOLD,
+    buffers: Optional[IndexBuffers] = None,
+) -> Tuple[IndexBuffers, Dict[str, float]]:
+    """Fused ExG/VARI/mask kernel over a uint8 RGB frame.
+
+    Produces the same normalized ExG and VARI maps as compute_exg/compute_vari
+    and the same mask as make_mask_from_exg, but reads the uint8 channels
+    directly and writes every intermediate into preallocated buffers, so peak
+    memory is ~13 bytes/pixel instead of a dozen full-frame float temporaries.
+
+    Returns (buffers, stats) where stats holds coverage, masked means and the
+    VARI percentile bounds used for normalization.
     """
-    arr = _load_image_rgb(path)
+    h, w = rgb.shape[:2]
+    if buffers is None or buffers.shape != (h, w):
+        buffers = IndexBuffers((h, w))
 
-    exg = compute_exg(arr)
-    vari = compute_vari(arr)
-    mask = make_mask_from_exg(exg)
+    _raw_indices(rgb, buffers)
+    exg_min = float(buffers.exg.min())
+    exg_max = float(buffers.exg.max())
+    vmin, vmax = _percentile_pair(buffers.vari, buffers.scratch, VARI_LOW_PERCENTILE, VARI_HIGH_PERCENTILE)
+    _normalize_indices(buffers, exg_min, exg_max, vmin, vmax, threshold)
 
-    coverage = float(mask.mean() * 100.0)
-    # metrics derived on masked area; if mask empty, be robust
-    if mask.sum() > 0:
-        exg_mean = float(exg[mask].mean())
-        vari_mean = float(vari[mask].mean())
-    else:
-        exg_mean = 0.0
-        vari_mean = 0.0
+    count, exg_sum, vari_sum = _masked_sums(buffers)
+    stats = {
+        'vegetation_coverage_percent': count / float(buffers.mask.size) * 100.0,
+        'exg_mean': exg_sum / count if count else 0.0,
+        'vari_mean': vari_sum / count if count else 0.0,
+        'vari_low': vmin,
+        'vari_high': vmax,
+    }
+    return buffers, stats
 
+
+def _health_score(coverage: float, exg_mean: float, vari_mean: float) -> float:
     # health score simple heuristic: combine exg_mean and vari_mean with coverage
     score = (0.5 * exg_mean + 0.5 * vari_mean) * 100.0
     # blend with coverage (weight 0.7 for score, 0.3 for coverage fraction)
     health_score = float(0.7 * score + 0.3 * coverage)
-    health_score = max(0.0, min(100.0, health_score))
+    return max(0.0, min(100.0, health_score))
+
+
+def _save_heatmap(img: np.ndarray, path: str, cmap: str = 'RdYlGn'):
+    render_heatmap(img, path, cmap=cmap)
+
+
+def _overlay_alpha(mask: np.ndarray) -> np.ndarray:
+    # bool masks come from full-frame analysis, uint8 coverage fractions
+    # (0..255) from the downsampled tiled canvas
+    if mask.dtype == bool:
+        return np.multiply(mask, 255, dtype=np.uint8)
+    return mask
+
 
-    # Generate assets
+def _overlay_mask_on_image(orig_arr: np.ndarray, mask: np.ndarray) -> Image.Image:
+    if orig_arr.dtype == np.uint8:
+        img = orig_arr
+    else:
+        img = (orig_arr * 255).astype(np.uint8)
+    pil = Image.fromarray(img)
+    overlay = Image.new('RGBA', pil.size, (0, 0, 0, 0))
+    mask_img = Image.fromarray(_overlay_alpha(mask))
+    # create green overlay where mask
+    green = Image.new('RGBA', pil.size, (0, 255, 0, 100))
+    overlay.paste(green, (0, 0), mask_img)
+    combined = Image.alpha_composite(pil.convert('RGBA'), overlay)
+    return combined
+
+
+def _write_assets(workdir: str, exg: np.ndarray, vari: np.ndarray, rgb: np.ndarray, mask: np.ndarray) -> Dict[str, str]:
     uid = uuid.uuid4().hex[:8]
     os.makedirs(workdir, exist_ok=True)
     heat_exg_path = os.path.join(workdir, f'exg_{uid}.png')
@@ -107,18 +230,523 @@ def analyze_image(path: str, workdir: str) -> Tuple[Dict[str, Any], Dict[str, st
 
     _save_heatmap(exg, heat_exg_path, cmap='RdYlGn')
     _save_heatmap(vari, heat_vari_path, cmap='viridis')
-    overlay = _overlay_mask_on_image(arr, mask)
+    overlay = _overlay_mask_on_image(rgb, mask)
     overlay.save(overlay_path)
 
-    metrics = {
-        'vegetation_coverage_percent': coverage,
-        'exg_mean': exg_mean,
-        'vari_mean': vari_mean,
-        'health_score': health_score,
-    }
-    assets = {
+    return {
         'heat_exg': heat_exg_path,
         'heat_vari': heat_vari_path,
         'overlay': overlay_path,
     }
+
+
+def _build_metrics(stats: Dict[str, float]) -> Dict[str, Any]:
+    coverage = stats['vegetation_coverage_percent']
+    exg_mean = stats['exg_mean']
+    vari_mean = stats['vari_mean']
+    return {
+        'vegetation_coverage_percent': coverage,
+        'exg_mean': exg_mean,
+        'vari_mean': vari_mean,
+        'health_score': _health_score(coverage, exg_mean, vari_mean),
+    }
+
+
+def aggregate_metrics(frames: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Combine per-frame metrics of one flight into a single metrics dict.
+
+    Keeps the per-frame keys (as means over frames) so the same report and
+    conclusion logic applies, plus the frame count and the weakest frame.
+    """
+    if not frames:
+        return {'frames': 0}
+    keys = ('vegetation_coverage_percent', 'exg_mean', 'vari_mean', 'health_score')
+    result: Dict[str, Any] = {k: float(np.mean([f[k] for f in frames])) for k in keys}
+    result['health_score_min'] = float(min(f['health_score'] for f in frames))
+    result['frames'] = len(frames)
+    return result
+
+
+# ---------------------------------------------------------------------------
+# Tiled analysis for orthomosaics that do not fit in memory
+# ---------------------------------------------------------------------------
+
+TILE_SIZE = 2048
+PREVIEW_MAX_SIDE = 2048
+# analyze_image switches to the tiled path above this many pixels
+TILED_MIN_PIXELS = 64_000_000
+# Stitched field orthomosaics are legitimately far above Pillow's default
+# decompression-bomb limit (~89 MP). open_image lifts Pillow's limit for its
+# own Image.open call only and applies this cap to analyzer inputs instead.
+MAX_ORTHOMOSAIC_PIXELS = 1_200_000_000
+# Rasters that cannot be read window by window (PNG, WebP, JPEG, TIFF layouts
+# _TiffBlocks does not handle) are decoded whole as uint8 RGB up to this size:
+# Pillow's own decompression-bomb error bound, what the analyzer accepted
+# before the tiled path existed. JPEGs above it are decoded at 1/2..1/8 scale.
+MAX_DECODED_PIXELS = 178_956_970
+# One TIFF tile or run of strips is decoded at a time; a tile or strip larger
+# than this (e.g. one strip holding the whole image) falls back to decoding
+# the image whole.
+MAX_BLOCK_PIXELS = 16_000_000
+# Consecutive strips are decoded together up to about this many pixels
+STRIP_GROUP_PIXELS = 1_000_000
+
+# Image.MAX_IMAGE_PIXELS is process-wide: open_image changes it only for its
+# own Image.open call, one call at a time
+_BOMB_LIMIT_LOCK = threading.Lock()
+
+
+class ImageTooLarge(ValueError):
+    pass
+
+
+def open_image(path: str, max_pixels: int = MAX_ORTHOMOSAIC_PIXELS) -> Image.Image:
+    """Image.open for analyzer inputs, capped at max_pixels by declared size.
+
+    Nothing is decoded here, so an image declaring a huge size in a tiny file
+    is rejected before any memory is allocated for it.
+    """
+    with _BOMB_LIMIT_LOCK, warnings.catch_warnings():
+        warnings.simplefilter('ignore', Image.DecompressionBombWarning)
+        default_limit = Image.MAX_IMAGE_PIXELS
+        # Pillow raises above twice its limit: move that bound to max_pixels
+        if default_limit is not None:
+            Image.MAX_IMAGE_PIXELS = max(default_limit, max_pixels // 2 + 1)
+        try:
+            img = Image.open(path)
+        except Image.DecompressionBombError as e:
+            raise ImageTooLarge(str(e))
+        finally:
+            Image.MAX_IMAGE_PIXELS = default_limit
+    width, height = img.size
+    if width * height > max_pixels:
+        img.close()
+        raise ImageTooLarge(f'Image is too large: {width}x{height}, at most {max_pixels // 1_000_000} MP')
+    return img
+
+
+# With uint8 channels every index term is a small integer, so the histograms
+# below are exact: 2G-R-B in -510..510, G-R in -255..255, G+R-B in -255..510.
+_EXG_BINS = 1021
+_VARI_NUM_BINS = 511
+_VARI_DEN_BINS = 766
+
+
+def _decode_whole(img: Image.Image) -> np.ndarray:
+    """Whole image as uint8 RGB; ImageTooLarge above MAX_DECODED_PIXELS."""
+    width, height = img.size
+    if width * height > MAX_DECODED_PIXELS and img.format == 'JPEG':
+        # the JPEG decoder scales by 1/2, 1/4 or 1/8 while decoding
+        for scale in (2, 4, 8):
+            if -(-width // scale) * -(-height // scale) <= MAX_DECODED_PIXELS:
+                img.draft('RGB', (-(-width // scale), -(-height // scale)))
+                width, height = img.size
+                break
+    if width * height > MAX_DECODED_PIXELS:
+        raise ImageTooLarge(
+            f'Image is too large to decode at once: {width}x{height}; '
+            f'images above {MAX_DECODED_PIXELS // 1_000_000} MP must be TIFF'
+        )
+    return np.asarray(img.convert('RGB'))
+
+
+class _TiffBlocks:
+    """Decodes a TIFF one tile or run of strips (block) at a time.
+
+    Each block is wrapped in a minimal strip TIFF carrying the source's
+    compression, photometric and predictor tags and decoded by Pillow/libtiff,
+    so any codec it supports (LZW, Deflate, JPEG, PackBits) and any mode it
+    converts to RGB (RGBA, CMYK, palette, YCbCr) works; alpha is dropped.
+    """
+
+    # tags describing how a block is encoded, copied into every block TIFF
+    _BLOCK_TAGS = (258, 259, 262, 266, 277, 284, 317, 320, 332, 338, 339, 347, 529, 530, 531, 532)
+
+    def __init__(self, img: Image.Image, block_width: int, block_height: int, strip_rows: int, offsets, byte_counts):
+        self.width, self.height = img.size
+        self.block_width, self.block_height = block_width, block_height
+        # strips span the full width: read() is then best called with full-width bands
+        self.strips = strip_rows > 0
+        self._strip_rows = strip_rows
+        self._tags = img.tag_v2
+        self._offsets, self._byte_counts = offsets, byte_counts
+        self._across = -(-self.width // block_width)
+        self._fp = open(img.filename, 'rb')
+        self._cache: Dict[int, Tuple[int, int, int, int, np.ndarray]] = {}
+
+    @classmethod
+    def open(cls, img: Image.Image) -> Optional['_TiffBlocks']:
+        """Block reader for img, or None when it is not a TIFF this class handles."""
+        if img.format != 'TIFF' or not getattr(img, 'filename', None):
+            return None
+        tags = img.tag_v2
+        width, height = img.size
+        if tags.get(284, 1) != 1 and tags.get(277, 1) > 1:
+            return None  # separate colour planes
+        if 322 in tags:
+            block_width, block_height = tags[322], tags[323]
+            offsets, byte_counts = tags.get(324), tags.get(325)
+            blocks = -(-width // block_width) * -(-height // block_height)
+        else:
+            block_width, block_height = width, min(tags.get(278, height), height)
+            offsets, byte_counts = tags.get(273), tags.get(279)
+            blocks = -(-height // block_height)
+        if not offsets or not byte_counts or len(offsets) != blocks or len(byte_counts) != blocks:
+            return None
+        if block_width * block_height > MAX_BLOCK_PIXELS:
+            return None
+        if 322 in tags:
+            return cls(img, block_width, block_height, 0, [(o,) for o in offsets], [(c,) for c in byte_counts])
+        group = max(1, STRIP_GROUP_PIXELS // (width * block_height))
+        return cls(
+            img, width, block_height * group, block_height,
+            [tuple(offsets[i:i + group]) for i in range(0, blocks, group)],
+            [tuple(byte_counts[i:i + group]) for i in range(0, blocks, group)],
+        )
+
+    def _extent(self, index: int) -> Tuple[int, int, int, int]:
+        x0 = index % self._across * self.block_width
+        y0 = index // self._across * self.block_height
+        return x0, y0, min(x0 + self.block_width, self.width), min(y0 + self.block_height, self.height)
+
+    def _decode(self, index: int) -> np.ndarray:
+        x0, y0, x1, y1 = self._extent(index)
+        # tiles are stored padded to the full tile size, strips are not
+        width, rows = (x1 - x0, y1 - y0) if self.strips else (self.block_width, self.block_height)
+        chunks = []
+        for offset, byte_count in zip(self._offsets[index], self._byte_counts[index]):
+            self._fp.seek(offset)
+            chunks.append(self._fp.read(byte_count))
+        prefix = self._tags.prefix
+        ifd = TiffImagePlugin.ImageFileDirectory_v2(prefix=prefix)
+        for tag in self._BLOCK_TAGS:
+            if tag in self._tags:
+                ifd[tag] = self._tags[tag]
+                ifd.tagtype[tag] = self._tags.tagtype[tag]
+        ifd[256], ifd[257], ifd[278] = width, rows, self._strip_rows or rows
+        # tobytes() rebases StripOffsets to the end of the IFD, where the data goes
+        ifd[273] = tuple(np.cumsum([0] + [len(chunk) for chunk in chunks[:-1]]).tolist())
+        ifd[279] = tuple(len(chunk) for chunk in chunks)
+        ifd.tagtype[273] = ifd.tagtype[279] = TiffImagePlugin.TiffTags.LONG
+        endian = '<' if prefix == b'II' else '>'
+        header = prefix + struct.pack(endian + 'HI', 42, 8)
+        with Image.open(io.BytesIO(header + ifd.tobytes(8) + b''.join(chunks))) as block:
+            return np.asarray(block.convert('RGB'))
+
+    def read(self, x0: int, y0: int, x1: int, y1: int) -> np.ndarray:
+        out = np.empty((y1 - y0, x1 - x0, 3), dtype=np.uint8)
+        col0, col1 = x0 // self.block_width, (x1 - 1) // self.block_width
+        row0, row1 = y0 // self.block_height, (y1 - 1) // self.block_height
+        for row in range(row0, row1 + 1):
+            for col in range(col0, col1 + 1):
+                index = row * self._across + col
+                cached = self._cache.get(index)
+                if cached is None:
+                    cached = self._extent(index) + (self._decode(index),)
+                    self._cache[index] = cached
+                bx0, by0, bx1, by1, block = cached
+                ix0, iy0, ix1, iy1 = max(x0, bx0), max(y0, by0), min(x1, bx1), min(y1, by1)
+                out[iy0 - y0:iy1 - y0, ix0 - x0:ix1 - x0] = block[iy0 - by0:iy1 - by0, ix0 - bx0:ix1 - bx0]
+        # windows go left to right, top to bottom: keep only blocks the next
+        # window in this band or the next band still needs
+        self._cache = {
+            index: cached for index, cached in self._cache.items()
+            if cached[3] > y1 or (cached[2] > x1 and cached[1] < y1)
+        }
+        return out
+
+    def close(self) -> None:
+        self._cache = {}
+        self._fp.close()
+
+
+class _TileReader:
+    """Reads an image as uint8 RGB in rectangular windows.
+
+    Uncompressed rasters (strip/tiled TIFF, PPM, BMP) are memory-mapped, so a
+    window read only touches the bytes of that window. Other TIFFs (LZW,
+    Deflate, JPEG; RGBA, CMYK, palette) are decoded one strip or tile at a
+    time by _TiffBlocks. Anything else is decoded whole (_decode_whole) and
+    windows are sliced from that array.
+    """
+
+    # raw modes that can be memory-mapped, with their bytes per pixel
+    _RAW_PIXEL_BYTES = {'RGB': 3, 'BGR': 3, 'RGBA': 4, 'RGBX': 4}
+
+    def __init__(self, img: Image.Image):
+        self.width, self.height = img.size
+        self._regions = self._map_raw_regions(img.filename, img)
+        self._blocks = None
+        self._decoded = None
+        if self._regions is None:
+            self._blocks = _TiffBlocks.open(img)
+        if self._regions is None and self._blocks is None:
+            self._decoded = _decode_whole(img)
+            # a JPEG may have been decoded at a reduced scale
+            self.height, self.width = self._decoded.shape[:2]
+
+    @classmethod
+    def _map_raw_regions(cls, path: str, img: Image.Image):
+        if img.mode not in ('RGB', 'RGBA') or not img.tile:
+            return None
+        regions = []
+        for tile in img.tile:
+            codec, box, offset, args = tile[0], tile[1], tile[2], tile[3]
+            if not isinstance(args, tuple):
+                args = (args,)
+            rawmode = args[0]
+            stride = args[1] if len(args) > 1 else 0
+            orientation = args[2] if len(args) > 2 else 1
+            pixel_bytes = cls._RAW_PIXEL_BYTES.get(rawmode)
+            if codec != 'raw' or pixel_bytes is None or orientation not in (1, -1):
+                return None
+            x0, y0, x1, y1 = box
+            row_bytes = stride or (x1 - x0) * pixel_bytes
+            if row_bytes % pixel_bytes or row_bytes < (x1 - x0) * pixel_bytes:
+                return None
+            try:
+                mm = np.memmap(path, dtype=np.uint8, mode='r', offset=offset, shape=(y1 - y0, row_bytes // pixel_bytes, pixel_bytes))
+            except (ValueError, OSError):
+                return None
+            # alpha / padding byte dropped
+            view = mm[:, :x1 - x0, :3]
+            if orientation == -1:
+                view = view[::-1]
+            if rawmode == 'BGR':
+                view = view[:, :, ::-1]
+            regions.append((x0, y0, x1, y1, view))
+        return regions
+
+    def read(self, x0: int, y0: int, x1: int, y1: int) -> np.ndarray:
+        if self._decoded is not None:
+            return self._decoded[y0:y1, x0:x1]
+        if self._blocks is not None:
+            return self._blocks.read(x0, y0, x1, y1)
+        out = np.empty((y1 - y0, x1 - x0, 3), dtype=np.uint8)
+        for rx0, ry0, rx1, ry1, view in self._regions:
+            ix0, iy0 = max(x0, rx0), max(y0, ry0)
+            ix1, iy1 = min(x1, rx1), min(y1, ry1)
+            if ix0 >= ix1 or iy0 >= iy1:
+                continue
+            out[iy0 - y0:iy1 - y0, ix0 - x0:ix1 - x0] = view[iy0 - ry0:iy1 - ry0, ix0 - rx0:ix1 - rx0]
+        return out
+
+    def windows(self, tile_size: int, align: int = 1):
+        """(x0, y0, rgb) windows of about tile_size**2 pixels; x0/y0 are multiples of align."""
+        if self._blocks is not None and self._blocks.strips:
+            # full-width bands of the same area, so every strip is decoded once per pass
+            band = max(align, tile_size * tile_size // self.width // align * align)
+            for y0 in range(0, self.height, band):
+                yield 0, y0, self.read(0, y0, self.width, min(y0 + band, self.height))
+            return
+        for y0 in range(0, self.height, tile_size):
+            for x0 in range(0, self.width, tile_size):
+                x1 = min(x0 + tile_size, self.width)
+                y1 = min(y0 + tile_size, self.height)
+                yield x0, y0, self.read(x0, y0, x1, y1)
+
+    def close(self) -> None:
+        if self._blocks is not None:
+            self._blocks.close()
+
+
+class IndexHistogram:
+    """Mergeable exact histograms of raw ExG and VARI terms.
+
+    Accumulated per tile and combined with merge(); gives the global ExG
+    range and the VARI percentile bounds exactly as np.percentile would on
+    the full frame.
+    """
+
+    __slots__ = ('exg_counts', 'vari_counts')
+
+    def __init__(self):
+        self.exg_counts = np.zeros(_EXG_BINS, dtype=np.int64)
+        self.vari_counts = np.zeros(_VARI_NUM_BINS * _VARI_DEN_BINS, dtype=np.int64)
+
+    def update(self, rgb: np.ndarray) -> 'IndexHistogram':
+        # int16 holds every term below; only the VARI bin index needs int32
+        R = rgb[:, :, 0].astype(np.int16)
+        G = rgb[:, :, 1].astype(np.int16)
+        B = rgb[:, :, 2].astype(np.int16)
+        exg = 2 * G - R - B + 510
+        self.exg_counts += np.bincount(exg.ravel(), minlength=_EXG_BINS)
+        del exg
+        idx = (G - R + 255).astype(np.int32) * _VARI_DEN_BINS + (G + R - B + 255)
+        self.vari_counts += np.bincount(idx.ravel(), minlength=self.vari_counts.size)
+        return self
+
+    def merge(self, other: 'IndexHistogram') -> 'IndexHistogram':
+        self.exg_counts += other.exg_counts
+        self.vari_counts += other.vari_counts
+        return self
+
+    def exg_range(self) -> Tuple[float, float]:
+        nz = np.flatnonzero(self.exg_counts)
+        return float(nz[0] - 510), float(nz[-1] - 510)
+
+    def vari_percentiles(self, low: float, high: float) -> Tuple[float, float]:
+        nz = np.flatnonzero(self.vari_counts)
+        num = (nz // _VARI_DEN_BINS - 255).astype(np.float32)
+        den = (nz % _VARI_DEN_BINS - 255).astype(np.float32)
+        den += np.float32(_EPS_U8)
+        values = num / den
+        order = np.argsort(values, kind='stable')
+        values = values[order]
+        cum = np.cumsum(self.vari_counts[nz][order])
+        n = int(cum[-1])
+        result = []
+        for q in (low, high):
+            pos = q / 100.0 * (n - 1)
+            lo = int(np.floor(pos))
+            hi = min(lo + 1, n - 1)
+            a = values[np.searchsorted(cum, lo, side='right')]
+            b = values[np.searchsorted(cum, hi, side='right')]
+            result.append(float(a + (pos - lo) * (b - a)))
+        return result[0], result[1]
+
+
+class MaskedIndexStats:
+    """Mergeable masked-pixel counters for the second tiled pass."""
+
+    __slots__ = ('pixels', 'count', 'exg_sum', 'vari_sum')
+
+    def __init__(self):
+        self.pixels = 0
+        self.count = 0
+        self.exg_sum = 0.0
+        self.vari_sum = 0.0
+
+    def update(self, buffers: IndexBuffers) -> 'MaskedIndexStats':
+        count, exg_sum, vari_sum = _masked_sums(buffers)
+        self.pixels += buffers.mask.size
+        self.count += count
+        self.exg_sum += exg_sum
+        self.vari_sum += vari_sum
+        return self
+
+    def merge(self, other: 'MaskedIndexStats') -> 'MaskedIndexStats':
+        self.pixels += other.pixels
+        self.count += other.count
+        self.exg_sum += other.exg_sum
+        self.vari_sum += other.vari_sum
+        return self
+
+    def as_stats(self) -> Dict[str, float]:
+        return {
+            'vegetation_coverage_percent': self.count / float(self.pixels) * 100.0 if self.pixels else 0.0,
+            'exg_mean': self.exg_sum / self.count if self.count else 0.0,
+            'vari_mean': self.vari_sum / self.count if self.count else 0.0,
+        }
+
+
+def _reduce_into(canvas: np.ndarray, arr: np.ndarray, factor: int, cx: int, cy: int) -> None:
+    """Box-downsample arr by factor and paste it into canvas at (cx, cy)."""
+    small = np.asarray(Image.fromarray(arr).reduce(factor)) if factor > 1 else arr
+    canvas[cy:cy + small.shape[0], cx:cx + small.shape[1]] = small
+
+
+def analyze_image_tiled(
+    path: str,
+    workdir: str,
+    tile_size: int = TILE_SIZE,
+    preview_max_side: int = PREVIEW_MAX_SIDE,
+    threshold: float = EXG_THRESHOLD,
+) -> Tuple[Dict[str, Any], Dict[str, str]]:
+    """Tile-by-tile variant of analyze_image for very large orthomosaics.
+
+    Two passes over tile_size x tile_size windows: the first accumulates
+    IndexHistogram (global ExG range and VARI percentile bounds), the second
+    normalizes each tile with those global bounds, accumulates
+    MaskedIndexStats and box-downsamples the maps into a canvas whose longest
+    side is at most preview_max_side. For TIFF, PPM and BMP inputs working
+    memory is bounded by the tile (or TIFF strip row) and canvas sizes, not
+    the image size; other formats are decoded whole first (_TileReader).
+    """
+    with open_image(path) as img:
+        return _analyze_tiled(img, workdir, tile_size, preview_max_side, threshold)
+
+
+def _analyze_tiled(
+    img: Image.Image,
+    workdir: str,
+    tile_size: int = TILE_SIZE,
+    preview_max_side: int = PREVIEW_MAX_SIDE,
+    threshold: float = EXG_THRESHOLD,
+) -> Tuple[Dict[str, Any], Dict[str, str]]:
+    # tile decoding is interleaved with the index passes: both count as 'indices'
+    started = time.perf_counter()
+    reader = _TileReader(img)
+    try:
+        return _analyze_windows(reader, workdir, tile_size, preview_max_side, threshold, started)
+    finally:
+        reader.close()
+
+
+def _analyze_windows(
+    reader: _TileReader,
+    workdir: str,
+    tile_size: int,
+    preview_max_side: int,
+    threshold: float,
+    started: float,
+) -> Tuple[Dict[str, Any], Dict[str, str]]:
+    width, height = reader.width, reader.height
+    factor = max(1, -(-max(width, height) // preview_max_side))
+    # tiles must start on canvas pixel boundaries
+    tile_size = max(factor, tile_size // factor * factor)
+
+    histogram = IndexHistogram()
+    buffers = None
+    for _, _, rgb in reader.windows(tile_size, factor):
+        histogram.update(rgb)
+    exg_min, exg_max = histogram.exg_range()
+    vmin, vmax = histogram.vari_percentiles(VARI_LOW_PERCENTILE, VARI_HIGH_PERCENTILE)
+
+    cw, ch = -(-width // factor), -(-height // factor)
+    exg_canvas = np.zeros((ch, cw), dtype=np.float32)
+    vari_canvas = np.zeros((ch, cw), dtype=np.float32)
+    mask_canvas = np.zeros((ch, cw), dtype=np.uint8)
+    rgb_canvas = np.zeros((ch, cw, 3), dtype=np.uint8)
+
+    masked = MaskedIndexStats()
+    for x0, y0, rgb in reader.windows(tile_size, factor):
+        shape = rgb.shape[:2]
+        if buffers is None or buffers.shape != shape:
+            buffers = IndexBuffers(shape)
+        _raw_indices(rgb, buffers)
+        _normalize_indices(buffers, exg_min, exg_max, vmin, vmax, threshold)
+        masked.update(buffers)
+
+        cx, cy = x0 // factor, y0 // factor
+        _reduce_into(exg_canvas, buffers.exg, factor, cx, cy)
+        _reduce_into(vari_canvas, buffers.vari, factor, cx, cy)
+        _reduce_into(mask_canvas, np.multiply(buffers.mask, 255, dtype=np.uint8), factor, cx, cy)
+        _reduce_into(rgb_canvas, np.ascontiguousarray(rgb), factor, cx, cy)
+
+    metrics = _build_metrics(masked.as_stats())
+    record_stage('indices', time.perf_counter() - started)
+    with stage('heatmaps'):
+        assets = _write_assets(workdir, exg_canvas, vari_canvas, rgb_canvas, mask_canvas)
+    return metrics, assets
+
+
+def analyze_image(path: str, workdir: str) -> Tuple[Dict[str, Any], Dict[str, str]]:
+    """Analyze image and produce metrics and paths to generated images.
+
+    Returns (metrics, assets) where assets contain paths to heatmap_exg, heatmap_vari, overlay.
+    Images above TILED_MIN_PIXELS are routed through analyze_image_tiled.
+    Raises ImageTooLarge for images the analyzer refuses to decode.
+    """
+    with open_image(path) as img:
+        width, height = img.size
+        if width * height >= TILED_MIN_PIXELS:
+            return _analyze_tiled(img, workdir)
+        with stage('load_image'):
+            rgb = np.asarray(img.convert('RGB'))
+    with stage('indices'):
+        buffers, stats = compute_indices(rgb)
+        metrics = _build_metrics(stats)
+    with stage('heatmaps'):
+        assets = _write_assets(workdir, buffers.exg, buffers.vari, rgb, buffers.mask)
     return metrics, assets
@@ -0,0 +1,60 @@
+"""
+Неизменяемые снимки (DTO) пользователей и тарифных планов для кэширования.
+
+ORM-объекты привязаны к Session: после ее закрытия обращение к ленивым
+связям падает, поэтому в кэше хранятся только эти снимки — frozen
+dataclasses со __slots__, без ссылок на Session. Поля совпадают с
+атрибутами моделей, которые используют шаблоны.
+"""
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Optional
+
+from app.models.models import SubscriptionPlan, User
+
+
+@dataclass(frozen=True, slots=True)
+class PlanSnapshot:
+    id: int
+    name: str
+    free_attempts_limit: int
+    created_at: Optional[datetime] = None
+
+    @classmethod
+    def from_orm(cls, plan: SubscriptionPlan) -> "PlanSnapshot":
+        return cls(
+            id=plan.id,
+            name=plan.name,
+            free_attempts_limit=plan.free_attempts_limit,
+            created_at=plan.created_at,
+        )
+
+
+@dataclass(frozen=True, slots=True)
+class UserSnapshot:
+    id: int
+    email: str
+    name: Optional[str]
+    role: str
+    plan_id: int
+    free_attempts_used: int
+    is_active: bool
+    phone: Optional[str] = None
+    created_at: Optional[datetime] = None
+    plan: Optional[PlanSnapshot] = None
+
+    @classmethod
+    def from_orm(cls, user: User) -> "UserSnapshot":
+        """Снимок пользователя; user.plan должен быть загружен (joinedload)."""
+        return cls(
+            id=user.id,
+            email=user.email,
+            name=user.name,
+            role=user.role,
+            plan_id=user.plan_id,
+            free_attempts_used=user.free_attempts_used or 0,
+            is_active=user.is_active,
+            phone=user.phone,
+            created_at=user.created_at,
+            plan=PlanSnapshot.from_orm(user.plan) if user.plan else None,
+        )
@@ -0,0 +1,101 @@
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Optional, Tuple
+import logging
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+from app.accessors.reports_accessor import ReportsAccessor
+from app.models.models import ProcessingRun, User
+from app.services.cache_service import MemoryCacheService
+
+logger = logging.getLogger(__name__)
+
+# Срок жизни закэшированных счетчиков dashboard (секунды)
+STATS_CACHE_TTL = 30
+# Сколько последних дней показывать в разбивке обработок по дням
+STATS_DAYS = 14
+
+
+@dataclass(frozen=True, slots=True)
+class DashboardStats:
+    total_users: int
+    total_runs: int
+    total_reports: int
+    # ((status, count), ...) по убыванию count
+    runs_by_status: Tuple[Tuple[str, int], ...]
+    # (("YYYY-MM-DD", count), ...) за последние STATS_DAYS дней, по возрастанию даты
+    runs_by_day: Tuple[Tuple[str, int], ...]
+    computed_at: datetime
+
+
+class StatsService:
+    """
+    Сервис агрегированной статистики для dashboard.
+
+    Все счетчики считаются в БД (SELECT count(*) / GROUP BY), строки в Python
+    не загружаются. Результат кэшируется на STATS_CACHE_TTL секунд, поэтому
+    стоимость страницы не зависит от объема данных.
+    """
+
+    def __init__(self, db: Session, cache_service: Optional[MemoryCacheService] = None):
+        self.db = db
+        self.cache_service = cache_service
+
+    def get_dashboard_stats(self) -> DashboardStats:
+        """
+        Возвращает счетчики dashboard (из кэша, если он еще не истек).
+
+        Returns:
+            Снимок DashboardStats
+        """
+        cache_key = "stats:dashboard"
+
+        if self.cache_service:
+            cached = self.cache_service.get(cache_key)
+            if cached is not None:
+                return cached
+
+        stats = self._compute()
+
+        if self.cache_service:
+            self.cache_service.set(cache_key, stats, ttl_seconds=STATS_CACHE_TTL)
+        return stats
+
+    def _compute(self) -> DashboardStats:
+        total_users = self.db.execute(
+            select(func.count(User.id)).where(User.is_active == True)
+        ).scalar_one()
+        total_reports = ReportsAccessor(self.db).count_reports()
+
+        # ix_processing_runs_status_id
+        by_status = self.db.execute(
+            select(ProcessingRun.status, func.count(ProcessingRun.id))
+            .group_by(ProcessingRun.status)
+            .order_by(func.count(ProcessingRun.id).desc())
+        ).all()
+
+        # ix_processing_runs_created_at: читается только диапазон за STATS_DAYS дней
+        since = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0) - timedelta(days=STATS_DAYS - 1)
+        day = func.date(ProcessingRun.created_at)
+        by_day = self.db.execute(
+            select(day, func.count(ProcessingRun.id))
+            .where(ProcessingRun.created_at >= since)
+            .group_by(day)
+            .order_by(day)
+        ).all()
+
+        return DashboardStats(
+            total_users=total_users,
+            total_runs=sum(count for _, count in by_status),
+            total_reports=total_reports,
+            runs_by_status=tuple((status, count) for status, count in by_status),
+            runs_by_day=tuple((str(d), count) for d, count in by_day),
+            computed_at=datetime.utcnow(),
+        )
+
+    def invalidate_cache(self) -> None:
+        """
+        Сбрасывает закэшированные счетчики.
+        """
+        if self.cache_service:
+            self.cache_service.remove_by_prefix("stats:")
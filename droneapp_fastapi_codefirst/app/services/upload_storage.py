@@ -0,0 +1,67 @@
+"""
+Streaming storage of uploaded files.
+
+The upload is copied to disk in fixed-size chunks (async file I/O via anyio),
+hashed with SHA-256 on the fly and aborted as soon as it grows past the size
+limit, so memory per upload stays constant whatever the file size.
+"""
+import hashlib
+import os
+import uuid
+from typing import NamedTuple, Optional
+
+import anyio
+from fastapi import UploadFile
+
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+
+
+class StoredUpload(NamedTuple):
+    filename: str
+    path: str
+    size: int
+    sha256: str
+
+
+class UploadTooLarge(Exception):
+    def __init__(self, max_size: int):
+        super().__init__(f'Upload exceeds the maximum size of {max_size} bytes')
+        self.max_size = max_size
+
+
+def _stored_filename(original: Optional[str]) -> str:
+    return f'{uuid.uuid4().hex}_{os.path.basename(original or "upload")}'
+
+
+async def stream_upload_to_disk(
+    upload: UploadFile,
+    dest_dir: str,
+    max_size: Optional[int] = None,
+    chunk_size: int = UPLOAD_CHUNK_SIZE,
+) -> StoredUpload:
+    """Copy upload into dest_dir chunk by chunk; raise UploadTooLarge past max_size.
+
+    A partially written file is removed when the copy fails.
+    """
+    filename = _stored_filename(upload.filename)
+    path = os.path.join(dest_dir, filename)
+    digest = hashlib.sha256()
+    size = 0
+    try:
+        async with await anyio.open_file(path, 'wb') as fh:
+            while True:
+                chunk = await upload.read(chunk_size)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if max_size is not None and size > max_size:
+                    raise UploadTooLarge(max_size)
+                digest.update(chunk)
+                await fh.write(chunk)
+    except BaseException:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+        raise
+    return StoredUpload(filename, path, size, digest.hexdigest())
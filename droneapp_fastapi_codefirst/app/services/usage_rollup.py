@@ -0,0 +1,58 @@
+"""
+Per-user daily usage rollup (table user_usage_daily).
+
+Every finished analysis adds to the (user_id, day) row inside the same
+transaction that records its ProcessingRun: a single INSERT ... ON CONFLICT
+DO UPDATE with relative increments, so concurrent requests never lose
+updates and readers (GET /api/usage, billing) never scan processing_runs.
+Runs are counted when they reach SUCCESS or FAILED; queued jobs are counted
+by the worker that finishes them.
+"""
+from datetime import date, datetime
+from typing import Optional
+
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from app.models.models import UserUsageDaily
+
+_UPSERT_INSERTS = {
+    'postgresql': postgresql.insert,
+    'sqlite': sqlite.insert,
+}
+
+
+def record_usage(
+    db: Session,
+    user_id: int,
+    successes: int = 0,
+    failures: int = 0,
+    bytes_uploaded: int = 0,
+    analysis_ms: int = 0,
+    day: Optional[date] = None,
+) -> None:
+    """Add finished runs to the user's rollup row for day (UTC today by default).
+
+    Joins the caller's transaction; nothing is committed here.
+    """
+    values = {
+        'runs': successes + failures,
+        'successes': successes,
+        'failures': failures,
+        'bytes_uploaded': int(bytes_uploaded),
+        'analysis_ms': int(analysis_ms),
+    }
+    if not values['runs'] and not values['bytes_uploaded']:
+        return
+    key = {'user_id': user_id, 'day': day or datetime.utcnow().date()}
+    dialect = db.get_bind().dialect.name
+    insert = _UPSERT_INSERTS.get(dialect)
+    if insert is None:
+        raise RuntimeError(f'usage rollup upsert is not implemented for {dialect}')
+    table = UserUsageDaily.__table__
+    stmt = insert(table).values(**key, **values)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[table.c.user_id, table.c.day],
+        set_={name: table.c[name] + stmt.excluded[name] for name in values},
+    )
+    db.execute(stmt)
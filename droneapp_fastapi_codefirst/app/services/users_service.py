@@ -1,8 +1,10 @@
-from typing import Optional, List
+from typing import Optional, Tuple, Union
 import logging
 from app.accessors.users_accessor import UsersAccessor
 from app.models.models import User
 from app.services.cache_service import MemoryCacheService
+from app.services.quota_service import attempts_limit
+from app.services.snapshots import UserSnapshot
 
 logger = logging.getLogger(__name__)
 
@@ -11,13 +13,16 @@ class UsersService:
     """
     Сервис для бизнес-логики работы с пользователями.
     Не зависит от FastAPI напрямую, работает только с моделями и accessors.
+
+    Методы чтения возвращают неизменяемые снимки UserSnapshot, а не ORM-объекты:
+    только их можно безопасно хранить в кэше между запросами.
     """
     
     def __init__(self, users_accessor: UsersAccessor, cache_service: Optional[MemoryCacheService] = None):
         self.users_accessor = users_accessor
         self.cache_service = cache_service
     
-    def list_users(self, active_only: bool = True) -> List[User]:
+    def list_users(self, active_only: bool = True) -> Tuple[UserSnapshot, ...]:
         """
         Возвращает список пользователей с кэшированием.
         
@@ -25,7 +30,7 @@ class UsersService:
             active_only: Если True, возвращает только активных пользователей
             
         Returns:
-            Список пользователей
+            Снимки пользователей (вместе с планом)
         """
         cache_key = f"users:list:active" if active_only else "users:list:all"
         
@@ -36,14 +41,14 @@ class UsersService:
                 return cached
             logger.info(f"cache miss: {cache_key}")
         
-        users = self.users_accessor.list_users(active_only=active_only)
+        users = tuple(UserSnapshot.from_orm(u) for u in self.users_accessor.list_users(active_only=active_only))
         
         if self.cache_service:
             self.cache_service.set(cache_key, users, ttl_seconds=60)
         
         return users
     
-    def get_user(self, user_id: int) -> Optional[User]:
+    def get_user(self, user_id: int) -> Optional[UserSnapshot]:
         """
         Возвращает пользователя по ID с кэшированием.
         
@@ -51,7 +56,7 @@ class UsersService:
             user_id: ID пользователя
             
         Returns:
-            Пользователь или None
+            Снимок пользователя или None
         """
         cache_key = f"users:detail:{user_id}"
         
@@ -60,13 +65,22 @@ class UsersService:
             if cached is not None:
                 return cached
         
-        user = self.users_accessor.get_user(user_id)
+        orm_user = self.users_accessor.get_user(user_id)
+        user = UserSnapshot.from_orm(orm_user) if orm_user else None
         
         if self.cache_service and user:
             self.cache_service.set(cache_key, user, ttl_seconds=60)
         
         return user
     
+    def invalidate_cache(self) -> None:
+        """
+        Сбрасывает кэш пользователей (после изменений в обход сервиса,
+        например создания/редактирования через UsersAccessor).
+        """
+        if self.cache_service:
+            self.cache_service.remove_by_prefix("users:")
+    
     def deactivate_user(self, user_id: int) -> None:
         """
         Деактивирует пользователя (soft delete).
@@ -80,8 +94,7 @@ class UsersService:
             raise ValueError("Пользователь не найден")
         
         # Сбрасываем кэш после успешного изменения
-        if self.cache_service:
-            self.cache_service.remove_by_prefix("users:")
+        self.invalidate_cache()
     
     def activate_user(self, user_id: int) -> None:
         """
@@ -96,17 +109,12 @@ class UsersService:
             raise ValueError("Пользователь не найден")
         
         # Сбрасываем кэш после успешного изменения
-        if self.cache_service:
-            self.cache_service.remove_by_prefix("users:")
+        self.invalidate_cache()
     
-    def get_attempts_limit(self, user: User) -> int:
+    def get_attempts_limit(self, user: Union[User, UserSnapshot]) -> int:
         """
-        Возвращает лимит попыток для пользователя на основе его плана.
-        
-        Rules:
-        - Free => 2
-        - Pro => 999
-        - Fallback => 2 (если план не определен или имя неизвестно)
+        Возвращает лимит попыток для пользователя: free_attempts_limit его плана
+        (тот же лимит, что проверяет QuotaService.reserve).
         
         Args:
             user: Объект пользователя (должен иметь связанный plan)
@@ -114,20 +122,9 @@ class UsersService:
         Returns:
             Лимит попыток
         """
-        if not user.plan:
-            return 2
-        
-        plan_name = user.plan.name.lower() if user.plan.name else ""
-        
-        if plan_name == "free":
-            return 2
-        elif plan_name == "pro":
-            return 999
-        else:
-            # Fallback для любых других планов
-            return 2
+        return attempts_limit(user.plan)
     
-    def get_remaining_attempts(self, user: User) -> int:
+    def get_remaining_attempts(self, user: Union[User, UserSnapshot]) -> int:
         """
         Возвращает количество оставшихся попыток для пользователя.
         
@@ -141,7 +138,7 @@ class UsersService:
         used = user.free_attempts_used or 0
         return max(0, limit - used)
     
-    def ensure_can_run_analysis(self, user: User) -> None:
+    def ensure_can_run_analysis(self, user: Union[User, UserSnapshot]) -> None:
         """
         Проверяет, может ли пользователь запустить анализ.
         
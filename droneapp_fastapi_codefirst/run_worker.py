@@ -0,0 +1,26 @@
+#!/usr/bin/env python3
+"""Worker for async analysis jobs (POST /api/analyze?async=1).
+
+Several workers may run side by side; each queued run is claimed exactly once.
+"""
+import argparse
+import os
+import sys
+
+# Ensure the app package in this directory is preferred on import
+sys.path.insert(0, os.path.dirname(__file__))
+
+from app.logging_config import setup_logging
+from app.services.analysis_jobs import run_worker_loop
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Process queued DroneApp analysis jobs")
+    parser.add_argument("--poll-interval", type=float, default=float(os.environ.get("WORKER_POLL_INTERVAL", "1.0")))
+    parser.add_argument("--once", action="store_true", help="exit when the queue is empty")
+    args = parser.parse_args()
+
+    setup_logging()
+    try:
+        run_worker_loop(poll_interval=args.poll_interval, once=args.once)
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,155 @@
+"""/api/runs throughput under concurrency: sync Session (threadpool) vs AsyncSession.
+
+Starts uvicorn in a subprocess with two copies of the runs page endpoint —
+``def`` + RunsAPIAccessor and ``async def`` + AsyncRunsAPIAccessor — and
+fires requests at each with increasing client concurrency, printing
+requests/sec and latency percentiles.
+
+The database is a temporary SQLite file unless BENCH_DATABASE_URL is set
+(e.g. postgresql://... — the async path then uses asyncpg). Note that with
+SQLite aiosqlite runs every connection in a helper thread, so the async win
+shows against a networked database, where requests spend time waiting on I/O.
+
+Usage: python -m scripts.bench_api_concurrency [requests_per_level] [concurrency,...]
+"""
+import asyncio
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+PAGE_SIZE = 50
+
+
+def create_app():
+    """uvicorn --factory entry point (runs in the server process)."""
+    from fastapi import Depends, FastAPI
+    from sqlalchemy.ext.asyncio import AsyncSession
+    from sqlalchemy.orm import Session
+
+    from app.api.accessors.runs_api_accessor import RunsAPIAccessor
+    from app.api.accessors.runs_api_async_accessor import AsyncRunsAPIAccessor
+    from app.api.mappers.run_mapper import map_run_row_to_dto
+    from app.db import get_async_db, get_db
+
+    app = FastAPI()
+
+    @app.get('/sync/runs')
+    def sync_runs(db: Session = Depends(get_db)):
+        return [map_run_row_to_dto(r) for r in RunsAPIAccessor(db).list_runs_page(PAGE_SIZE)]
+
+    @app.get('/async/runs')
+    async def async_runs(db: AsyncSession = Depends(get_async_db)):
+        return [map_run_row_to_dto(r) for r in await AsyncRunsAPIAccessor(db).list_runs_page(PAGE_SIZE)]
+
+    return app
+
+
+def _fill(database_url: str, runs: int) -> None:
+    from sqlalchemy import create_engine, insert
+    from sqlalchemy.orm import Session
+
+    from app.models.base import Base
+    from app.models.models import InputImage, ProcessingRun, SubscriptionPlan, User
+
+    engine = create_engine(database_url)
+    Base.metadata.create_all(engine)
+    with Session(engine) as session:
+        session.execute(insert(SubscriptionPlan), [{'id': 1, 'name': 'Free', 'free_attempts_limit': 2}])
+        session.execute(insert(User), [
+            {'id': i, 'email': f'user{i}@droneapp.local', 'password_hash': 'x', 'role': 'USER', 'plan_id': 1}
+            for i in range(1, 101)
+        ])
+        session.execute(insert(InputImage), [{'id': 1, 'user_id': 1, 'filename': 'f', 'storage_path': 'f'}])
+        session.execute(insert(ProcessingRun), [
+            {'id': i, 'user_id': i % 100 + 1, 'input_image_id': 1, 'index_type': 'NDVI', 'status': 'SUCCESS'}
+            for i in range(1, runs + 1)
+        ])
+        session.commit()
+    engine.dispose()
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+async def _wait_ready(base_url: str, timeout: float = 30.0) -> None:
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient() as client:
+        while time.monotonic() < deadline:
+            try:
+                await client.get(f'{base_url}/docs')
+                return
+            except httpx.TransportError:
+                await asyncio.sleep(0.2)
+    raise RuntimeError('server did not start')
+
+
+async def _load(url: str, total: int, concurrency: int):
+    latencies = []
+    errors = 0
+    remaining = iter(range(total))
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(limits=limits, timeout=60.0) as client:
+        async def worker():
+            nonlocal errors
+            for _ in remaining:
+                t0 = time.perf_counter()
+                try:
+                    response = await client.get(url)
+                    if response.status_code != 200:
+                        errors += 1
+                except httpx.HTTPError:
+                    errors += 1
+                latencies.append(time.perf_counter() - t0)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+    latencies.sort()
+    return total / elapsed, latencies[len(latencies) // 2], latencies[int(len(latencies) * 0.99) - 1], errors
+
+
+async def _bench(base_url: str, total: int, levels) -> None:
+    await _wait_ready(base_url)
+    # warm up both pools
+    await _load(f'{base_url}/sync/runs', 50, 5)
+    await _load(f'{base_url}/async/runs', 50, 5)
+    print(f'{total} requests per level, page size {PAGE_SIZE}')
+    print(f'{"concurrency":>11} | {"path":5} | {"req/s":>8} | {"p50 ms":>8} | {"p99 ms":>8} | errors')
+    for concurrency in levels:
+        for path in ('sync', 'async'):
+            rps, p50, p99, errors = await _load(f'{base_url}/{path}/runs', total, concurrency)
+            print(f'{concurrency:>11} | {path:5} | {rps:8.1f} | {p50 * 1000:8.1f} | {p99 * 1000:8.1f} | {errors}')
+
+
+def main():
+    total = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    levels = [int(x) for x in sys.argv[2].split(',')] if len(sys.argv) > 2 else [1, 10, 50, 200]
+    with tempfile.TemporaryDirectory() as tmp:
+        database_url = os.getenv('BENCH_DATABASE_URL') or f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+        _fill(database_url, 10_000)
+        port = _free_port()
+        env = dict(os.environ, DATABASE_URL=database_url, DB_POOL_SIZE='20', DB_MAX_OVERFLOW='20')
+        env.pop('ASYNC_DATABASE_URL', None)
+        server = subprocess.Popen(
+            [sys.executable, '-m', 'uvicorn', '--factory', 'scripts.bench_api_concurrency:create_app',
+             '--port', str(port), '--log-level', 'warning', '--no-access-log'],
+            env=env,
+        )
+        try:
+            asyncio.run(_bench(f'http://127.0.0.1:{port}', total, levels))
+        finally:
+            server.terminate()
+            server.wait()
+
+
+if __name__ == '__main__':
+    main()
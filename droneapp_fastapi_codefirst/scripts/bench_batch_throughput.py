@@ -0,0 +1,73 @@
+"""Batch analysis throughput (frames/sec) as a function of worker count.
+
+Runs the same fan-out as POST /api/analyze/batch: analyze_image for every
+frame through an AnalysisPool, at most `workers` frames in flight.
+
+Usage: python -m scripts.bench_batch_throughput [frames] [megapixels] [max_workers]
+"""
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+from PIL import Image
+
+from app.services.analysis_pool import AnalysisPool
+from app.services.rgb_analyzer import analyze_image
+
+
+def _write_frames(directory: str, count: int, megapixels: float):
+    w = int((megapixels * 1e6 * 3 / 2) ** 0.5)
+    h = int(megapixels * 1e6 / w)
+    rng = np.random.default_rng(0)
+    paths = []
+    for i in range(count):
+        frame = rng.integers(0, 256, size=(h, w, 3), dtype=np.uint8)
+        frame[: h // 3, :, 1] = np.maximum(frame[: h // 3, :, 1], 200)
+        path = os.path.join(directory, f'frame_{i:04d}.jpg')
+        Image.fromarray(frame).save(path, quality=90)
+        paths.append(path)
+    return paths
+
+
+async def _run_batch(pool: AnalysisPool, paths, workdir: str) -> float:
+    slots = asyncio.Semaphore(pool.workers)
+
+    async def one(path):
+        async with slots:
+            return await pool.run(analyze_image, path, workdir)
+
+    t0 = time.perf_counter()
+    await asyncio.gather(*(one(p) for p in paths))
+    return time.perf_counter() - t0
+
+
+def main():
+    frames = int(sys.argv[1]) if len(sys.argv) > 1 else 32
+    megapixels = float(sys.argv[2]) if len(sys.argv) > 2 else 12.0
+    max_workers = int(sys.argv[3]) if len(sys.argv) > 3 else (os.cpu_count() or 1)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = _write_frames(tmp, frames, megapixels)
+        workdir = os.path.join(tmp, 'assets')
+        print(f'{frames} frames, {megapixels:.0f} MP each')
+        base = None
+        workers = 1
+        while workers <= max_workers:
+            pool = AnalysisPool(workers, 0)
+            try:
+                # warm up: spawn the worker processes before timing
+                asyncio.run(_run_batch(pool, paths[:workers], workdir))
+                elapsed = asyncio.run(_run_batch(pool, paths, workdir))
+            finally:
+                pool.shutdown()
+            fps = frames / elapsed
+            base = base or fps
+            print(f'workers={workers:3d}  {fps:8.2f} frames/s  scaling {fps / base:5.2f}x')
+            workers *= 2
+
+
+if __name__ == '__main__':
+    main()
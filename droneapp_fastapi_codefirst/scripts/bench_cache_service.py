@@ -0,0 +1,101 @@
+"""Micro-benchmarks: MemoryCacheService (bounded LRU) vs the previous dict cache.
+
+Usage: python -m scripts.bench_cache_service [keys] [threads]
+"""
+import random
+import sys
+import threading
+import time
+from typing import Any, Dict, Optional, Tuple
+
+from app.services.cache_service import MemoryCacheService
+
+
+class LegacyMemoryCacheService:
+    # previous cache_service.MemoryCacheService: plain dict, no bound, no lock
+    def __init__(self):
+        self._cache: Dict[str, Tuple[float, Any]] = {}
+
+    def get(self, key: str) -> Optional[Any]:
+        if key not in self._cache:
+            return None
+        expires_at, value = self._cache[key]
+        if time.time() > expires_at:
+            del self._cache[key]
+            return None
+        return value
+
+    def set(self, key: str, value: Any, ttl_seconds: int = 60) -> None:
+        self._cache[key] = (time.time() + ttl_seconds, value)
+
+    def remove_by_prefix(self, prefix: str) -> None:
+        for key in [key for key in self._cache.keys() if key.startswith(prefix)]:
+            del self._cache[key]
+
+
+def _keys(n: int):
+    # mostly runs/plans entries, a small users namespace to invalidate
+    keys = [f'runs:detail:{i}' for i in range(n)]
+    keys += [f'users:detail:{i}' for i in range(n // 100)]
+    return keys
+
+
+def _bench(name: str, cache, keys, threads: int) -> None:
+    value = {'id': 1, 'email': 'user@droneapp.local', 'name': 'User', 'role': 'USER'}
+
+    t0 = time.perf_counter()
+    for key in keys:
+        cache.set(key, value)
+    set_t = time.perf_counter() - t0
+
+    rng = random.Random(0)
+    lookups = [rng.choice(keys) for _ in range(len(keys))]
+    t0 = time.perf_counter()
+    for key in lookups:
+        cache.get(key)
+    get_t = time.perf_counter() - t0
+
+    def reader():
+        for key in lookups[: len(lookups) // threads]:
+            cache.get(key)
+            cache.set(key, value)
+
+    workers = [threading.Thread(target=reader) for _ in range(threads)]
+    t0 = time.perf_counter()
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join()
+    mixed_t = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    cache.remove_by_prefix('users:')
+    prefix_t = time.perf_counter() - t0
+
+    n = len(keys)
+    print(
+        f'{name:8s} set {n / set_t / 1e6:6.2f} M/s | get {n / get_t / 1e6:6.2f} M/s | '
+        f'{threads} threads get+set {2 * (n // threads) * threads / mixed_t / 1e6:6.2f} M/s | '
+        f'remove_by_prefix("users:") {prefix_t * 1e3:8.3f} ms'
+    )
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    threads = int(sys.argv[2]) if len(sys.argv) > 2 else 4
+    keys = _keys(n)
+    print(f'{len(keys)} keys')
+    _bench('legacy', LegacyMemoryCacheService(), keys, threads)
+    cache = MemoryCacheService(max_entries=len(keys), max_bytes=1 << 40, sweep_interval=0)
+    _bench('lru', cache, keys, threads)
+    print('lru stats', cache.stats())
+
+    bounded = MemoryCacheService(max_entries=n // 10, sweep_interval=0)
+    for key in keys:
+        bounded.set(key, key)
+    s = bounded.stats()
+    print(f"bounded to {bounded.max_entries} entries: entries={s['entries']} evictions={s['evictions']}")
+
+
+if __name__ == '__main__':
+    main()
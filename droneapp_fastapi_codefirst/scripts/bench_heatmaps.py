@@ -0,0 +1,78 @@
+"""Heatmap backends: per-asset timing (pixel equivalence is asserted in
+tests/test_heatmap_renderer.py; the quick check here is kept for large frames).
+
+Compares the LUT renderer (app.services.heatmap_renderer) with the previous
+matplotlib pyplot rendering. Requires matplotlib.
+
+Usage: python -m scripts.bench_heatmaps [megapixels] [repeats]
+"""
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+import matplotlib
+matplotlib.use('Agg')
+import matplotlib.pyplot as plt
+from matplotlib.colors import Normalize
+
+from app.services.heatmap_renderer import colorize, render_heatmap
+
+
+def _matplotlib_heatmap(img: np.ndarray, path: str, cmap: str = 'RdYlGn'):
+    # previous rgb_analyzer._save_heatmap implementation
+    plt.figure(figsize=(6, 4))
+    plt.axis('off')
+    plt.imshow(img, cmap=cmap)
+    plt.tight_layout(pad=0)
+    plt.savefig(path, bbox_inches='tight', pad_inches=0)
+    plt.close()
+
+
+def check_equivalence(arr: np.ndarray, cmap: str) -> int:
+    """Number of pixels whose color differs from matplotlib's colormapping."""
+    expected = matplotlib.colormaps[cmap](Normalize()(arr), bytes=True)[..., :3]
+    return int(np.count_nonzero((colorize(arr, cmap) != expected).any(axis=-1)))
+
+
+def _time(fn, repeats: int) -> float:
+    best = float('inf')
+    for _ in range(repeats):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def main():
+    megapixels = float(sys.argv[1]) if len(sys.argv) > 1 else 12.0
+    repeats = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+    w = int((megapixels * 1e6 * 3 / 2) ** 0.5)
+    h = int(megapixels * 1e6 / w)
+    rng = np.random.default_rng(0)
+    arr = rng.random((h, w), dtype=np.float32)
+
+    failed = False
+    for cmap in ('RdYlGn', 'viridis'):
+        diff = check_equivalence(arr, cmap)
+        failed = failed or diff > 0
+        print(f'{cmap:8s} pixels differing from matplotlib: {diff}')
+
+    print(f'asset {w}x{h}')
+    with tempfile.TemporaryDirectory() as tmp:
+        for cmap in ('RdYlGn', 'viridis'):
+            mpl_path = os.path.join(tmp, f'mpl_{cmap}.png')
+            lut_path = os.path.join(tmp, f'lut_{cmap}.png')
+            mpl_t = _time(lambda: _matplotlib_heatmap(arr, mpl_path, cmap), repeats)
+            lut_t = _time(lambda: render_heatmap(arr, lut_path, cmap), repeats)
+            native_t = _time(lambda: render_heatmap(arr, lut_path, cmap, max_size=None), 1)
+            print(
+                f'{cmap:8s} matplotlib {mpl_t * 1000:8.1f} ms | lut {lut_t * 1000:8.1f} ms '
+                f'({mpl_t / lut_t:.1f}x) | lut native resolution {native_t * 1000:8.1f} ms'
+            )
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
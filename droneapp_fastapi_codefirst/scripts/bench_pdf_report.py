@@ -0,0 +1,90 @@
+"""PDF report size and build time: print-size JPEG embedding vs full-resolution images.
+
+Renders the same report twice from a synthetic upload and its analysis assets:
+once with the previous pipeline (fresh stylesheet, images embedded at native
+resolution) and once with app.services.pdf_report.build_pdf.
+
+Usage: python -m scripts.bench_pdf_report [megapixels] [repeats]
+"""
+import io
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+from PIL import Image
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.styles import getSampleStyleSheet
+from reportlab.lib.units import mm
+from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Image as RLImage, Table
+
+from app.services.pdf_report import build_pdf, METRICS_TABLE_STYLE
+
+
+def _legacy_pdf(meta: dict, assets: dict, original_image_path: str) -> bytes:
+    # previous generate_pdf: stylesheet per call, images embedded as-is
+    styles = getSampleStyleSheet()
+    buffer = io.BytesIO()
+    doc = SimpleDocTemplate(buffer, pagesize=A4)
+    story = [Paragraph('DroneAPP Plant Health Report', styles['Title']), Spacer(1, 6 * mm)]
+    story.append(RLImage(original_image_path, width=140 * mm, height=90 * mm))
+    story.append(Table([[RLImage(assets['heat_exg'], width=80 * mm, height=60 * mm),
+                         RLImage(assets['heat_vari'], width=80 * mm, height=60 * mm)]]))
+    story.append(RLImage(assets['overlay'], width=140 * mm, height=90 * mm))
+    table_data = [['Metric', 'Value']] + [[k, f'{v:.2f}'] for k, v in meta['metrics'].items()]
+    tbl = Table(table_data, colWidths=[90 * mm, 90 * mm])
+    tbl.setStyle(METRICS_TABLE_STYLE)
+    story.append(tbl)
+    doc.build(story)
+    return buffer.getvalue()
+
+
+def _make_inputs(tmp: str, megapixels: float):
+    w = int((megapixels * 1e6 * 3 / 2) ** 0.5)
+    h = int(megapixels * 1e6 / w)
+    rng = np.random.default_rng(0)
+    # smooth gradient plus noise: compresses like a photo rather than like pure noise
+    yy, xx = np.mgrid[0:h, 0:w]
+    base = np.stack([xx * 255 // w, yy * 255 // h, (xx + yy) * 127 // (w + h)], axis=-1)
+    rgb = np.clip(base + rng.integers(-20, 20, size=(h, w, 3)), 0, 255).astype(np.uint8)
+
+    original = os.path.join(tmp, 'upload.jpg')
+    Image.fromarray(rgb).save(original, quality=92)
+    assets = {}
+    for key in ('heat_exg', 'heat_vari', 'overlay'):
+        assets[key] = os.path.join(tmp, f'{key}.png')
+        Image.fromarray(rgb).save(assets[key])
+    meta = {
+        'metrics': {'mean_exg': 0.12, 'mean_vari': 0.05, 'veg_fraction': 0.42, 'stress_fraction': 0.08},
+        'upload_filename': 'upload.jpg',
+    }
+    return (w, h), meta, assets, original
+
+
+def _time(fn, repeats: int):
+    best, result = float('inf'), None
+    for _ in range(repeats):
+        t0 = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - t0)
+    return best, result
+
+
+def main():
+    megapixels = float(sys.argv[1]) if len(sys.argv) > 1 else 12.0
+    repeats = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+    with tempfile.TemporaryDirectory() as tmp:
+        (w, h), meta, assets, original = _make_inputs(tmp, megapixels)
+        print(f'images {w}x{h}')
+        legacy_t, legacy_pdf = _time(lambda: _legacy_pdf(meta, assets, original), repeats)
+        new_t, new_pdf = _time(lambda: build_pdf(meta, assets, original), repeats)
+    print(f'legacy     {legacy_t * 1000:8.1f} ms  {len(legacy_pdf) / 1e6:7.2f} MB')
+    print(
+        f'print-size {new_t * 1000:8.1f} ms  {len(new_pdf) / 1e6:7.2f} MB  '
+        f'({legacy_t / new_t:.1f}x faster, {len(legacy_pdf) / len(new_pdf):.1f}x smaller)'
+    )
+
+
+if __name__ == '__main__':
+    main()
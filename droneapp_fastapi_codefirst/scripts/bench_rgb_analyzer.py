@@ -0,0 +1,80 @@
+"""Benchmark: reference ExG/VARI pipeline vs the fused compute_indices kernel.
+
+Usage: python -m scripts.bench_rgb_analyzer [megapixels] [repeats]
+"""
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+from app.services.rgb_analyzer import (
+    compute_exg,
+    compute_vari,
+    make_mask_from_exg,
+    compute_indices,
+    IndexBuffers,
+)
+
+
+def _synthetic_frame(megapixels: float, seed: int = 0) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    w = int((megapixels * 1e6 * 3 / 2) ** 0.5)
+    h = int(megapixels * 1e6 / w)
+    frame = rng.integers(0, 256, size=(h, w, 3), dtype=np.uint8)
+    # a vegetated band so the mask is not trivially empty
+    frame[: h // 3, :, 1] = np.maximum(frame[: h // 3, :, 1], 200)
+    return frame
+
+
+def _reference(rgb: np.ndarray) -> dict:
+    arr = rgb.astype(np.float32) / 255.0
+    exg = compute_exg(arr)
+    vari = compute_vari(arr)
+    mask = make_mask_from_exg(exg)
+    return {
+        'vegetation_coverage_percent': float(mask.mean() * 100.0),
+        'exg_mean': float(exg[mask].mean()) if mask.any() else 0.0,
+        'vari_mean': float(vari[mask].mean()) if mask.any() else 0.0,
+    }
+
+
+def _fused(rgb: np.ndarray, buffers=None) -> dict:
+    _, stats = compute_indices(rgb, buffers=buffers)
+    return stats
+
+
+def _measure(fn, *args, repeats: int = 3):
+    tracemalloc.start()
+    best = float('inf')
+    result = None
+    for _ in range(repeats):
+        t0 = time.perf_counter()
+        result = fn(*args)
+        best = min(best, time.perf_counter() - t0)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return best, peak, result
+
+
+def main():
+    megapixels = float(sys.argv[1]) if len(sys.argv) > 1 else 20.0
+    repeats = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+    rgb = _synthetic_frame(megapixels)
+    print(f'frame: {rgb.shape[1]}x{rgb.shape[0]} ({megapixels:.0f} MP)')
+
+    ref_t, ref_peak, ref = _measure(_reference, rgb, repeats=repeats)
+    fused_t, fused_peak, fused = _measure(_fused, rgb, repeats=repeats)
+    buffers = IndexBuffers(rgb.shape[:2])
+    reuse_t, reuse_peak, _ = _measure(_fused, rgb, buffers, repeats=repeats)
+
+    print(f'reference        {ref_t * 1000:8.1f} ms  peak {ref_peak / 2**20:8.1f} MiB')
+    print(f'fused            {fused_t * 1000:8.1f} ms  peak {fused_peak / 2**20:8.1f} MiB')
+    print(f'fused (reuse)    {reuse_t * 1000:8.1f} ms  peak {reuse_peak / 2**20:8.1f} MiB')
+    print(f'speedup          {ref_t / fused_t:8.2f}x')
+    for key, value in ref.items():
+        print(f'{key:28s} ref={value:.6f} fused={fused[key]:.6f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,71 @@
+"""/api/runs paging latency: keyset (RunsAPIAccessor.list_runs_page) vs OFFSET.
+
+Fills a temporary SQLite database with synthetic runs and times fetching a
+page near the start and near the end of the table.
+
+Usage: python -m scripts.bench_runs_pagination [runs] [page_size]
+"""
+import os
+import sys
+import tempfile
+import time
+
+from sqlalchemy import create_engine, insert, select
+from sqlalchemy.orm import Session
+
+from app.models.base import Base
+from app.models.models import InputImage, ProcessingRun, SubscriptionPlan, User
+from app.api.accessors.runs_api_accessor import RunsAPIAccessor
+
+
+def _fill(session: Session, runs: int) -> None:
+    session.execute(insert(SubscriptionPlan), [{'id': 1, 'name': 'Free', 'free_attempts_limit': 2}])
+    session.execute(insert(User), [
+        {'id': i, 'email': f'user{i}@droneapp.local', 'password_hash': 'x', 'role': 'USER', 'plan_id': 1}
+        for i in range(1, 101)
+    ])
+    session.execute(insert(InputImage), [{'id': 1, 'user_id': 1, 'filename': 'f', 'storage_path': 'f'}])
+    batch = 50_000
+    for start in range(1, runs + 1, batch):
+        session.execute(insert(ProcessingRun), [
+            {'id': i, 'user_id': i % 100 + 1, 'input_image_id': 1, 'index_type': 'NDVI',
+             'status': 'SUCCESS' if i % 5 else 'FAILED'}
+            for i in range(start, min(start + batch, runs + 1))
+        ])
+    session.commit()
+
+
+def _best(fn, repeats: int = 5) -> float:
+    best = float('inf')
+    for _ in range(repeats):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def main():
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 500_000
+    page = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+        Base.metadata.create_all(engine)
+        with Session(engine) as session:
+            _fill(session, runs)
+            accessor = RunsAPIAccessor(session)
+            offset_query = lambda offset: session.execute(
+                select(ProcessingRun.id, ProcessingRun.user_id, ProcessingRun.index_type,
+                       ProcessingRun.status, ProcessingRun.created_at)
+                .order_by(ProcessingRun.id.desc()).limit(page).offset(offset)
+            ).all()
+            print(f'{runs} runs, page size {page}')
+            for label, position in (('first page', 0), ('middle page', runs // 2), ('last page', runs - page)):
+                keyset = _best(lambda: accessor.list_runs_page(page, before_id=runs - position + 1))
+                offset = _best(lambda: offset_query(position))
+                print(f'{label:12s} keyset {keyset * 1000:8.2f} ms | offset {offset * 1000:8.2f} ms')
+            filtered = _best(lambda: accessor.list_runs_page(page, before_id=runs // 2, user_id=7, status='FAILED'))
+            print(f'filtered (user_id, status) keyset {filtered * 1000:8.2f} ms')
+
+
+if __name__ == '__main__':
+    main()
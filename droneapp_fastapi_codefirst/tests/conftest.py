@@ -0,0 +1,47 @@
+import os
+import sys
+
+import pytest
+from sqlalchemy import BigInteger
+from sqlalchemy.ext.compiler import compiles
+
+# app.db builds its engines at import time and requires DATABASE_URL
+os.environ.setdefault('DATABASE_URL', 'sqlite:///:memory:')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@compiles(BigInteger, 'sqlite')
+def _sqlite_bigint(type_, compiler, **kw):
+    # sqlite only autoincrements INTEGER PRIMARY KEY columns
+    return 'INTEGER'
+
+
+@pytest.fixture
+def engine(tmp_path):
+    from sqlalchemy import create_engine
+    from app.models.base import Base
+    import app.models.models  # noqa: F401  (registers the tables)
+
+    engine = create_engine(f'sqlite:///{tmp_path / "test.db"}', future=True)
+    Base.metadata.create_all(engine)
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def db(engine):
+    from sqlalchemy.orm import Session
+
+    with Session(engine) as session:
+        yield session
+
+
+@pytest.fixture
+def user(db):
+    from app.models.models import SubscriptionPlan, User
+
+    db.add(SubscriptionPlan(id=1, name='Free', free_attempts_limit=2))
+    user = User(id=1, email='user@example.com', password_hash='x', role='USER', plan_id=1, free_attempts_used=0, is_active=True)
+    db.add(user)
+    db.commit()
+    return user
@@ -0,0 +1,81 @@
+import threading
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy.orm import Session
+
+from app.models.models import InputImage, ProcessingRun, Report, User, UserUsageDaily
+from app.services import analysis_jobs
+
+
+def _run(db, user, run_id, status, started_at=None):
+    db.add(InputImage(id=run_id, user_id=user.id, filename='f.png', storage_path='/nonexistent/f.png'))
+    db.add(ProcessingRun(id=run_id, user_id=user.id, input_image_id=run_id, index_type='NDVI', status=status, started_at=started_at))
+    db.commit()
+
+
+def test_reclaim_stale_jobs_fails_and_refunds(db, user):
+    user.free_attempts_used = 2
+    db.commit()
+    now = datetime.utcnow()
+    _run(db, user, 1, analysis_jobs.STATUS_RUNNING, now - timedelta(hours=1))
+    _run(db, user, 2, analysis_jobs.STATUS_RUNNING, now)
+
+    assert analysis_jobs.reclaim_stale_jobs(db, timeout=60) == 1
+
+    db.expire_all()
+    assert db.get(ProcessingRun, 1).status == analysis_jobs.STATUS_FAILED
+    assert db.get(ProcessingRun, 2).status == analysis_jobs.STATUS_RUNNING
+    assert db.get(User, user.id).free_attempts_used == 1
+
+
+def test_claim_sets_started_at(db, user):
+    _run(db, user, 1, analysis_jobs.STATUS_QUEUED)
+    run = analysis_jobs.claim_next_job(db)
+    assert run.status == analysis_jobs.STATUS_RUNNING
+    assert run.started_at is not None
+
+
+def test_worker_loop_survives_errors(monkeypatch):
+    stop = threading.Event()
+    calls = []
+
+    def failing_claim(db):
+        calls.append(1)
+        if len(calls) >= 3:
+            stop.set()
+        raise RuntimeError('database is down')
+
+    monkeypatch.setattr(analysis_jobs, 'claim_next_job', failing_claim)
+    monkeypatch.setattr(analysis_jobs, 'WORKER_ERROR_BACKOFF', 0.01)
+    analysis_jobs.run_worker_loop(stop, poll_interval=0.01)
+    assert len(calls) == 3
+
+
+@pytest.mark.parametrize('analysis_fails', [False, True])
+def test_job_reclaimed_while_running_stays_failed(db, user, engine, monkeypatch, analysis_fails):
+    user.free_attempts_used = 1
+    db.commit()
+    _run(db, user, 1, analysis_jobs.STATUS_QUEUED)
+    db.add(Report(report_id='r1', run_id=1, user_id=user.id, pdf_path='/nonexistent/report_r1.pdf'))
+    db.commit()
+
+    def slow_analysis(path, workdir):
+        # the job outlives its timeout: another worker reclaims it meanwhile
+        with Session(engine) as other:
+            assert analysis_jobs.reclaim_stale_jobs(other, timeout=0) == 1
+        if analysis_fails:
+            raise RuntimeError('analysis failed')
+        return {'health_score': 50.0}, {}
+
+    monkeypatch.setattr(analysis_jobs, 'analyze_image', slow_analysis)
+    run = analysis_jobs.claim_next_job(db)
+    assert analysis_jobs.execute_job(db, run) is False
+
+    db.expire_all()
+    assert db.get(ProcessingRun, 1).status == analysis_jobs.STATUS_FAILED
+    assert db.get(Report, 1).metrics is None
+    # refunded and counted once, by the reclaim
+    assert db.get(User, user.id).free_attempts_used == 0
+    usage = db.query(UserUsageDaily).one()
+    assert (usage.runs, usage.failures) == (1, 1)
@@ -0,0 +1,123 @@
+import io
+import os
+import threading
+import time
+import zipfile
+
+import numpy as np
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from PIL import Image
+from starlette.middleware.sessions import SessionMiddleware
+
+from app.api import analyze_api
+from app.db import get_db
+from app.deps.auth import get_current_user_api
+from app.deps.services import get_analysis_pool, get_app_settings, get_result_cache
+from app.models.models import ProcessingRun, Report, User
+from app.services.analysis_pool import AnalysisPool
+from app.services.api_tokens import ApiPrincipal
+from app.services.result_cache import AnalysisResultCache
+
+
+@pytest.fixture
+def client(db, user, tmp_path, monkeypatch):
+    for name in ('UPLOADS_DIR', 'REPORTS_DIR', 'TEMP_DIR'):
+        path = tmp_path / name.lower()
+        path.mkdir()
+        monkeypatch.setattr(analyze_api, name, str(path))
+    pool = AnalysisPool(workers=1, max_queue=1, kind='thread')
+    cache = AnalysisResultCache(max_entries=10, max_bytes=10 ** 9)
+    app = FastAPI()
+    app.include_router(analyze_api.router)
+    app.add_middleware(SessionMiddleware, secret_key='test')
+    app.dependency_overrides[get_db] = lambda: db
+    app.dependency_overrides[get_analysis_pool] = lambda: pool
+    app.dependency_overrides[get_result_cache] = lambda: cache
+    app.dependency_overrides[get_current_user_api] = lambda: ApiPrincipal(id=user.id, role='USER', plan_id=1)
+    yield TestClient(app)
+    pool.shutdown()
+
+
+def _png() -> bytes:
+    rgb = np.random.default_rng(0).integers(0, 255, (64, 64, 3), dtype=np.uint8)
+    buf = io.BytesIO()
+    Image.fromarray(rgb).save(buf, format='PNG')
+    return buf.getvalue()
+
+
+def test_analyze_charges_caches_and_rejects_over_quota(client, db, user):
+    image = _png()
+
+    def post():
+        return client.post('/api/analyze', files={'file': ('field.png', image, 'image/png')})
+
+    first = post()
+    assert first.status_code == 200, first.text
+    assert first.json()['cached'] is False
+    assert first.json()['remaining'] == 1
+
+    second = post()
+    assert second.status_code == 200, second.text
+    assert second.json()['cached'] is True
+    # same user, same image: the first report is handed back
+    assert second.json()['report_id'] == first.json()['report_id']
+
+    assert post().status_code == 402
+    db.expire_all()
+    assert db.get(User, user.id).free_attempts_used == 2
+    assert db.query(ProcessingRun).count() == 2
+    assert db.query(Report).count() == 1
+
+
+def test_batch_rejects_zip_over_total_size_without_leaving_files(client, monkeypatch):
+    image = _png()
+    archive = io.BytesIO()
+    with zipfile.ZipFile(archive, 'w', zipfile.ZIP_DEFLATED) as zf:
+        for i in range(3):
+            zf.writestr(f'frame_{i}.png', image)
+    monkeypatch.setitem(get_app_settings(), 'batch_max_upload_size', 2 * len(image))
+
+    response = client.post('/api/analyze/batch', files={'files': ('flight.zip', archive.getvalue(), 'application/zip')})
+    assert response.status_code == 413, response.text
+    assert os.listdir(analyze_api.UPLOADS_DIR) == []
+
+    # plain image files count towards the same total
+    files = [('files', (f'frame_{i}.png', image, 'image/png')) for i in range(3)]
+    assert client.post('/api/analyze/batch', files=files).status_code == 413
+    assert os.listdir(analyze_api.UPLOADS_DIR) == []
+
+
+
+def test_batch_runs_only_as_many_frames_as_it_holds_pool_slots(client, monkeypatch):
+    pool = AnalysisPool(workers=2, max_queue=0, kind='thread')
+    client.app.dependency_overrides[get_analysis_pool] = lambda: pool
+    analyze_image = analyze_api.analyze_image
+    lock = threading.Lock()
+    running, peak = [0], [0]
+
+    def counting_analyze_image(*args):
+        with lock:
+            running[0] += 1
+            peak[0] = max(peak[0], running[0])
+        try:
+            time.sleep(0.05)
+            return analyze_image(*args)
+        finally:
+            with lock:
+                running[0] -= 1
+
+    monkeypatch.setattr(analyze_api, 'analyze_image', counting_analyze_image)
+    # another request holds the second slot, so the batch gets one worker only
+    assert pool.try_acquire()
+    try:
+        image = _png()
+        files = [('files', (f'frame_{i}.png', image, 'image/png')) for i in range(2)]
+        response = client.post('/api/analyze/batch', files=files)
+        assert response.status_code == 200, response.text
+        assert peak[0] == 1
+        assert pool.stats()['in_flight'] == 1
+    finally:
+        pool.release()
+        pool.shutdown()
@@ -0,0 +1,33 @@
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from starlette.middleware.sessions import SessionMiddleware
+
+from app.api import analyze_api
+from app.db import get_db
+from app.deps.auth import get_current_user_api
+from app.services.api_tokens import ApiPrincipal
+
+
+@pytest.fixture
+def client(db):
+    app = FastAPI()
+    app.include_router(analyze_api.router)
+    app.add_middleware(SessionMiddleware, secret_key='test')
+    app.dependency_overrides[get_db] = lambda: db
+    return app, TestClient(app)
+
+
+@pytest.mark.parametrize('path', ['/api/analyze/pool', '/api/analyze/cache'])
+def test_service_stats_require_authentication(client, path):
+    _, http = client
+    assert http.get(path).status_code == 401
+
+
+@pytest.mark.parametrize('path', ['/api/analyze/pool', '/api/analyze/cache'])
+def test_service_stats_require_admin(client, path):
+    app, http = client
+    app.dependency_overrides[get_current_user_api] = lambda: ApiPrincipal(id=1, role='USER', plan_id=1)
+    assert http.get(path).status_code == 403
+    app.dependency_overrides[get_current_user_api] = lambda: ApiPrincipal(id=1, role='ADMIN', plan_id=1)
+    assert http.get(path).status_code == 200
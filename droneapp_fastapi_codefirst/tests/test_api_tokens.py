@@ -0,0 +1,48 @@
+import pytest
+from sqlalchemy.orm import sessionmaker
+
+from app.services.api_tokens import ApiTokenService, InvalidToken
+
+
+@pytest.fixture
+def make_service(engine):
+    services = []
+
+    def make(sync_interval=3600.0):
+        service = ApiTokenService('secret', 600, sessionmaker(engine), sync_interval=sync_interval)
+        services.append(service)
+        return service
+
+    yield make
+    for service in services:
+        service.close()
+
+
+def test_token_revoked_elsewhere_is_rejected_before_any_sync(make_service, db, user):
+    issuer = make_service()
+    token, principal = issuer.issue(user.id, user.role, user.plan_id)
+    issuer.revoke(db, principal)
+
+    # a fresh worker that never started its sync thread still checks the table first
+    worker = make_service()
+    with pytest.raises(InvalidToken, match='revoked'):
+        worker.verify(token)
+
+
+def test_start_loads_denylist_and_close_stops_the_thread(make_service, db, user):
+    issuer = make_service()
+    revoked, principal = issuer.issue(user.id, user.role, user.plan_id)
+    issuer.revoke(db, principal)
+    valid, _ = issuer.issue(user.id, user.role, user.plan_id)
+
+    worker = make_service()
+    worker.start()
+    assert worker.stats()['denylist_size'] == 1
+    assert worker.verify(valid).id == user.id
+    with pytest.raises(InvalidToken):
+        worker.verify(revoked)
+
+    thread = worker._syncer
+    assert thread.is_alive()
+    worker.close()
+    assert not thread.is_alive()
@@ -0,0 +1,36 @@
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy.orm import sessionmaker
+from starlette.middleware.sessions import SessionMiddleware
+
+from app.controllers import auth_controller
+from app.models.models import User
+
+
+@pytest.fixture
+def client(engine, monkeypatch):
+    monkeypatch.setattr(auth_controller, 'SessionLocal', sessionmaker(engine))
+    app = FastAPI()
+    app.include_router(auth_controller.router)
+    app.add_middleware(SessionMiddleware, secret_key='test')
+    return TestClient(app)
+
+
+def _login(client, password):
+    return client.post(
+        '/auth/login', data={'email': 'user@example.com', 'password': password}, follow_redirects=False,
+    )
+
+
+def test_demo_login_stores_hash_then_verifies_it(client, db, user):
+    user.password_hash = 'fakehash'
+    db.commit()
+
+    assert _login(client, 'user').status_code == 303
+    db.expire_all()
+    stored = db.get(User, user.id).password_hash
+    assert stored not in (None, '', 'fakehash')
+
+    assert _login(client, 'wrong').status_code == 401
+    assert _login(client, 'user').status_code == 303
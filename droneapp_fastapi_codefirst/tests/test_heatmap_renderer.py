@@ -0,0 +1,50 @@
+import numpy as np
+import pytest
+from PIL import Image
+
+matplotlib = pytest.importorskip('matplotlib')
+from matplotlib.colors import Normalize
+
+from app.services.heatmap_renderer import LUTS, colorize, render_heatmap
+
+CMAPS = ('RdYlGn', 'viridis')
+
+
+def _matplotlib_rgb(arr, cmap):
+    # what the previous pyplot renderer (imshow with default Normalize) drew
+    return matplotlib.colormaps[cmap](Normalize()(arr), bytes=True)[..., :3]
+
+
+def _fixed_array():
+    rng = np.random.default_rng(1234)
+    arr = rng.random((120, 160), dtype=np.float32)
+    # exact range edges and the top-bin fold
+    arr[0, :4] = [0.0, 1.0, 0.5, 1.0 - 1e-7]
+    return arr
+
+
+@pytest.mark.parametrize('cmap', CMAPS)
+def test_luts_match_matplotlib(cmap):
+    expected = matplotlib.colormaps[cmap].resampled(256)(np.arange(256), bytes=True)[:, :3]
+    np.testing.assert_array_equal(LUTS[cmap], expected)
+
+
+@pytest.mark.parametrize('cmap', CMAPS)
+@pytest.mark.parametrize('scale', [1.0, 0.2, -3.0])
+def test_colorize_matches_matplotlib(cmap, scale):
+    arr = _fixed_array() * np.float32(scale)
+    np.testing.assert_array_equal(colorize(arr, cmap), _matplotlib_rgb(arr, cmap))
+
+
+@pytest.mark.parametrize('cmap', CMAPS)
+def test_constant_array_matches_matplotlib(cmap):
+    arr = np.full((8, 8), 0.25, dtype=np.float32)
+    np.testing.assert_array_equal(colorize(arr, cmap), _matplotlib_rgb(arr, cmap))
+
+
+@pytest.mark.parametrize('cmap', CMAPS)
+def test_native_png_matches_matplotlib(tmp_path, cmap):
+    arr = _fixed_array()
+    path = render_heatmap(arr, str(tmp_path / f'{cmap}.png'), cmap, max_size=None)
+    with Image.open(path) as img:
+        np.testing.assert_array_equal(np.asarray(img.convert('RGB')), _matplotlib_rgb(arr, cmap))
@@ -0,0 +1,51 @@
+import ipaddress
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.api import metrics_api
+from app.db import engine, pool_metrics
+from app.services.metrics import REGISTRY, Gauge, Registry
+
+
+def test_labelled_gauge_functions():
+    registry = Registry()
+    gauge = registry.register(Gauge('g', 'Test gauge.', ('pool',)))
+    gauge.set_function(lambda: 3, pool='a')
+    gauge.set(5, pool='b')
+    assert 'g{pool="a"} 3' in registry.render()
+    assert 'g{pool="b"} 5' in registry.render()
+
+
+def test_label_values_are_escaped():
+    registry = Registry()
+    gauge = registry.register(Gauge('g', 'Test gauge.', ('path',)))
+    gauge.set(1, path='C:\\tmp\n"x"')
+    assert 'g{path="C:\\\\tmp\\n\\"x\\""} 1' in registry.render()
+
+
+def test_pool_metrics_render_through_the_shared_registry():
+    with engine.connect():
+        pass
+    body = REGISTRY.render()
+    for family in ('db_pool_checkout_seconds', 'db_pool_checkouts_total', 'http_request_duration_seconds'):
+        assert body.count(f'# TYPE {family} ') == 1
+    assert pool_metrics.stats()['checkouts'] >= 0
+
+
+@pytest.fixture
+def client(monkeypatch):
+    settings = {'metrics_token': 'scrape-secret', 'metrics_allowed_networks': (ipaddress.ip_network('10.0.0.0/8'),)}
+    monkeypatch.setattr(metrics_api, 'get_app_settings', lambda: settings)
+    app = FastAPI()
+    app.include_router(metrics_api.router)
+    return TestClient(app)
+
+
+def test_metrics_requires_token_or_allowed_network(client):
+    assert client.get('/metrics').status_code == 403
+    assert client.get('/metrics', headers={'Authorization': 'Bearer wrong'}).status_code == 403
+    response = client.get('/metrics', headers={'Authorization': 'Bearer scrape-secret'})
+    assert response.status_code == 200
+    assert '# TYPE db_pool_checkout_seconds histogram' in response.text
@@ -0,0 +1,120 @@
+"""Query-plan regression check: hot queries must use their indexes.
+
+Runs EXPLAIN for the accessor/service queries against a SQLite database
+created from the models. Set QUERY_PLANS_DATABASE_URL (e.g. a Postgres
+database migrated to head) to check that instead; on Postgres sequential
+scans are disabled for the check, since on small tables the planner would
+rightly prefer them.
+"""
+import json
+import os
+
+import pytest
+from sqlalchemy import create_engine, func, select, text
+
+from app.api.accessors.runs_api_accessor import runs_page_query
+from app.models.models import AnalysisCacheEntry, ApiTokenRevocation, InputImage, OutputArtifact, ProcessingRun, Report, User
+
+# (description, statement, index expected in the plan)
+HOT_QUERIES = [
+    (
+        'runs of a user, keyset page (/api/runs?user_id=)',
+        runs_page_query(50, before_id=1000, user_id=7),
+        'ix_processing_runs_user_id_id',
+    ),
+    (
+        'oldest queued run (analysis_jobs.claim_next_job)',
+        select(ProcessingRun.id).where(ProcessingRun.status == 'QUEUED').order_by(ProcessingRun.id).limit(1),
+        'ix_processing_runs_status_id',
+    ),
+    (
+        'runs in a created_at range (/api/runs?created_from=)',
+        select(ProcessingRun.id).where(ProcessingRun.created_at >= '2026-01-01', ProcessingRun.created_at < '2026-02-01'),
+        'ix_processing_runs_created_at',
+    ),
+    (
+        'latest image of a user (RunsAPIAccessor.create_run)',
+        select(InputImage.id).where(InputImage.user_id == 7).order_by(InputImage.id.desc()).limit(1),
+        'ix_input_images_user_id_id',
+    ),
+    (
+        'report artifact of a run',
+        select(OutputArtifact.storage_path).where(
+            OutputArtifact.processing_run_id == 7, OutputArtifact.artifact_type == 'REPORT_PDF'
+        ),
+        'ix_output_artifacts_run_id_type',
+    ),
+    (
+        'users on a plan (PlansService.delete_plan_hard)',
+        select(func.count()).select_from(User).where(User.plan_id == 2),
+        'ix_users_plan_id',
+    ),
+    (
+        'case-insensitive email (UsersAccessor.get_user_by_email)',
+        select(User.id).where(func.lower(User.email) == 'user@droneapp.local'),
+        'ix_users_email_lower',
+    ),
+    (
+        'reports of a user, keyset page (ReportsAccessor.list_reports_page)',
+        select(Report.id).where(Report.user_id == 7, Report.metrics.isnot(None))
+        .order_by(Report.created_at.desc(), Report.id.desc()).limit(20),
+        'ix_reports_user_id_created_at',
+    ),
+    (
+        'all reports, keyset page (ReportsAccessor.list_reports_page, admin)',
+        select(Report.id).where(Report.created_at < '2026-02-01')
+        .order_by(Report.created_at.desc(), Report.id.desc()).limit(20),
+        'ix_reports_created_at',
+    ),
+    (
+        'report of a run (ReportsAccessor.get_run_report)',
+        select(Report.id).where(Report.run_id == 7),
+        'ix_reports_run_id',
+    ),
+    (
+        'reports of an image (AnalysisResultCache eviction)',
+        select(Report.assets).where(Report.sha256.in_(['a' * 64, 'b' * 64])),
+        'ix_reports_sha256',
+    ),
+    (
+        'least recently used cache entries (AnalysisResultCache._evict)',
+        select(AnalysisCacheEntry.cache_key).order_by(AnalysisCacheEntry.last_used_at).limit(500),
+        'ix_analysis_cache_last_used_at',
+    ),
+    (
+        'unexpired token revocations (ApiTokenService.sync)',
+        select(ApiTokenRevocation.jti).where(ApiTokenRevocation.expires_at > '2026-01-01'),
+        'ix_api_token_revocations_expires_at',
+    ),
+]
+
+
+@pytest.fixture(scope='module')
+def conn(tmp_path_factory):
+    url = os.getenv('QUERY_PLANS_DATABASE_URL')
+    if url is None:
+        from app.models.base import Base
+        url = f"sqlite:///{tmp_path_factory.mktemp('plans') / 'plans.db'}"
+        Base.metadata.create_all(create_engine(url))
+    engine = create_engine(url)
+    with engine.connect() as conn:
+        if conn.dialect.name == 'postgresql':
+            conn.execute(text('SET enable_seqscan = off'))
+        yield conn
+    engine.dispose()
+
+
+def _plan(conn, statement) -> str:
+    sql = str(statement.compile(conn, compile_kwargs={'literal_binds': True}))
+    if conn.dialect.name == 'sqlite':
+        rows = conn.execute(text(f'EXPLAIN QUERY PLAN {sql}')).all()
+        return '\n'.join(row[-1] for row in rows)
+    if conn.dialect.name == 'postgresql':
+        return json.dumps(conn.execute(text(f'EXPLAIN (FORMAT JSON) {sql}')).scalar())
+    pytest.skip(f'unsupported dialect {conn.dialect.name}')
+
+
+@pytest.mark.parametrize('description, statement, index', HOT_QUERIES, ids=[q[0] for q in HOT_QUERIES])
+def test_hot_query_uses_index(conn, description, statement, index):
+    plan = _plan(conn, statement)
+    assert index in plan, f'{description}: expected {index}, plan:\n{plan}'
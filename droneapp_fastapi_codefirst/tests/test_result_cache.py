@@ -0,0 +1,82 @@
+import os
+
+import numpy as np
+from PIL import Image
+from sqlalchemy import event
+
+from app.models.models import Report
+from app.services.pdf_report import render_report
+from app.services.result_cache import AnalysisResultCache
+from app.services.rgb_analyzer import analyze_image
+
+
+def _frame(path, seed):
+    rng = np.random.default_rng(seed)
+    Image.fromarray(rng.integers(0, 256, (64, 96, 3), dtype=np.uint8)).save(path)
+    return str(path)
+
+
+def _analyzed_report(db, tmp_path, user, n):
+    image_path = _frame(tmp_path / f'frame{n}.png', n)
+    metrics, assets = analyze_image(image_path, str(tmp_path))
+    sha256 = f'{n:064x}'
+    report = Report(
+        id=n, report_id=f'{n:032x}', user_id=user.id, pdf_path=str(tmp_path / f'report_{n:032x}.pdf'),
+        sha256=sha256, metrics=metrics, assets=assets, image_path=image_path,
+    )
+    db.add(report)
+    db.commit()
+    return report
+
+
+def test_eviction_keeps_assets_of_unrendered_reports(db, tmp_path, user):
+    cache = AnalysisResultCache(max_entries=1, max_bytes=1 << 30)
+    first = _analyzed_report(db, tmp_path, user, 1)
+    cache.store(db, first.sha256, user.id, first.metrics, first.assets, first.pdf_path)
+    second = _analyzed_report(db, tmp_path, user, 2)
+    cache.store(db, second.sha256, user.id, second.metrics, second.assets, second.pdf_path)
+
+    assert cache.stats(db)['evictions'] == 1
+    assert cache.lookup(db, first.sha256) is None
+    assert all(os.path.exists(p) for p in first.assets.values())
+
+    render_report(first.pdf_path, {'metrics': first.metrics, 'assets': first.assets, 'image_path': first.image_path})
+    with open(first.pdf_path, 'rb') as fh:
+        pdf = fh.read()
+    # original image + ExG + VARI + overlay, no "not available" placeholders
+    assert pdf.count(b'/Subtype /Image') == 4
+
+
+def test_eviction_removes_unreferenced_assets(db, tmp_path, user):
+    cache = AnalysisResultCache(max_entries=1, max_bytes=1 << 30)
+    _, orphan_assets = analyze_image(_frame(tmp_path / 'orphan.png', 3), str(tmp_path))
+    cache.store(db, f'{3:064x}', user.id, {}, orphan_assets, str(tmp_path / 'report_orphan.pdf'))
+    second = _analyzed_report(db, tmp_path, user, 2)
+    cache.store(db, second.sha256, user.id, second.metrics, second.assets, second.pdf_path)
+
+    assert not any(os.path.exists(p) for p in orphan_assets.values())
+    assert all(os.path.exists(p) for p in second.assets.values())
+
+
+def test_store_counts_the_table_only_when_an_estimate_says_so(db, engine, tmp_path, user):
+    counts = []
+
+    def record(conn, cursor, statement, *args):
+        if 'count(' in statement.lower():
+            counts.append(statement)
+
+    event.listen(engine, 'before_cursor_execute', record)
+    cache = AnalysisResultCache(max_entries=3, max_bytes=1 << 30)
+    try:
+        for n in range(3):
+            cache.store(db, f'{n:064x}', user.id, {}, {}, str(tmp_path / f'report_{n}.pdf'))
+        # the first store seeds the estimate, the next ones trust it
+        assert len(counts) == 1
+        cache.store(db, f'{3:064x}', user.id, {}, {}, str(tmp_path / 'report_3.pdf'))
+    finally:
+        event.remove(engine, 'before_cursor_execute', record)
+
+    # over the entry limit by estimate: counted exactly and evicted
+    assert len(counts) == 2
+    assert cache.stats()['evictions'] == 1
+    assert cache.stats(db)['entries'] == 3
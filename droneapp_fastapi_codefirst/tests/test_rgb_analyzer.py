@@ -0,0 +1,204 @@
+import os
+import struct
+import tracemalloc
+import warnings
+import zlib
+
+import numpy as np
+import pytest
+from PIL import Image, TiffImagePlugin
+
+from app.services import rgb_analyzer
+from app.services.rgb_analyzer import ImageTooLarge, analyze_image, analyze_image_tiled, open_image
+
+
+def _png_declaring(path, width, height):
+    """Tiny PNG whose header declares width x height (a decompression bomb)."""
+    def chunk(kind, data):
+        return struct.pack('>I', len(data)) + kind + data + struct.pack('>I', zlib.crc32(kind + data))
+    ihdr = struct.pack('>IIBBBBB', width, height, 8, 2, 0, 0, 0)
+    path.write_bytes(b'\x89PNG\r\n\x1a\n' + chunk(b'IHDR', ihdr) + chunk(b'IDAT', zlib.compress(b'')) + chunk(b'IEND', b''))
+    return str(path)
+
+
+def _frame(shape=(96, 128)):
+    rng = np.random.default_rng(0)
+    return rng.integers(0, 256, shape + (3,), dtype=np.uint8)
+
+
+def test_pillow_bomb_limit_is_left_alone():
+    assert Image.MAX_IMAGE_PIXELS is not None
+    assert Image.MAX_IMAGE_PIXELS < rgb_analyzer.MAX_ORTHOMOSAIC_PIXELS
+
+
+def test_open_image_lifts_pillow_limit_for_its_own_call_only(tmp_path):
+    # 200 MP: above Pillow's error bound, under the orthomosaic cap
+    path = _png_declaring(tmp_path / 'big.png', 20_000, 10_000)
+    default_limit = Image.MAX_IMAGE_PIXELS
+    with warnings.catch_warnings():
+        warnings.simplefilter('error', Image.DecompressionBombWarning)
+        with open_image(path) as img:
+            assert img.size == (20_000, 10_000)
+    assert Image.MAX_IMAGE_PIXELS == default_limit
+    with pytest.raises(Image.DecompressionBombError):
+        Image.open(path)
+
+
+def test_bomb_above_cap_is_rejected_before_decoding(tmp_path):
+    path = _png_declaring(tmp_path / 'bomb.png', 40_000, 40_000)
+    with pytest.raises(ImageTooLarge):
+        analyze_image(path, str(tmp_path))
+
+
+def test_large_compressed_raster_is_rejected(tmp_path):
+    # 200 MP PNG: under the orthomosaic cap, but it can only be decoded whole
+    path = _png_declaring(tmp_path / 'wide.png', 20_000, 10_000)
+    with pytest.raises(ImageTooLarge, match='must be TIFF'):
+        analyze_image(path, str(tmp_path))
+
+
+def _write_tiled_tiff(path, rgba, tile):
+    """Deflate-compressed tiled RGBA TIFF (Pillow itself only writes strips)."""
+    h, w = rgba.shape[:2]
+    blobs = []
+    for y in range(0, h, tile):
+        for x in range(0, w, tile):
+            block = np.zeros((tile, tile, 4), dtype=np.uint8)
+            part = rgba[y:y + tile, x:x + tile]
+            block[:part.shape[0], :part.shape[1]] = part
+            blobs.append(zlib.compress(block.tobytes()))
+    ifd = TiffImagePlugin.ImageFileDirectory_v2(prefix=b'II')
+    for tag, value in {256: w, 257: h, 258: (8, 8, 8, 8), 259: 8, 262: 2, 277: 4, 284: 1, 338: (2,), 322: tile, 323: tile}.items():
+        ifd[tag] = value
+    offsets, offset = [], 8
+    for blob in blobs:
+        offsets.append(offset)
+        offset += len(blob)
+    ifd[324], ifd[325] = tuple(offsets), tuple(len(blob) for blob in blobs)
+    ifd.tagtype[324] = ifd.tagtype[325] = TiffImagePlugin.TiffTags.LONG
+    path.write_bytes(b'II' + struct.pack('<HI', 42, offset) + b''.join(blobs) + ifd.tobytes(offset))
+    return str(path)
+
+
+def test_tiled_path_matches_across_encodings(tmp_path, monkeypatch):
+    rgb = _frame()
+    # alpha must not change the result: it is dropped in every window
+    rgba = np.dstack([rgb, _frame()[:, :, :1]])
+    raw = tmp_path / 'frame.tif'
+    Image.fromarray(rgb).save(raw)
+    packed = tmp_path / 'frame.png'
+    Image.fromarray(rgb).save(packed)
+    lzw = tmp_path / 'frame_lzw.tif'
+    Image.fromarray(rgba).save(lzw, compression='tiff_lzw')
+    raw_rgba = tmp_path / 'frame_rgba.tif'
+    Image.fromarray(rgba).save(raw_rgba)
+    tiled = _write_tiled_tiff(tmp_path / 'frame_tiled.tif', rgba, 48)
+    palette = tmp_path / 'frame_p.tif'
+    Image.fromarray(rgb).quantize(64).save(palette, compression='tiff_adobe_deflate')
+
+    expected, _ = analyze_image(str(raw), str(tmp_path))
+    for path in (raw, packed, lzw, raw_rgba, tiled):
+        assert analyze_image_tiled(str(path), str(tmp_path), tile_size=32)[0] == pytest.approx(expected), path
+    quantized = np.asarray(Image.open(palette).convert('RGB'))
+    Image.fromarray(quantized).save(tmp_path / 'quantized.tif')
+    assert analyze_image_tiled(str(palette), str(tmp_path), tile_size=32)[0] == pytest.approx(
+        analyze_image(str(tmp_path / 'quantized.tif'), str(tmp_path))[0]
+    )
+
+    # TIFFs are read strip by strip or tile by tile, never decoded whole
+    monkeypatch.setattr(rgb_analyzer, 'MAX_DECODED_PIXELS', 1000)
+    for path in (raw, lzw, tiled):
+        assert analyze_image_tiled(str(path), str(tmp_path), tile_size=32)[0] == pytest.approx(expected), path
+    with pytest.raises(ImageTooLarge):
+        analyze_image_tiled(str(packed), str(tmp_path), tile_size=32)
+
+
+@pytest.mark.parametrize('seed', [0, 1, 2])
+def test_fused_kernel_matches_reference_functions(seed):
+    rng = np.random.default_rng(seed)
+    rgb = rng.integers(0, 256, (64, 80, 3), dtype=np.uint8)
+    # zero VARI denominator: G + R - B == 0
+    rgb[:8, :, 0] = rng.integers(0, 128, (8, 80))
+    rgb[:8, :, 1] = rng.integers(0, 128, (8, 80))
+    rgb[:8, :, 2] = rgb[:8, :, 0] + rgb[:8, :, 1]
+
+    # float64 reference: in float32, G/255 + R/255 - B/255 leaves rounding
+    # residue of the same order as EPS where the denominator should be zero
+    arr = rgb.astype(np.float64) / 255.0
+    exg = rgb_analyzer.compute_exg(arr)
+    vari = rgb_analyzer.compute_vari(arr)
+    mask = rgb_analyzer.make_mask_from_exg(exg, rgb_analyzer.EXG_THRESHOLD)
+    R, G, B = arr[:, :, 0], arr[:, :, 1], arr[:, :, 2]
+    raw_vari = (G - R) / (G + R - B + rgb_analyzer.EPS)
+
+    buffers, stats = rgb_analyzer.compute_indices(rgb)
+
+    np.testing.assert_allclose(buffers.exg, exg, atol=1e-5)
+    np.testing.assert_allclose(buffers.vari, vari, atol=1e-4)
+    # pixels within float noise of the threshold may land either side
+    decided = np.abs(exg - rgb_analyzer.EXG_THRESHOLD) > 1e-5
+    np.testing.assert_array_equal(buffers.mask[decided], mask[decided])
+    assert stats['vari_low'] == pytest.approx(np.percentile(raw_vari, rgb_analyzer.VARI_LOW_PERCENTILE), rel=1e-4)
+    assert stats['vari_high'] == pytest.approx(np.percentile(raw_vari, rgb_analyzer.VARI_HIGH_PERCENTILE), rel=1e-4)
+    assert stats['vegetation_coverage_percent'] == pytest.approx(mask.mean() * 100.0, abs=0.1)
+    assert stats['exg_mean'] == pytest.approx(float(exg[mask].mean()), rel=1e-3)
+    assert stats['vari_mean'] == pytest.approx(float(vari[mask].mean()), rel=1e-3)
+
+
+def test_percentile_pair_matches_numpy():
+    values = np.random.default_rng(3).normal(size=(37, 41)).astype(np.float32)
+    scratch = np.empty_like(values)
+    for low, high in ((2.0, 98.0), (0.0, 100.0), (50.0, 50.0), (33.3, 66.6)):
+        got = rgb_analyzer._percentile_pair(values, scratch, low, high)
+        assert got == pytest.approx((np.percentile(values, low), np.percentile(values, high)), rel=1e-6)
+
+
+def test_compressed_image_above_tiled_threshold_is_decoded_whole(tmp_path, monkeypatch):
+    # e.g. a 72 MP PNG: tiled path, but still analysed like before it existed
+    rgb = _frame()
+    packed = tmp_path / 'frame.png'
+    Image.fromarray(rgb).save(packed)
+    expected, _ = analyze_image(str(packed), str(tmp_path))
+    monkeypatch.setattr(rgb_analyzer, 'TILED_MIN_PIXELS', 1000)
+    assert analyze_image(str(packed), str(tmp_path))[0] == pytest.approx(expected)
+
+
+def test_jpeg_above_decode_limit_is_decoded_at_reduced_scale(tmp_path, monkeypatch):
+    path = tmp_path / 'frame.jpg'
+    Image.fromarray(_frame()).save(path, quality=95)
+    monkeypatch.setattr(rgb_analyzer, 'MAX_DECODED_PIXELS', 96 * 128 // 4)
+    with Image.open(path) as img:
+        assert rgb_analyzer._TileReader(img).width == 64
+    metrics, _ = analyze_image_tiled(str(path), str(tmp_path), tile_size=32)
+    assert 0.0 <= metrics['health_score'] <= 100.0
+
+
+def test_lzw_rgba_orthomosaic_is_analysed_in_bounded_memory(tmp_path):
+    # 8192 x 8192 (67 MP) LZW RGBA TIFF repeating one 512 x 512 pattern, so the
+    # expected metrics are those of the pattern; levels keep the file small
+    rng = np.random.default_rng(1)
+    pattern = (rng.integers(0, 5, (512, 512, 4)) * 63).astype(np.uint8)
+    pattern[:256, :, 1] = 252
+    img = Image.new('RGBA', (8192, 8192))
+    tile = Image.fromarray(pattern)
+    for y in range(0, 8192, 512):
+        for x in range(0, 8192, 512):
+            img.paste(tile, (x, y))
+    path = tmp_path / 'ortho.tif'
+    img.save(path, compression='tiff_lzw')
+    del img
+
+    pattern_path = tmp_path / 'pattern.tif'
+    Image.fromarray(pattern[:, :, :3]).save(pattern_path)
+    expected, _ = analyze_image(str(pattern_path), str(tmp_path))
+
+    tracemalloc.start()
+    try:
+        metrics, assets = analyze_image_tiled(str(path), str(tmp_path), tile_size=512, preview_max_side=512)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    assert metrics == pytest.approx(expected, rel=1e-4, abs=1e-4)
+    assert os.path.exists(assets['overlay'])
+    # decoding it whole would take 192 MB for the RGB array alone
+    assert peak < 48 * 1024 * 1024